@@ -0,0 +1 @@
+"""Standalone performance benchmarks (run from backend/ with `python -m benchmarks.<name>`)."""
@@ -0,0 +1,193 @@
+"""XML patch export vs openpyxl export, with a fidelity check.
+
+Imports a synthetic workbook, edits a sample of shipments and adds new
+ones, then exports the same changes twice, each time in a fresh process
+with its own temporary database: once with EXPORT_ENGINE=xml and once with
+EXPORT_ENGINE=openpyxl. The two exported workbooks must hold the same cell
+values in every sheet. The XML export must also leave every zip member
+other than the edited worksheets byte-identical to the source. Exits
+non-zero on any mismatch.
+
+    python -m benchmarks.export_engine --rows 100000 --changes 500 --new 200
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.import_memory import _peak_rss_mb
+from benchmarks.synthetic_workbook import write_workbook, CARRIERS, CUSTOMERS
+
+
+def edit_shipments(changes: int, new: int, seed: int = 7):
+    """Change `changes` existing shipments and insert `new` ones."""
+    from database import get_db
+
+    rng = random.Random(seed)
+    now = (datetime.now() + timedelta(seconds=1)).isoformat()
+    with get_db() as conn:
+        inbound = [r[0] for r in conn.execute("SELECT id FROM inbound_shipments")]
+        outbound = [r[0] for r in conn.execute("SELECT id FROM outbound_shipments")]
+        for record_id in rng.sample(inbound, min(changes // 2, len(inbound))):
+            conn.execute(
+                "UPDATE inbound_shipments SET carrier = ?, received = NOT received, "
+                "ship_date = date(COALESCE(ship_date, '2026-01-01'), '+1 day'), updated_at = ? WHERE id = ?",
+                (rng.choice(CARRIERS), now, record_id),
+            )
+        for record_id in rng.sample(outbound, min(changes - changes // 2, len(outbound))):
+            conn.execute(
+                "UPDATE outbound_shipments SET customer = ?, shipped = 1, pallets = ?, "
+                "notes = ?, updated_at = ? WHERE id = ?",
+                (rng.choice(CUSTOMERS), rng.randint(1, 26), f"  edited {record_id} & checked ", now, record_id),
+            )
+        for i in range(new):
+            if i % 2:
+                conn.execute(
+                    "INSERT INTO inbound_shipments (source, item_number, cases, carrier, ship_date, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (rng.choice(["TP", "OTHER"]), f"NEW-{i}", rng.randint(1, 400), rng.choice(CARRIERS), "2026-11-02", now),
+                )
+            else:
+                conn.execute(
+                    "INSERT INTO outbound_shipments (source, reference_number, customer, ship_date, pallets, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (rng.choice(["TP", "OTHER"]), f"REF-{i}", rng.choice(CUSTOMERS), "2026-11-03", 2.5, now),
+                )
+
+
+def _run_export(workbook: Path, changes: int, new: int) -> dict:
+    """Child process: import, edit and export `workbook` in place."""
+    from database import init_database
+    from services.excel_sync import ExcelSyncService
+
+    init_database()
+    service = ExcelSyncService()
+    service.sharepoint_url = ""
+    service.excel_path = workbook
+    if not service.import_from_excel().success:
+        raise SystemExit("import failed")
+    edit_shipments(changes, new)
+
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    result = service.export_to_excel()
+    elapsed = time.perf_counter() - started
+    if not result.success:
+        raise SystemExit(result.message)
+    return {
+        "records": result.records_processed,
+        "seconds": round(elapsed, 2),
+        "export_mb": round(_peak_rss_mb() - baseline, 1),
+    }
+
+
+def _export(source: Path, run_dir: Path, engine: str, changes: int, new: int) -> tuple[Path, dict]:
+    run_dir.mkdir()
+    workbook = run_dir / source.name
+    shutil.copy2(source, workbook)
+    env = dict(
+        os.environ,
+        DATABASE_PATH=str(run_dir / "loadboard.db"),
+        BACKUP_DIR=str(run_dir / "backups"),
+        EXPORT_ENGINE=engine,
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.export_engine", "--child", str(workbook),
+         "--changes", str(changes), "--new", str(new)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return workbook, json.loads(output.strip().splitlines()[-1])
+
+
+def _sheet_values(path: Path) -> dict:
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        values = {}
+        for name in wb.sheetnames:
+            rows = []
+            for row in wb[name].iter_rows(values_only=True):
+                # Empty strings and missing cells read back the same in Excel
+                rows.append(tuple(None if v == "" else v for v in row))
+            while rows and not any(v is not None for v in rows[-1]):
+                rows.pop()
+            values[name] = rows
+        return values
+    finally:
+        wb.close()
+
+
+def _compare_values(xml_path: Path, openpyxl_path: Path) -> list[str]:
+    problems = []
+    xml_values, openpyxl_values = _sheet_values(xml_path), _sheet_values(openpyxl_path)
+    for name, expected in openpyxl_values.items():
+        actual = xml_values.get(name, [])
+        for row_num in range(max(len(expected), len(actual))):
+            want = expected[row_num] if row_num < len(expected) else ()
+            got = actual[row_num] if row_num < len(actual) else ()
+            width = max(len(want), len(got))
+            want = want + (None,) * (width - len(want))
+            got = got + (None,) * (width - len(got))
+            if want != got:
+                problems.append(f"{name} row {row_num + 1}: openpyxl={want} xml={got}")
+    return problems
+
+
+def _compare_parts(source: Path, xml_path: Path) -> list[str]:
+    problems = []
+    with zipfile.ZipFile(source) as before, zipfile.ZipFile(xml_path) as after:
+        patched = 0
+        for info in before.infolist():
+            if info.filename not in after.NameToInfo:
+                problems.append(f"{info.filename}: missing from XML export")
+            elif before.read(info) != after.read(info.filename):
+                if info.filename.startswith("xl/worksheets/"):
+                    patched += 1
+                else:
+                    problems.append(f"{info.filename}: changed by XML export")
+        print(f"worksheet parts patched: {patched}; other parts byte-identical: {not problems}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="shipment rows in the workbook")
+    parser.add_argument("--changes", type=int, default=500, help="existing shipments edited before export")
+    parser.add_argument("--new", type=int, default=200, help="shipments added before export")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_run_export(args.child, args.changes, args.new)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_workbook(Path(tmp) / "bench.xlsx", args.rows)
+        xml_path, xml = _export(source, Path(tmp) / "xml", "xml", args.changes, args.new)
+        openpyxl_path, openpyxl = _export(source, Path(tmp) / "openpyxl", "openpyxl", args.changes, args.new)
+
+        print(f"{'engine':>10} {'records':>9} {'seconds':>9} {'export MB':>10}")
+        for engine, result in (("xml", xml), ("openpyxl", openpyxl)):
+            print(f"{engine:>10} {result['records']:>9} {result['seconds']:>9} {result['export_mb']:>10}")
+        print(f"speedup: {openpyxl['seconds'] / max(xml['seconds'], 0.01):.1f}x")
+
+        problems = _compare_values(xml_path, openpyxl_path) + _compare_parts(source, xml_path)
+
+    for problem in problems[:20]:
+        print(problem)
+    print("fidelity: OK" if not problems else f"fidelity: {len(problems)} mismatches")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Conditional SharePoint download with the local ETag cache, on the fake Graph server.
+
+Shares a synthetic workbook from devtools.fake_graph and drives
+ExcelSyncService's download and import through it:
+
+- cold download: full transfer, cached with its ETag;
+- unchanged workbook: If-None-Match gets a 304, the copy comes from cache;
+- export within SHAREPOINT_CACHE_MAX_AGE_SECONDS: no request at all;
+- workbook changed remotely: full transfer of the new content;
+- two imports in a row: the second is a 304 and skips as unchanged.
+
+Every downloaded copy must match the server's current bytes.
+
+    python -m benchmarks.graph_download --rows 50000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ITEM = "Documents/Load Board.xlsx"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="shipment rows in the workbook")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_PATH"] = str(Path(tmp) / "loadboard.db")
+        os.environ["BACKUP_DIR"] = str(Path(tmp) / "backups")
+
+        from benchmarks.synthetic_workbook import write_workbook
+        from database import init_database
+        from devtools.fake_graph import FakeGraph
+        from services.excel_sync import ExcelSyncService
+
+        init_database()
+        workbook = write_workbook(Path(tmp) / "bench.xlsx", args.rows)
+
+        with FakeGraph() as graph:
+            graph.put_file(ITEM, workbook.read_bytes())
+            service = ExcelSyncService()
+            service.sharepoint_url = graph.share(ITEM)
+            ok = True
+
+            def download(label: str, max_age: float = 0):
+                nonlocal ok
+                before = (graph.requests.get("GET", 0), graph.not_modified)
+                started = time.perf_counter()
+                path = service._download_from_sharepoint(max_age=max_age)
+                elapsed = time.perf_counter() - started
+                identical = path is not None and path.read_bytes() == graph.files[ITEM]
+                ok &= identical
+                requests_made = graph.requests.get("GET", 0) - before[0]
+                status = "304" if graph.not_modified > before[1] else "200" if requests_made else "-"
+                print(f"{label:>22} {elapsed:>8.3f} {requests_made:>9} {status:>7} {str(identical):>10}")
+                if path is not None:
+                    path.unlink()
+
+            print(f"workbook: {len(graph.files[ITEM]) / 1e6:.1f} MB")
+            print(f"{'download':>22} {'seconds':>8} {'requests':>9} {'status':>7} {'identical':>10}")
+            download("cold")
+            download("unchanged")
+            download("export, fresh cache", max_age=60)
+            graph.put_file(ITEM, write_workbook(Path(tmp) / "changed.xlsx", args.rows + 10).read_bytes())
+            download("changed remotely")
+            download("unchanged again")
+
+            first = service.import_from_excel()
+            started = time.perf_counter()
+            second = service.import_from_excel()
+            print(f"import: {first.message}; re-import {time.perf_counter() - started:.3f}s: {second.message}")
+            ok &= first.success and second.unchanged
+
+    print("checks: OK" if ok else "checks: FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
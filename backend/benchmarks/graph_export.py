@@ -0,0 +1,140 @@
+"""Cell-level Graph export vs whole-file upload, on the fake Graph server.
+
+Shares two copies of a synthetic workbook from devtools.fake_graph. For
+each, a child process with its own temporary database imports it from
+SharePoint, edits a sample of shipments and adds new ones, then exports:
+once with EXPORT_ENGINE=graph (range PATCHes in a workbook session) and once
+with EXPORT_ENGINE=xml (patched file uploaded whole).
+
+While each export runs, right after it downloads the workbook, the server
+changes an unrelated cell as if someone were working in Excel Online. The
+graph export must keep that edit and the whole-file upload is expected to
+lose it. Apart from that cell, both results must hold the same values.
+
+Needs msal installed (requirements.txt); the Graph token is pre-seeded,
+so msal never contacts a server.
+
+    python -m benchmarks.graph_export --rows 50000 --changes 500 --new 200
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.export_engine import _compare_values, edit_shipments
+from benchmarks.synthetic_workbook import write_workbook
+from devtools.fake_graph import FakeGraph
+
+ONLINE_EDIT = ("TP INBOUND", 3, 14, "edited in Excel Online")
+CREDENTIALS = ("tenant", "client", "secret")
+
+
+def _run_export(share_url: str, item: str, api_base: str, changes: int, new: int) -> dict:
+    """Child process: import from the fake SharePoint, edit, export."""
+    from database import init_database
+    from services.excel_sync import ExcelSyncService, MSAL_AVAILABLE
+    from services.graph_client import token_cache
+
+    if not MSAL_AVAILABLE:
+        raise SystemExit("msal is not installed")
+    init_database()
+    token_cache._tokens[CREDENTIALS] = ("fake-token", time.time() + 3600)
+    service = ExcelSyncService()
+    service.sharepoint_url = share_url
+    service.graph_tenant_id, service.graph_client_id, service.graph_client_secret = CREDENTIALS
+    service.sharepoint_user = "someone"
+    service.sharepoint_file_path = item
+    service.graph_api_base = api_base
+    service.excel_path = Path(os.environ["BACKUP_DIR"]) / "missing" / "local.xlsx"
+
+    if not service.import_from_excel().success:
+        raise SystemExit("import failed")
+    edit_shipments(changes, new)
+
+    started = time.perf_counter()
+    result = service.export_to_excel()
+    if not result.success:
+        raise SystemExit(result.message)
+    return {"records": result.records_processed, "seconds": round(time.perf_counter() - started, 2),
+            "message": result.message}
+
+
+def _cell(path: Path, sheet: str, row: int, column: int):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True)
+    try:
+        return wb[sheet].cell(row=row, column=column).value
+    finally:
+        wb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000, help="shipment rows in the workbook")
+    parser.add_argument("--changes", type=int, default=500, help="existing shipments edited before export")
+    parser.add_argument("--new", type=int, default=200, help="shipments added before export")
+    parser.add_argument("--child", nargs=3, metavar=("SHARE_URL", "ITEM", "API_BASE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_run_export(*args.child, args.changes, args.new)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp, FakeGraph() as graph:
+        source = write_workbook(Path(tmp) / "bench.xlsx", args.rows).read_bytes()
+        results, outputs = {}, {}
+        for engine in ("graph", "xml"):
+            item = f"{engine}/Load Board.xlsx"
+            graph.put_file(item, source)
+            run_dir = Path(tmp) / engine
+            run_dir.mkdir()
+
+            # The import downloads first; the export's download arms the edit
+            def arm(path):
+                graph.after_download = lambda path: graph.edit(path, *ONLINE_EDIT)
+            graph.after_download = arm
+
+            before = (graph.request_bytes, graph.requests.get("POST", 0) + graph.requests.get("PUT", 0))
+            env = dict(os.environ, DATABASE_PATH=str(run_dir / "loadboard.db"), BACKUP_DIR=str(run_dir),
+                       EXPORT_ENGINE=engine)
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.graph_export", "--child", graph.share(item), item, graph.api_base,
+                 "--changes", str(args.changes), "--new", str(args.new)],
+                env=env, check=True, capture_output=True, text=True,
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            result["sent_mb"] = (graph.request_bytes - before[0]) / 1e6
+            result["requests"] = graph.requests.get("POST", 0) + graph.requests.get("PUT", 0) - before[1]
+            graph.flush(item)
+            outputs[engine] = run_dir / "result.xlsx"
+            outputs[engine].write_bytes(graph.files[item])
+            result["online_edit_kept"] = _cell(outputs[engine], *ONLINE_EDIT[:3]) == ONLINE_EDIT[3]
+            results[engine] = result
+
+        print(f"workbook: {len(source) / 1e6:.1f} MB; {graph.ranges_written} ranges, "
+              f"{graph.cells_written} cells in {graph.batches} $batch calls")
+        print(f"{'engine':>7} {'records':>8} {'seconds':>8} {'sent MB':>8} {'requests':>9} {'online edit kept':>17}")
+        for engine, result in results.items():
+            print(f"{engine:>7} {result['records']:>8} {result['seconds']:>8} {result['sent_mb']:>8.2f} "
+                  f"{result['requests']:>9} {str(result['online_edit_kept']):>17}")
+
+        # The whole-file upload dropped the online edit; compare everything else
+        graph.edit("graph/Load Board.xlsx", *ONLINE_EDIT[:3], None)
+        outputs["graph"].write_bytes(graph.files["graph/Load Board.xlsx"])
+        problems = _compare_values(outputs["graph"], outputs["xml"])
+
+    for problem in problems[:20]:
+        print(problem)
+    ok = not problems and results["graph"]["online_edit_kept"] and results["graph"]["records"] == results["xml"]["records"]
+    print("checks: OK" if ok else f"checks: FAILED ({len(problems)} mismatches)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
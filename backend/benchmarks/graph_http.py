@@ -0,0 +1,134 @@
+"""Pooled Graph session and token cache vs one-off requests, on a local stand-in.
+
+Starts a small HTTP server on 127.0.0.1 that plays the parts of the token
+endpoint and the file download, with a configurable delay for every new
+connection (standing in for the TCP+TLS handshake) and per-request latency.
+Then runs the same sequence of "syncs" (token + download) twice:
+
+- bare: a new connection and a new token for every call, as before;
+- pooled: services.graph_client's shared session and token cache.
+
+A final check makes the server answer 429 with Retry-After and 503 once
+each, and verifies the shared session retries through both.
+
+    python -m benchmarks.graph_http --syncs 20 --handshake-ms 60 --latency-ms 20
+"""
+
+import argparse
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from services.graph_client import graph_metrics, http_session, timed_request, token_cache
+
+PAYLOAD = b"x" * (256 * 1024)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+        time.sleep(self.server.handshake_s)
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status: int, body: bytes, headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        time.sleep(self.server.latency_s)
+        self.server.token_requests += 1
+        self._reply(200, b'{"access_token": "t", "expires_in": 3599}', {"Content-Type": "application/json"})
+
+    def do_GET(self):
+        time.sleep(self.server.latency_s)
+        if self.path == "/throttled" and self.server.faults:
+            status, headers = self.server.faults.pop(0)
+            self._reply(status, b"{}", headers)
+            return
+        self._reply(200, PAYLOAD, {"Content-Type": "application/octet-stream"})
+
+
+class _StandInApp:
+    """Plays msal.ConfidentialClientApplication: posts to the stand-in token endpoint."""
+
+    def __init__(self, token_url: str):
+        self.token_url = token_url
+
+    def acquire_token_for_client(self, scopes):
+        return http_session.post(self.token_url, data={"scope": scopes[0]}, timeout=10).json()
+
+
+def _serve(handshake_ms: int, latency_ms: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    server.daemon_threads = True
+    server.handshake_s = handshake_ms / 1000
+    server.latency_s = latency_ms / 1000
+    server.connections = 0
+    server.token_requests = 0
+    server.faults = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--syncs", type=int, default=20, help="token + download rounds per mode")
+    parser.add_argument("--handshake-ms", type=int, default=60, help="delay for each new connection")
+    parser.add_argument("--latency-ms", type=int, default=20, help="delay for each request")
+    args = parser.parse_args()
+
+    server = _serve(args.handshake_ms, args.latency_ms)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    results = {}
+
+    started = time.perf_counter()
+    for _ in range(args.syncs):
+        requests.post(f"{base}/token", data={"scope": "s"}, timeout=10).json()
+        requests.get(f"{base}/file", timeout=10).content
+    results["bare"] = (time.perf_counter() - started, server.connections, server.token_requests)
+
+    server.connections = server.token_requests = 0
+    graph_metrics.reset()
+    credentials = ("tenant", "client", "secret")
+    token_cache._apps[credentials] = _StandInApp(f"{base}/token")
+    started = time.perf_counter()
+    for _ in range(args.syncs):
+        token_cache.get_token(*credentials)
+        timed_request("download", "GET", f"{base}/file", timeout=10).content
+    results["pooled"] = (time.perf_counter() - started, server.connections, server.token_requests)
+
+    print(f"{'mode':>8} {'seconds':>9} {'connections':>12} {'token calls':>12}")
+    for mode, (seconds, connections, token_requests) in results.items():
+        print(f"{mode:>8} {seconds:>9.2f} {connections:>12} {token_requests:>12}")
+    print(f"speedup: {results['bare'][0] / max(results['pooled'][0], 0.001):.1f}x")
+
+    server.faults = [(429, {"Retry-After": "1"}), (503, {})]
+    started = time.perf_counter()
+    response = timed_request("throttled", "GET", f"{base}/throttled", timeout=10)
+    waited = time.perf_counter() - started
+    stats = graph_metrics.stats()
+    print(f"429+503 then {response.status_code} after {waited:.2f}s; retries recorded: "
+          f"{stats['requests']['throttled']['retries']}")
+    print(f"metrics: {stats}")
+
+    server.shutdown()
+    ok = response.status_code == 200 and waited >= 1 and results["pooled"][2] == 1
+    print("checks: OK" if ok else "checks: FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""End-to-end SharePoint sync against the fake Graph server.
+
+Runs the real sync path (msal token, share-link download, Graph upload or
+workbook writes) with nothing but configuration pointing it at
+devtools.fake_graph, under a few simulated network conditions:
+
+- local: no added latency;
+- wan: every request waits --latency-ms first;
+- throttled: as wan, and every --throttle-every-th request is answered 429
+  with Retry-After: 1;
+- flaky: as wan, with one upload chunk dropped mid-transfer, one answered
+  503, and the token revoked before the second export.
+
+Each scenario gets a fresh server and a child process with its own
+temporary database that imports the shared workbook, edits a sample of
+shipments and adds new ones, exports, does the same edits again on fewer
+shipments and exports again, then imports again. Exits non-zero if any
+sync fails or the re-import doesn't see the exported shipments.
+
+    python -m benchmarks.graph_sync --rows 20000 --latency-ms 40 --engine xml
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.export_engine import edit_shipments
+from benchmarks.synthetic_workbook import write_workbook
+from devtools.fake_graph import FakeGraph, Fault
+
+ITEM = "Load Board.xlsx"
+CREDENTIALS = ("client", "secret")
+# Small chunks so the flaky scenario's faults land mid-upload
+CHUNK_BYTES = 320 * 1024
+
+
+def _count_shipments() -> int:
+    from database import get_db
+
+    with get_db() as conn:
+        return conn.execute(
+            "SELECT (SELECT COUNT(*) FROM inbound_shipments) + (SELECT COUNT(*) FROM outbound_shipments)"
+        ).fetchone()[0]
+
+
+def _run_sync(changes: int, new: int) -> dict:
+    """Child process: import, edit, export and re-import through the configured Graph."""
+    from database import init_database
+    from services.excel_sync import ExcelSyncService
+    from services.graph_client import graph_metrics
+
+    init_database()
+    service = ExcelSyncService()
+    if not service.is_sharepoint_upload_configured():
+        raise SystemExit("SharePoint upload is not configured (is msal installed?)")
+    timings = {}
+
+    def timed(phase, run):
+        started = time.perf_counter()
+        result = run()
+        timings[phase] = round(time.perf_counter() - started, 2)
+        if not result.success:
+            raise SystemExit(f"{phase} failed: {result.message}")
+        return result
+
+    timed("import", service.import_from_excel)
+    edit_shipments(changes, new)
+    export = timed("export", service.export_to_excel)
+    edit_shipments(changes // 10, new // 10, seed=8)
+    expected = _count_shipments()
+    export2 = timed("export2", service.export_to_excel)
+    timed("reimport", service.import_from_excel)
+    stats = graph_metrics.stats()
+    return {
+        **timings,
+        "uploaded": all("SharePoint" in result.message and not result.errors for result in (export, export2)),
+        "shipments": expected,
+        "reimported": _count_shipments(),
+        "token_misses": stats["token"]["misses"],
+        "retries": sum(operation["retries"] for operation in stats["requests"].values()),
+    }
+
+
+def _scenario(name: str, source: bytes, run_dir: Path, args) -> dict:
+    latency = 0 if name == "local" else args.latency_ms / 1000
+    throttle_every = args.throttle_every if name == "throttled" else 0
+    with FakeGraph(tls=True, latency=latency, throttle_every=throttle_every, require_auth=True,
+                   credentials=CREDENTIALS) as graph:
+        graph.put_file(ITEM, source)
+        if name == "flaky":
+            # Downloads: import, export, then the second export's, which revokes the token
+            downloads = []
+
+            def arm(path):
+                downloads.append(path)
+                graph.after_download = (lambda path: graph.revoke_tokens()) if len(downloads) == 2 else arm
+            graph.after_download = arm
+            graph.faults += [None, Fault("disconnect", after_bytes=100_000), Fault("status", status=503)]
+
+        run_dir.mkdir()
+        env = dict(
+            os.environ,
+            **graph.env(ITEM),
+            DATABASE_PATH=str(run_dir / "loadboard.db"),
+            BACKUP_DIR=str(run_dir / "backups"),
+            EXPORT_ENGINE=args.engine,
+            GRAPH_UPLOAD_CHUNK_BYTES=str(CHUNK_BYTES),
+            SHAREPOINT_CACHE_MAX_AGE_SECONDS="0",
+        )
+        started = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.graph_sync", "--child",
+             "--changes", str(args.changes), "--new", str(args.new)],
+            env=env, capture_output=True, text=True,
+        )
+        if output.returncode:
+            return {"error": (output.stdout + output.stderr).strip().splitlines()[-1]}
+        result = json.loads(output.stdout.strip().splitlines()[-1])
+        result["total"] = round(time.perf_counter() - started, 2)
+        result["requests"] = sum(graph.requests.values())
+        result["throttled"] = graph.throttled
+        result["token_requests"] = graph.token_requests
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="shipment rows in the workbook")
+    parser.add_argument("--changes", type=int, default=300, help="existing shipments edited before export")
+    parser.add_argument("--new", type=int, default=100, help="shipments added before export")
+    parser.add_argument("--latency-ms", type=int, default=40, help="delay before every request outside 'local'")
+    parser.add_argument("--throttle-every", type=int, default=5, help="429 every Nth request in 'throttled'")
+    parser.add_argument("--engine", choices=["xml", "graph"], default="xml", help="EXPORT_ENGINE to use")
+    parser.add_argument("--scenarios", default="local,wan,throttled,flaky")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_run_sync(args.changes, args.new)))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = write_workbook(Path(tmp) / "bench.xlsx", args.rows).read_bytes()
+        print(f"workbook: {len(source) / 1e6:.1f} MB, engine: {args.engine}")
+        for name in args.scenarios.split(","):
+            results[name] = _scenario(name, source, Path(tmp) / name, args)
+
+    print(f"{'scenario':>10} {'import':>7} {'export':>7} {'export2':>8} {'reimport':>9} {'total':>7} {'requests':>9} "
+          f"{'429s':>5} {'retries':>8} {'tokens':>7}")
+    ok = True
+    for name, result in results.items():
+        if "error" in result:
+            print(f"{name:>10} FAILED: {result['error']}")
+            ok = False
+            continue
+        print(f"{name:>10} {result['import']:>7} {result['export']:>7} {result['export2']:>8} {result['reimport']:>9} "
+              f"{result['total']:>7} "
+              f"{result['requests']:>9} {result['throttled']:>5} {result['retries']:>8} {result['token_requests']:>7}")
+        if result["reimported"] != result["shipments"] or not result["uploaded"]:
+            print(f"{name:>10} re-import found {result['reimported']} of {result['shipments']} shipments")
+            ok = False
+    print("checks: OK" if ok else "checks: FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""Peak memory of the Excel import as the workbook grows.
+
+Imports synthetic workbooks of increasing size, each in a fresh process
+with its own temporary database, and reports wall time and peak RSS. With
+the streaming import pipeline the peak should stay roughly flat across
+sizes instead of growing with the row count.
+
+Peak RSS comes from /proc or getrusage; on Windows, which has neither, it
+is psutil's peak working set, or without psutil the peak of Python
+allocations traced by tracemalloc (which misses native buffers and slows
+the import down).
+
+    python -m benchmarks.import_memory --rows 200000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def _peak_rss_mb() -> float:
+    # VmHWM is per address space; ru_maxrss on Linux carries over the parent's
+    # peak across fork/exec, which would hide the child's own footprint
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is kilobytes on Linux and bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    if psutil is not None:
+        memory = psutil.Process().memory_info()
+        return getattr(memory, "peak_wset", memory.rss) / (1024 * 1024)
+    return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+
+
+def _run_import(workbook: Path) -> dict:
+    """Child process: import `workbook` into the database named by the environment."""
+    from database import init_database
+    from services.excel_sync import ExcelSyncService
+
+    if resource is None and psutil is None:
+        tracemalloc.start()
+    init_database()
+    service = ExcelSyncService()
+    service.sharepoint_url = ""
+    service.excel_path = workbook
+
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    result = service.import_from_excel()
+    elapsed = time.perf_counter() - started
+
+    if not result.success:
+        raise SystemExit(result.message)
+    return {
+        "records": result.records_processed,
+        "seconds": round(elapsed, 2),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "timings": result.timings,
+    }
+
+
+def _measure(rows: int, workdir: Path) -> dict:
+    from benchmarks.synthetic_workbook import write_workbook
+
+    workbook = write_workbook(workdir / f"bench_{rows}.xlsx", rows)
+    run_dir = workdir / f"run_{rows}"
+    run_dir.mkdir()
+    env = dict(
+        os.environ,
+        DATABASE_PATH=str(run_dir / "loadboard.db"),
+        BACKUP_DIR=str(run_dir),
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.import_memory", "--child", str(workbook)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return {"rows": rows, **json.loads(output.strip().splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000, help="largest workbook size (shipment rows)")
+    parser.add_argument("--steps", type=int, default=3, help="number of sizes measured up to --rows")
+    parser.add_argument("--child", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_run_import(args.child)))
+        return
+
+    sizes = [args.rows * (i + 1) // args.steps for i in range(args.steps)]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [_measure(rows, Path(tmp)) for rows in sizes]
+
+    print(f"{'rows':>10} {'records':>10} {'seconds':>9} {'base MB':>9} {'peak MB':>9} {'import MB':>10}")
+    for r in results:
+        print(
+            f"{r['rows']:>10} {r['records']:>10} {r['seconds']:>9} {r['baseline_rss_mb']:>9} "
+            f"{r['peak_rss_mb']:>9} {r['peak_rss_mb'] - r['baseline_rss_mb']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
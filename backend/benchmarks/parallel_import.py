@@ -0,0 +1,61 @@
+"""Serial vs parallel sheet parsing during Excel import.
+
+Imports the same synthetic multi-sheet workbook twice, each time in a
+fresh process with its own temporary database: once with
+IMPORT_PARALLEL_WORKERS=0 and once with the requested worker count.
+
+    python -m benchmarks.parallel_import --rows 100000 --workers 4
+
+The import caps workers at os.cpu_count(), so on a single-CPU machine the
+"parallel" run takes the serial path.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.synthetic_workbook import write_workbook
+
+
+def _import(workbook: Path, run_dir: Path, workers: int) -> dict:
+    run_dir.mkdir()
+    env = dict(
+        os.environ,
+        DATABASE_PATH=str(run_dir / "loadboard.db"),
+        BACKUP_DIR=str(run_dir),
+        IMPORT_PARALLEL_WORKERS=str(workers),
+    )
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.import_memory", "--child", str(workbook)],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"CPUs available: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = write_workbook(Path(tmp) / "bench.xlsx", args.rows)
+        serial = _import(workbook, Path(tmp) / "serial", 0)
+        parallel = _import(workbook, Path(tmp) / "parallel", args.workers)
+
+    print(f"{'mode':>10} {'records':>9} {'seconds':>9} {'peak MB':>9}")
+    for mode, result in (("serial", serial), (f"{args.workers} procs", parallel)):
+        print(f"{mode:>10} {result['records']:>9} {result['seconds']:>9} {result['peak_rss_mb']:>9}")
+    print(f"speedup: {serial['seconds'] / parallel['seconds']:.2f}x")
+    print("per-sheet seconds (parallel times are worker parse times):")
+    for sheet in serial["timings"]:
+        print(f"  {sheet:<20} {serial['timings'][sheet]:>8} {parallel['timings'].get(sheet, '-'):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Import/export benchmark suite over synthetic workbooks, with saved results.
+
+For each workbook size, writes a synthetic Load Board workbook (see
+benchmarks.synthetic_workbook) and runs three phases against one temporary
+database, each in a fresh process so its peak memory is its own:
+
+- import: first import into the empty database;
+- reimport: the same, unchanged file again;
+- export: after editing --changes of the shipments and adding --new ones.
+
+Reports wall time, peak RSS and the sync's own per-sheet timings for every
+phase, writes everything to a JSON file, and with --compare checks a
+previous run's file for regressions (exits non-zero if any phase got slower
+or bigger by more than --tolerance).
+
+    python -m benchmarks.sync_suite --rows 1000,10000,100000 --output before.json
+    python -m benchmarks.sync_suite --rows 1000,10000,100000 --output after.json --compare before.json
+
+Settings such as EXPORT_ENGINE and IMPORT_PARALLEL_WORKERS come from the
+environment as usual and are recorded in the results.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.export_engine import edit_shipments
+from benchmarks.import_memory import _peak_rss_mb
+from benchmarks.synthetic_workbook import write_workbook
+
+PHASES = ["import", "reimport", "export"]
+
+# Differences below these are noise, whatever the relative change
+MIN_SECONDS_DELTA = 0.1
+MIN_MB_DELTA = 5
+
+
+def _run_phase(phase: str, workbook: Path, changes: int, new: int) -> dict:
+    """Child process: run one phase against the database named by the environment."""
+    from database import init_database
+    from services.excel_sync import ExcelSyncService
+
+    init_database()
+    service = ExcelSyncService()
+    service.sharepoint_url = ""
+    service.excel_path = workbook
+    if phase == "export":
+        edit_shipments(changes, new)
+
+    baseline = _peak_rss_mb()
+    started = time.perf_counter()
+    result = service.export_to_excel() if phase == "export" else service.import_from_excel()
+    elapsed = time.perf_counter() - started
+    if not result.success:
+        raise SystemExit(f"{phase} failed: {result.message}")
+    return {
+        "records": result.records_processed,
+        "seconds": round(elapsed, 3),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "unchanged": result.unchanged,
+        "timings": result.timings,
+    }
+
+
+def _measure(rows: int, workdir: Path, args) -> dict:
+    started = time.perf_counter()
+    workbook = write_workbook(workdir / f"bench_{rows}.xlsx", rows, args.seed)
+    generated = time.perf_counter() - started
+    run_dir = workdir / f"run_{rows}"
+    run_dir.mkdir()
+    env = dict(os.environ, DATABASE_PATH=str(run_dir / "loadboard.db"), BACKUP_DIR=str(run_dir))
+    changes = max(1, int(rows * args.changes))
+    new = max(1, int(rows * args.new))
+
+    phases = {}
+    for phase in PHASES:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.sync_suite", "--child", phase, str(workbook),
+             "--changes", str(changes), "--new", str(new)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout
+        phases[phase] = json.loads(output.strip().splitlines()[-1])
+    return {
+        "rows": rows,
+        "workbook_mb": round(workbook.stat().st_size / 1e6, 2),
+        "generate_seconds": round(generated, 2),
+        "changes": changes,
+        "new": new,
+        "phases": phases,
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _compare(previous: dict, current: dict, tolerance: float) -> list[str]:
+    """Phases that got slower or bigger than `previous` by more than `tolerance`."""
+    regressions = []
+    before_by_rows = {result["rows"]: result for result in previous["results"]}
+    for result in current["results"]:
+        before = before_by_rows.get(result["rows"])
+        if before is None:
+            continue
+        for phase, now in result["phases"].items():
+            then = before["phases"].get(phase)
+            if then is None:
+                continue
+            for metric, floor in (("seconds", MIN_SECONDS_DELTA), ("peak_rss_mb", MIN_MB_DELTA)):
+                old, new = then[metric], now[metric]
+                if new - old > max(floor, old * tolerance):
+                    regressions.append(f"{result['rows']} rows {phase} {metric}: {old} -> {new}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", default="1000,10000,100000", help="comma-separated workbook sizes (shipment rows)")
+    parser.add_argument("--changes", type=float, default=0.01, help="share of shipments edited before export")
+    parser.add_argument("--new", type=float, default=0.002, help="new shipments before export, as a share of rows")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=Path, help="results file (default sync_suite_<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="earlier results file to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown/growth")
+    parser.add_argument("--child", nargs=2, metavar=("PHASE", "WORKBOOK"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # Child processes get absolute counts in --changes/--new
+        print(json.dumps(_run_phase(args.child[0], Path(args.child[1]), int(args.changes), int(args.new))))
+        return
+
+    from config import EXPORT_ENGINE, IMPORT_BATCH_SIZE, IMPORT_PARALLEL_WORKERS
+
+    sizes = [int(rows) for rows in args.rows.split(",")]
+    with tempfile.TemporaryDirectory() as tmp:
+        results = []
+        for rows in sizes:
+            print(f"{rows} rows...", flush=True)
+            results.append(_measure(rows, Path(tmp), args))
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "settings": {
+            "EXPORT_ENGINE": EXPORT_ENGINE,
+            "IMPORT_BATCH_SIZE": IMPORT_BATCH_SIZE,
+            "IMPORT_PARALLEL_WORKERS": IMPORT_PARALLEL_WORKERS,
+        },
+        "results": results,
+    }
+    output = args.output or Path(f"sync_suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    output.write_text(json.dumps(report, indent=2))
+
+    print(f"{'rows':>8} {'MB':>6} {'phase':>9} {'records':>8} {'seconds':>8} {'peak MB':>8} {'phase MB':>9}")
+    for result in results:
+        for phase, r in result["phases"].items():
+            print(f"{result['rows']:>8} {result['workbook_mb']:>6} {phase:>9} {r['records']:>8} {r['seconds']:>8} "
+                  f"{r['peak_rss_mb']:>8} {r['peak_rss_mb'] - r['baseline_rss_mb']:>9.1f}")
+    print(f"results: {output}")
+
+    if args.compare:
+        regressions = _compare(json.loads(args.compare.read_text()), report, args.tolerance)
+        for regression in regressions:
+            print(f"regression: {regression}")
+        print("compare: OK" if not regressions else f"compare: {len(regressions)} regressions")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
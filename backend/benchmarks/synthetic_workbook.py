@@ -0,0 +1,183 @@
+"""Synthetic Load Board workbooks for benchmarks.
+
+Writes the sheet layouts the Excel import expects, streamed through
+openpyxl's write-only mode so generating very large workbooks stays cheap
+(500k rows take about a minute). Values are as messy as the real board:
+shipped flags like "Yes,Delayed" and " YES ", dates that are sometimes
+typed by hand in one of several formats (or "TBD"), numbers stored as text,
+outbound rows without an order number and the odd blank row.
+
+    python -m benchmarks.synthetic_workbook out.xlsx --rows 200000
+"""
+
+import argparse
+import random
+import re
+import zipfile
+from itertools import zip_longest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+INBOUND_HEADERS = {
+    "TP INBOUND": ["Item #", "Cases", "PO", "Carrier", "BOL #", "TP Receipt #", "Date", "Received", "Pallets", "Notes"],
+    "OTHERINBOUND": ["Item #", "Cases", "PO", "Carrier", "BOL #", "Date", "Received", "Pallets", "Notes"],
+}
+OUTBOUND_HEADERS = {
+    "TP OUTBOUND": ["Reference #", "Order #", "Customer", "Ship Date", "Carrier", "Shipped", "Pallets", "Pro", "Seal", "Notes", "Time"],
+    "OTHEROUTBOUND": ["Reference #", "Order #", "Customer", "Ship Date", "Carrier", "Shipped", "Actual Date", "Pallets", "Pro", "Seal", "Notes"],
+}
+
+# Share of the shipment rows written to each sheet
+SHEET_SHARES = {
+    "TP INBOUND": 0.3,
+    "OTHERINBOUND": 0.2,
+    "TP OUTBOUND": 0.3,
+    "OTHEROUTBOUND": 0.2,
+}
+
+CARRIERS = ["FedEx Freight", "UPS", "XPO", "Old Dominion", "Estes", "R+L", "Customer Pickup"]
+CUSTOMERS = ["AutoZone", "Auto Zone #1123", "O'Reilly", "NAPA", "Advance Auto", "Walmart DC 6094"]
+SHIPPED_VALUES = ["Yes", "No", "Yes-Delayed", None, "yes", "Yes,Delayed", "Yes, Delayed", " YES ", "No "]
+RECEIVED_VALUES = ["Yes", "No", None, "X", "y"]
+NOTES = [None, None, None, "Call before delivery", "  dock 4 ", "Appt 8am \u2013 confirm", "R&L to rebill <urgent>"]
+
+# Share of shipment rows followed by an empty row, as left by cleared entries
+BLANK_ROW_SHARE = 0.01
+
+# Hand-typed dates: (cumulative share of all dates, strftime format or literal)
+TEXT_DATES = [(0.08, "%m/%d/%Y"), (0.12, "%m/%d/%y"), (0.15, "%Y-%m-%d"), (0.17, "TBD")]
+
+
+def _ship_date(rng: random.Random, start: datetime):
+    value = start + timedelta(days=rng.randint(0, 364))
+    roll = rng.random()
+    for share, fmt in TEXT_DATES:
+        if roll < share:
+            return value.strftime(fmt)
+    # Mostly real dates, and now and then none at all
+    return None if roll > 0.99 else value
+
+
+def _number(rng: random.Random, value):
+    """`value`, stored as text now and then."""
+    return f"{value} " if value is not None and rng.random() < 0.03 else value
+
+
+def _add_dimensions(path: Path, sizes: list[tuple[int, int]]):
+    """Insert the <dimension> element Excel always writes (write-only mode omits it).
+
+    Read-only openpyxl uses it to pad short rows to the sheet width, which
+    the importer relies on. `sizes` holds (columns, rows) per sheet in order.
+    """
+    rewritten = path.with_suffix(".tmp")
+    with zipfile.ZipFile(path) as src, zipfile.ZipFile(rewritten, "w", zipfile.ZIP_DEFLATED) as dst:
+        for item in src.infolist():
+            data = src.read(item.filename)
+            match = re.fullmatch(r"xl/worksheets/sheet(\d+)\.xml", item.filename)
+            if match:
+                columns, rows = sizes[int(match.group(1)) - 1]
+                dimension = f'<dimension ref="A1:{get_column_letter(columns)}{rows}" />'
+                data = data.replace(b"<sheetViews>", dimension.encode() + b"<sheetViews>", 1)
+            dst.writestr(item, data)
+    rewritten.replace(path)
+
+
+def _append(sheet, row: list, rng: random.Random) -> int:
+    """Append `row`, sometimes followed by an empty one; returns the rows written."""
+    sheet.append(row)
+    if rng.random() < BLANK_ROW_SHARE:
+        sheet.append([])
+        return 2
+    return 1
+
+
+def write_workbook(path: Path, rows: int, seed: int = 42) -> Path:
+    """Write a workbook with `rows` shipment rows spread across the four sheets."""
+    rng = random.Random(seed)
+    start = datetime(datetime.now().year, 1, 1)
+    wb = Workbook(write_only=True)
+    sizes = []
+
+    for name, headers in INBOUND_HEADERS.items():
+        sheet = wb.create_sheet(name)
+        sheet.append(headers)
+        written = 1
+        for i in range(int(rows * SHEET_SHARES[name])):
+            row = [
+                f"ITEM-{rng.randint(1, 800)}",
+                _number(rng, rng.randint(1, 1200)),
+                f"PO{100000 + i}",
+                rng.choice(CARRIERS),
+                f"BOL{rng.randint(10**6, 10**7)}",
+            ]
+            if name == "TP INBOUND":
+                row.append(f"TPR{i}")
+            row += [
+                _ship_date(rng, start),
+                rng.choice(RECEIVED_VALUES),
+                _number(rng, rng.choice([1, 2, 4.5, 10, None])),
+                rng.choice(NOTES),
+            ]
+            written += _append(sheet, row, rng)
+        sizes.append((len(headers), written))
+
+    for name, headers in OUTBOUND_HEADERS.items():
+        sheet = wb.create_sheet(name)
+        sheet.append(headers)
+        written = 1
+        for i in range(int(rows * SHEET_SHARES[name])):
+            row = [
+                f"REF{i}",
+                f"SO{500000 + i}" if rng.random() > 0.02 else None,
+                rng.choice(CUSTOMERS),
+                _ship_date(rng, start),
+                rng.choice(CARRIERS),
+                rng.choice(SHIPPED_VALUES),
+            ]
+            if name == "OTHEROUTBOUND":
+                row.append(_ship_date(rng, start) if rng.random() < 0.5 else None)
+            row += [
+                _number(rng, rng.choice([1, 2, 3, 6, 12.5])),
+                f"PRO{rng.randint(10**5, 10**6)}",
+                f"SEAL{i}",
+                rng.choice(NOTES[:5]),
+            ]
+            if name == "TP OUTBOUND":
+                row.append(rng.choice(["08:00", "13:30", "1:30 PM", None]))
+            written += _append(sheet, row, rng)
+        sizes.append((len(headers), written))
+
+    # Columns of different lengths, then trailing empty rows
+    sheet = wb.create_sheet("Carriers&Customers")
+    sheet.append(["Carriers", "Customers"])
+    for carrier, customer in zip_longest(CARRIERS, CUSTOMERS):
+        sheet.append([carrier, customer])
+    sheet.append([])
+    sheet.append([])
+    sizes.append((2, max(len(CARRIERS), len(CUSTOMERS)) + 3))
+
+    sheet = wb.create_sheet("Product Counts")
+    sheet.append(["Item #", "Items/Case", "Items/Pallet", "Cases/Pallet", "Layers/Pallet", "Cases/Layer", "Notes"])
+    written = 1
+    for i in range(1, 801):
+        cases_per_layer = rng.choice([10, 12, 12, 12, 15])
+        row = [f"ITEM-{i}", _number(rng, 12), 720, 5 * cases_per_layer, 5, cases_per_layer, rng.choice(NOTES)]
+        written += _append(sheet, row, rng)
+    sizes.append((7, written))
+
+    wb.save(path)
+    _add_dimensions(path, sizes)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    write_workbook(args.path, args.rows, args.seed)
+    print(f"Wrote {args.rows} shipment rows to {args.path}")
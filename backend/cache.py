@@ -0,0 +1,147 @@
+"""Versioned in-process response cache for the dashboard endpoints.
+
+Entries are stamped with the data version they were computed at and the
+calendar date. An entry is served only while both still match, so:
+
+- writes through this process bump a local generation counter
+  (`invalidate()`, called by the shipment routers and the Excel import);
+- shipment writes from any other connection or process (other gunicorn
+  workers, manual sqlite sessions) bump the trigger-maintained
+  `shipment_version` counter, read through a dedicated watcher connection.
+  Other tables (sync jobs, leases, sync state) and export bookkeeping
+  columns don't touch it, so heartbeats and job progress keep the cache;
+- date-dependent results ("today", "overdue", this month) roll over at
+  midnight because the date is part of the stamp.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from config import DATABASE_PATH, DB_BUSY_TIMEOUT_MS
+
+SHIPMENT_TABLES = ("inbound_shipments", "outbound_shipments")
+
+# Columns only sync bookkeeping writes; updating just these doesn't change
+# anything a cached response shows
+BOOKKEEPING_COLUMNS = {"synced_at", "excel_row"}
+
+
+def create_shipment_version(cursor):
+    """Create the shipment change counter and the triggers that bump it."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS shipment_version (
+            id INTEGER PRIMARY KEY CHECK(id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("INSERT OR IGNORE INTO shipment_version (id) VALUES (1)")
+
+    bump = "UPDATE shipment_version SET version = version + 1 WHERE id = 1;"
+    for table in SHIPMENT_TABLES:
+        columns = [
+            row[1] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()
+            if row[1] not in BOOKKEEPING_COLUMNS
+        ]
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_version_ai AFTER INSERT ON {table} BEGIN
+                {bump}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_version_ad AFTER DELETE ON {table} BEGIN
+                {bump}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_version_au
+            AFTER UPDATE OF {", ".join(columns)} ON {table} BEGIN
+                {bump}
+            END
+        """)
+
+
+class ResponseCache:
+    """Cache of computed responses keyed by endpoint and parameters."""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._watcher = None
+        self._watcher_pid = None
+        self._watcher_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _shipment_version(self) -> int:
+        # Read on its own connection so checking the version never waits on,
+        # or joins, a request thread's transaction
+        with self._watcher_lock:
+            if self._watcher is None or self._watcher_pid != os.getpid():
+                self._watcher = sqlite3.connect(
+                    str(DATABASE_PATH),
+                    check_same_thread=False,
+                    timeout=DB_BUSY_TIMEOUT_MS / 1000,
+                )
+                self._watcher_pid = os.getpid()
+            return self._watcher.execute("SELECT version FROM shipment_version").fetchone()[0]
+
+    def version(self) -> tuple[int, int]:
+        """Current data version: (local write generation, shipment_version counter)."""
+        return self._generation, self._shipment_version()
+
+    def invalidate(self):
+        """Mark every cached entry stale after a write in this process."""
+        with self._lock:
+            self._generation += 1
+
+    def get_or_compute(self, key: tuple, compute):
+        """Return the cached value for `key`, computing it if missing or stale.
+
+        Blocking (reads SQLite); call it from the DB executor via run_db.
+        """
+        stamp = (self.version(), date.today())
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            self._entries[key] = (stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def stats(self) -> dict:
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "entries": len(self._entries),
+                "generation": self._generation,
+            }
+
+    def close(self):
+        """Close the watcher connection (called on application shutdown)."""
+        with self._watcher_lock:
+            if self._watcher is not None:
+                self._watcher.close()
+                self._watcher = None
+
+
+dashboard_cache = ResponseCache()
@@ -5,7 +5,7 @@ from pathlib import Path
 
 # Base paths
 BASE_DIR = Path(__file__).resolve().parent.parent
-DATABASE_PATH = BASE_DIR / "data" / "loadboard.db"
+DATABASE_PATH = Path(os.environ.get("DATABASE_PATH", BASE_DIR / "data" / "loadboard.db"))
 
 # Excel file path - local file (used if SHAREPOINT_EXCEL_URL is not set)
 # On Azure/Linux, this path won't exist - SharePoint will be the primary source
@@ -33,6 +33,29 @@ GRAPH_TENANT_ID = os.environ.get("GRAPH_TENANT_ID", "")
 GRAPH_CLIENT_ID = os.environ.get("GRAPH_CLIENT_ID", "")
 GRAPH_CLIENT_SECRET = os.environ.get("GRAPH_CLIENT_SECRET", "")
 
+# Where tokens and Graph calls go; point both at a local devtools.fake_graph
+# server (with REQUESTS_CA_BUNDLE set to its certificate) to run syncs
+# without a tenant
+GRAPH_AUTHORITY_HOST = os.environ.get("GRAPH_AUTHORITY_HOST", "https://login.microsoftonline.com").rstrip("/")
+GRAPH_API_BASE = os.environ.get("GRAPH_API_BASE", "https://graph.microsoft.com/v1.0").rstrip("/")
+
+# Retries for Graph/SharePoint HTTP calls answered with 429 or 5xx; waits
+# honor Retry-After, otherwise back off exponentially from GRAPH_HTTP_BACKOFF
+GRAPH_HTTP_RETRIES = int(os.environ.get("GRAPH_HTTP_RETRIES", "4"))
+GRAPH_HTTP_BACKOFF = float(os.environ.get("GRAPH_HTTP_BACKOFF", "0.5"))
+
+# Exports upload through a Graph upload session in chunks of this size,
+# rounded down to the 320 KiB multiple Graph requires; a failed chunk is
+# resumed from the range the server reports, giving up after
+# GRAPH_UPLOAD_MAX_FAILURES failures in a row
+GRAPH_UPLOAD_CHUNK_BYTES = int(os.environ.get("GRAPH_UPLOAD_CHUNK_BYTES", str(5 * 1024 * 1024)))
+GRAPH_UPLOAD_MAX_FAILURES = int(os.environ.get("GRAPH_UPLOAD_MAX_FAILURES", "6"))
+
+# The last SharePoint download is cached locally and revalidated with its
+# ETag; exports reuse a copy validated less than this many seconds ago
+# without asking SharePoint at all (0 always revalidates)
+SHAREPOINT_CACHE_MAX_AGE_SECONDS = int(os.environ.get("SHAREPOINT_CACHE_MAX_AGE_SECONDS", "60"))
+
 # OneDrive path for the Excel file (relative to user's OneDrive root)
 # Example: "Desktop/Operations Data/Load Board 2026.xlsx"
 SHAREPOINT_FILE_PATH = os.environ.get(
@@ -47,7 +70,7 @@ SHAREPOINT_USER = os.environ.get(
 )
 
 # Backup directory for Excel files
-BACKUP_DIR = BASE_DIR / "backups"
+BACKUP_DIR = Path(os.environ.get("BACKUP_DIR", BASE_DIR / "backups"))
 
 # Ensure directories exist
 DATABASE_PATH.parent.mkdir(parents=True, exist_ok=True)
@@ -65,4 +88,33 @@ CORS_ORIGINS = [
 ]
 
 # Sync settings
-AUTO_SYNC_INTERVAL_MINUTES = 15
+# Minutes between scheduled export+import jobs; 0 disables the scheduler
+AUTO_SYNC_INTERVAL_MINUTES = int(os.environ.get("AUTO_SYNC_INTERVAL_MINUTES", "15"))
+
+# Seconds a sync lease stays valid without a heartbeat; the holder renews it
+# every third of that, so a crashed worker blocks syncs for at most this long
+SYNC_LEASE_SECONDS = int(os.environ.get("SYNC_LEASE_SECONDS", "90"))
+
+# Rows per executemany batch during Excel import; bounds import memory
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "2000"))
+
+# Worker processes that parse workbook sheets in parallel during import;
+# 0 parses every sheet in the request thread
+IMPORT_PARALLEL_WORKERS = int(os.environ.get("IMPORT_PARALLEL_WORKERS", "0"))
+
+# How export writes the workbook: "xml" patches only the changed cells in the
+# sheet XML (falling back to openpyxl if the file can't be patched);
+# "openpyxl" always loads and re-saves the whole workbook; "graph" writes
+# only the changed cells to SharePoint through the Excel workbook API
+# instead of uploading the file (falling back to "xml" plus an upload when
+# SharePoint isn't configured or the Graph calls fail)
+EXPORT_ENGINE = os.environ.get("EXPORT_ENGINE", "xml").lower()
+
+# SQLite connection tuning
+# Connections are opened once per thread and reused (see database.get_db)
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", "32768"))  # 32 MB page cache per connection
+DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", str(256 * 1024 * 1024)))  # 256 MB memory-mapped I/O
+
+# Number of threads that run blocking SQLite work for the async routes
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", "8"))
@@ -0,0 +1,132 @@
+"""Trigger-maintained per-day shipment rollups backing the dashboard stats.
+
+`daily_shipment_summary` holds one row per (direction, ship_date) with the
+total, completed and pending shipment counts and the pallet sum for that
+day. Triggers on both shipment tables keep it current on every insert,
+update and delete, so dashboard stats read a handful of summary rows
+instead of scanning the shipment tables.
+"""
+
+# direction -> (base table, completion flag column)
+SUMMARY_SOURCES = {
+    "inbound": ("inbound_shipments", "received"),
+    "outbound": ("outbound_shipments", "shipped"),
+}
+
+# Pallet sums are REAL and accumulate float error through +/- updates
+PALLET_TOLERANCE = 1e-6
+
+
+def create_daily_summary(cursor):
+    """Create the summary table and its sync triggers, backfilling if new."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_shipment_summary'")
+    is_new = cursor.fetchone() is None
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_shipment_summary (
+            direction TEXT NOT NULL CHECK(direction IN ('inbound', 'outbound')),
+            ship_date DATE NOT NULL,
+            total INTEGER NOT NULL DEFAULT 0,
+            completed INTEGER NOT NULL DEFAULT 0,
+            pending INTEGER NOT NULL DEFAULT 0,
+            pallets REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (direction, ship_date)
+        ) WITHOUT ROWID
+    """)
+
+    for direction, (table, flag) in SUMMARY_SOURCES.items():
+        add_new = f"""
+            INSERT INTO daily_shipment_summary (direction, ship_date, total, completed, pending, pallets)
+            SELECT '{direction}', NEW.ship_date, 1, NEW.{flag} = 1, NEW.{flag} = 0, COALESCE(NEW.pallets, 0)
+            WHERE NEW.ship_date IS NOT NULL
+            ON CONFLICT (direction, ship_date) DO UPDATE SET
+                total = total + excluded.total,
+                completed = completed + excluded.completed,
+                pending = pending + excluded.pending,
+                pallets = pallets + excluded.pallets;
+        """
+        remove_old = f"""
+            UPDATE daily_shipment_summary SET
+                total = total - 1,
+                completed = completed - (OLD.{flag} = 1),
+                pending = pending - (OLD.{flag} = 0),
+                pallets = pallets - COALESCE(OLD.pallets, 0)
+            WHERE direction = '{direction}' AND ship_date = OLD.ship_date;
+            DELETE FROM daily_shipment_summary
+            WHERE direction = '{direction}' AND ship_date = OLD.ship_date AND total <= 0;
+        """
+
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_summary_ai AFTER INSERT ON {table} BEGIN
+                {add_new}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_summary_ad AFTER DELETE ON {table} BEGIN
+                {remove_old}
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_summary_au
+            AFTER UPDATE OF ship_date, {flag}, pallets ON {table} BEGIN
+                {remove_old}
+                {add_new}
+            END
+        """)
+
+    if is_new:
+        _backfill(cursor)
+
+
+def _aggregate_query(direction: str) -> str:
+    table, flag = SUMMARY_SOURCES[direction]
+    return f"""
+        SELECT '{direction}', ship_date, COUNT(*),
+               SUM({flag} = 1), SUM({flag} = 0), COALESCE(SUM(pallets), 0)
+        FROM {table}
+        WHERE ship_date IS NOT NULL
+        GROUP BY ship_date
+    """
+
+
+def _backfill(cursor):
+    cursor.execute("DELETE FROM daily_shipment_summary")
+    for direction in SUMMARY_SOURCES:
+        cursor.execute(f"""
+            INSERT INTO daily_shipment_summary (direction, ship_date, total, completed, pending, pallets)
+            {_aggregate_query(direction)}
+        """)
+
+
+def rebuild_daily_summary(conn):
+    """Recompute the whole summary table from the shipment tables."""
+    _backfill(conn.cursor())
+    conn.commit()
+
+
+def check_daily_summary(conn) -> list[dict]:
+    """Compare the summary against the raw tables; returns one entry per mismatch."""
+    mismatches = []
+    for direction in SUMMARY_SOURCES:
+        expected = {
+            row[1]: tuple(row[2:])
+            for row in conn.execute(_aggregate_query(direction)).fetchall()
+        }
+        actual = {
+            row[0]: tuple(row[1:])
+            for row in conn.execute("""
+                SELECT ship_date, total, completed, pending, pallets
+                FROM daily_shipment_summary WHERE direction = ?
+            """, (direction,)).fetchall()
+        }
+        for ship_date in sorted(expected.keys() | actual.keys()):
+            exp = expected.get(ship_date, (0, 0, 0, 0.0))
+            act = actual.get(ship_date, (0, 0, 0, 0.0))
+            if exp[:3] != act[:3] or abs(exp[3] - act[3]) > PALLET_TOLERANCE:
+                mismatches.append({
+                    "direction": direction,
+                    "ship_date": ship_date,
+                    "expected": dict(zip(("total", "completed", "pending", "pallets"), exp)),
+                    "actual": dict(zip(("total", "completed", "pending", "pallets"), act)),
+                })
+    return mismatches
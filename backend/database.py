@@ -1,30 +1,250 @@
 """Database connection and setup for SQLite."""
 
+import asyncio
+import functools
+import os
+import re
 import sqlite3
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from datetime import datetime
-from config import DATABASE_PATH
+from typing import Optional
+from cache import create_shipment_version
+from config import (
+    DATABASE_PATH, DB_BUSY_TIMEOUT_MS, DB_CACHE_SIZE_KB, DB_MMAP_SIZE,
+    DB_EXECUTOR_WORKERS,
+)
+from daily_summary import create_daily_summary, rebuild_daily_summary, check_daily_summary
+from search import create_search_index, rebuild_search_index
 
+# Shipment rows the next Excel export must write: never placed on the sheet,
+# never synced, or edited since the last sync. Queries must repeat this text
+# exactly for SQLite to use the matching partial indexes.
+EXPORT_DIRTY_CONDITION = "(excel_row IS NULL OR synced_at IS NULL OR updated_at > synced_at)"
 
-def get_connection():
-    """Get a database connection with row factory."""
-    conn = sqlite3.connect(str(DATABASE_PATH), check_same_thread=False)
+# Per-thread connection pool. Each worker thread keeps one open, tuned
+# connection instead of paying connect/PRAGMA/cold-cache cost per request.
+# A thread's connection is closed when the thread exits (its thread-local
+# entry is dropped) or on close_thread_connection()/close_all_connections().
+_local = threading.local()
+_pool_lock = threading.Lock()
+_pooled_connections = set()
+_pool_generation = 0
+
+
+class PooledConnection(sqlite3.Connection):
+    """A pooled connection that only ends a transaction in the outermost get_db block.
+
+    Nested get_db blocks run inside a savepoint of the enclosing transaction.
+    In a nested block commit() does nothing (the work commits with the
+    outermost block) and rollback() undoes only that block, so a helper that
+    commits its own writes can't publish half of its caller's transaction.
+    """
+
+    depth = 0
+
+    def commit(self):
+        if self.depth <= 1:
+            super().commit()
+
+    def rollback(self):
+        if self.depth <= 1:
+            super().rollback()
+        else:
+            self.execute(f"ROLLBACK TO {self._savepoint()}")
+
+    def _savepoint(self) -> str:
+        return f"get_db_{self.depth}"
+
+
+def get_connection(factory=sqlite3.Connection):
+    """Open a new tuned database connection with row factory."""
+    conn = sqlite3.connect(
+        str(DATABASE_PATH),
+        check_same_thread=False,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        factory=factory,
+    )
     conn.row_factory = sqlite3.Row
+    # WAL lets readers proceed while a writer holds the lock; NORMAL sync is
+    # safe under WAL (only the last transaction can be lost on power failure)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
 
+class _PoolEntry:
+    """A thread's pooled connection; closes it once the thread-local entry is dropped."""
+
+    def __init__(self, conn: "PooledConnection"):
+        self.conn = conn
+        self.pid = os.getpid()
+        self.generation = _pool_generation
+        with _pool_lock:
+            _pooled_connections.add(conn)
+        self.close = weakref.finalize(self, _close_pooled, conn, self.pid)
+
+
+def _close_pooled(conn, pid: int):
+    # A forked child must leave its parent's connection alone: closing it
+    # could checkpoint or delete the parent's WAL
+    if os.getpid() != pid:
+        return
+    with _pool_lock:
+        _pooled_connections.discard(conn)
+    try:
+        conn.close()
+    except sqlite3.Error:
+        pass
+
+
+def get_pooled_connection():
+    """Get this thread's pooled connection, opening it on first use."""
+    entry = getattr(_local, "entry", None)
+    # A forked worker must not reuse its parent's connection, and nothing may
+    # reuse a connection closed by close_all_connections()
+    if entry is None or entry.pid != os.getpid() or entry.generation != _pool_generation:
+        entry = _PoolEntry(get_connection(PooledConnection))
+        _local.entry = entry
+    return entry.conn
+
+
+def in_get_db() -> bool:
+    """Whether the calling thread is inside a get_db block, so its writes wait for that block."""
+    entry = getattr(_local, "entry", None)
+    return entry is not None and entry.conn.depth > 0
+
+
+def close_thread_connection():
+    """Close the calling thread's pooled connection now, e.g. before a helper thread exits."""
+    entry = getattr(_local, "entry", None)
+    if entry is not None:
+        _local.entry = None
+        entry.close()
+
+
+def close_all_connections():
+    """Close every pooled connection (called on application shutdown)."""
+    global _pool_generation
+    with _pool_lock:
+        connections = list(_pooled_connections)
+        _pooled_connections.clear()
+        _pool_generation += 1
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    conn = get_connection()
+    """Context manager for the calling thread's pooled database connection.
+
+    The outermost block commits on success and rolls back on an exception.
+    Nested blocks never commit: they share the outer transaction through a
+    savepoint, which an exception (or rollback()) in the nested block undoes
+    before propagating. Explicit conn.commit() calls only take effect in the
+    outermost block.
+    """
+    conn = get_pooled_connection()
+    conn.depth += 1
+    nested = conn.depth > 1
     try:
-        yield conn
-        conn.commit()
-    except Exception:
-        conn.rollback()
-        raise
+        if nested:
+            # A savepoint outside a transaction would start (and its release
+            # commit) one of its own
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+            conn.execute(f"SAVEPOINT {conn._savepoint()}")
+        try:
+            yield conn
+        except Exception:
+            if nested:
+                # Some errors make SQLite roll back the whole transaction,
+                # savepoint included; the outer block sees the exception too
+                if conn.in_transaction:
+                    conn.execute(f"ROLLBACK TO {conn._savepoint()}")
+                    conn.execute(f"RELEASE {conn._savepoint()}")
+            else:
+                conn.rollback()
+            raise
+        if nested:
+            conn.execute(f"RELEASE {conn._savepoint()}")
+        else:
+            conn.commit()
     finally:
-        conn.close()
+        conn.depth -= 1
+
+
+# Bounded executor for blocking database work. Async routes must never call
+# sqlite3 directly on the event loop; they await run_db() or the helpers below.
+_db_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _db_executor
+    with _executor_lock:
+        if _db_executor is None:
+            _db_executor = ThreadPoolExecutor(
+                max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db"
+            )
+        return _db_executor
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database function on the DB executor and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def _fetch_all(query, params):
+    with get_db() as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def _fetch_one(query, params):
+    with get_db() as conn:
+        return conn.execute(query, params).fetchone()
+
+
+async def fetch_all(query: str, params=()):
+    """Run a SELECT off the event loop and return all rows."""
+    return await run_db(_fetch_all, query, params)
+
+
+async def fetch_one(query: str, params=()):
+    """Run a SELECT off the event loop and return the first row (or None)."""
+    return await run_db(_fetch_one, query, params)
+
+
+async def fetch_value(query: str, params=()):
+    """Run a SELECT off the event loop and return the first column of the first row."""
+    row = await fetch_one(query, params)
+    return row[0] if row else None
+
+
+def shutdown_executor():
+    """Stop the DB executor (called on application shutdown)."""
+    global _db_executor
+    with _executor_lock:
+        executor, _db_executor = _db_executor, None
+    if executor is not None:
+        executor.shutdown(wait=True)
+
+
+def normalize_customer_key(customer: Optional[str]) -> Optional[str]:
+    """Normalize a customer name for indexed matching ("Auto Zone #12" -> "autozone12")."""
+    if not customer:
+        return None
+    return re.sub(r"[^a-z0-9]", "", customer.lower()) or None
 
 
 def init_database():
@@ -72,6 +292,7 @@ def init_database():
                 seal TEXT,
                 notes TEXT,
                 pickup_time TEXT,
+                customer_key TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 synced_at TIMESTAMP,
@@ -85,6 +306,22 @@ def init_database():
         except sqlite3.OperationalError:
             pass  # Column already exists
 
+        # Add customer_key column if it doesn't exist (migration for existing databases)
+        try:
+            cursor.execute("ALTER TABLE outbound_shipments ADD COLUMN customer_key TEXT")
+        except sqlite3.OperationalError:
+            pass  # Column already exists
+
+        # Backfill customer_key for rows written before the column existed
+        cursor.execute("""
+            SELECT id, customer FROM outbound_shipments
+            WHERE customer IS NOT NULL AND customer_key IS NULL
+        """)
+        cursor.executemany(
+            "UPDATE outbound_shipments SET customer_key = ? WHERE id = ?",
+            [(normalize_customer_key(customer), row_id) for row_id, customer in cursor.fetchall()]
+        )
+
         # Carriers table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS carriers (
@@ -131,15 +368,138 @@ def init_database():
             )
         """)
 
+        # Small key/value store for sync bookkeeping (e.g. hashes of the last
+        # imported workbook and its sheets)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Queued/running/finished Excel sync jobs (see services/sync_jobs.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_type TEXT NOT NULL CHECK(job_type IN ('import', 'export')),
+                triggered_by TEXT NOT NULL DEFAULT 'manual',
+                force INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                phase TEXT,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                result TEXT,
+                created_at TIMESTAMP,
+                started_at TIMESTAMP,
+                updated_at TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_sync_jobs_status ON sync_jobs(status, id)")
+
+        # One row per named lease; whoever holds an unexpired lease may sync
+        # (see services/sync_lease.py)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sync_leases (
+                name TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                job_id INTEGER,
+                acquired_at TIMESTAMP,
+                heartbeat_at TIMESTAMP,
+                expires_at TIMESTAMP NOT NULL
+            )
+        """)
+
+        # Hash of each shipment sheet row as last imported; lets an import
+        # skip rows that haven't changed
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS row_fingerprints (
+                sheet TEXT NOT NULL,
+                excel_row INTEGER NOT NULL,
+                hash BLOB NOT NULL,
+                PRIMARY KEY (sheet, excel_row)
+            ) WITHOUT ROWID
+        """)
+
         # Create indexes for better performance
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_inbound_date ON inbound_shipments(ship_date)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_inbound_source ON inbound_shipments(source)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbound_date ON outbound_shipments(ship_date)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbound_source ON outbound_shipments(source)")
+        # Keyset pagination seeks on (shipped, ship_date, id) for outbound; inbound
+        # seeks on (ship_date, id), which idx_inbound_date already covers via rowid
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbound_shipped_date_id ON outbound_shipments(shipped, ship_date, id)")
+        # Customer pallet rollups seek shipped rows by effective date
+        # (actual_date when known, else ship_date) and match the customer
+        # anywhere in the normalized key, which no index can seek on
+        cursor.execute("DROP INDEX IF EXISTS idx_outbound_customer_key")
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_outbound_shipped_effective_date
+            ON outbound_shipments(shipped, COALESCE(actual_date, ship_date), customer_key)
+        """)
+
+        # Excel imports upsert on (source, excel_row). Older databases may hold
+        # duplicates; keep the oldest row linked to the sheet and detach the rest
+        for table, index in (
+            ("inbound_shipments", "idx_inbound_source_excel_row"),
+            ("outbound_shipments", "idx_outbound_source_excel_row"),
+        ):
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (index,))
+            if cursor.fetchone() is None:
+                cursor.execute(f"""
+                    UPDATE {table} SET excel_row = NULL
+                    WHERE excel_row IS NOT NULL AND id NOT IN (
+                        SELECT MIN(id) FROM {table}
+                        WHERE excel_row IS NOT NULL
+                        GROUP BY source, excel_row
+                    )
+                """)
+                cursor.execute(f"CREATE UNIQUE INDEX {index} ON {table}(source, excel_row)")
+
+        # Incremental export reads only dirty rows; these partial indexes hold
+        # just those rows, so the lookup cost tracks the change count
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_inbound_export_dirty
+            ON inbound_shipments(source, id) WHERE {EXPORT_DIRTY_CONDITION}
+        """)
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_outbound_export_dirty
+            ON outbound_shipments(source, id) WHERE {EXPORT_DIRTY_CONDITION}
+        """)
+
+        # Full-text search shadow tables for the `search` filter
+        create_search_index(cursor)
+
+        # Per-day rollups backing /api/dashboard/stats
+        create_daily_summary(cursor)
+
+        # Change counter the dashboard cache checks for other workers' writes
+        create_shipment_version(cursor)
 
         conn.commit()
 
 
 if __name__ == "__main__":
+    import sys
+
     init_database()
     print(f"Database initialized at {DATABASE_PATH}")
+
+    if "--rebuild-search" in sys.argv:
+        with get_db() as conn:
+            rebuild_search_index(conn)
+        print("Search index rebuilt")
+
+    if "--rebuild-summary" in sys.argv:
+        with get_db() as conn:
+            rebuild_daily_summary(conn)
+        print("Daily shipment summary rebuilt")
+
+    if "--check-summary" in sys.argv:
+        with get_db() as conn:
+            mismatches = check_daily_summary(conn)
+        for mismatch in mismatches:
+            print(f"Mismatch: {mismatch}")
+        print(f"Daily shipment summary check: {len(mismatches)} mismatch(es)")
+        sys.exit(1 if mismatches else 0)
@@ -0,0 +1 @@
+"""Local development helpers (run from backend/ with `python -m devtools.<name>`)."""
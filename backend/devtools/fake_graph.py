@@ -0,0 +1,595 @@
+"""Local stand-in for the slice of Microsoft Graph the Excel sync uses.
+
+Serves OneDrive items on 127.0.0.1 so syncs can be exercised without a
+tenant, with network conditions and faults injected on demand:
+
+- GET {host}/{tenant}/v2.0/.well-known/openid-configuration and
+  POST {host}/{tenant}/oauth2/v2.0/token: just enough of the identity
+  platform for msal's client-credentials flow. msal only talks to https
+  authorities, so start the server with tls=True and trust its
+  self-signed certificate (FakeGraph.cert_path) via REQUESTS_CA_BUNDLE.
+  With require_auth, Graph routes answer 401 unless the bearer token was
+  issued here and not revoked since (FakeGraph.revoke_tokens).
+- POST {base}/users/{user}/drive/root:/{path}:/createUploadSession
+- PUT/GET/DELETE {upload_url}: chunk upload, session status, cancel. Chunks
+  must be contiguous, and all but the last a multiple of 320 KiB, or the
+  server answers 416/400 the way Graph does.
+- GET {base}/users/{user}/drive/root:/{path}:/content, and the
+  download.aspx URL ExcelSyncService derives from a sharing link (see
+  FakeGraph.share). Both send ETag/Last-Modified and answer
+  If-None-Match/If-Modified-Since with 304.
+- POST {item}:/workbook/createSession and :/workbook/closeSession, and
+  POST {base}/$batch carrying up to 20 range PATCHes
+  (/workbook/worksheets('{name}')/range(address='A1:C2')) with a
+  workbook-session-id header. Values are interpreted the way Excel does
+  ("" clears, null leaves the cell alone, "'" keeps text as text, numeric
+  text becomes a number) and applied to the stored .xlsx.
+
+Every request waits `latency` seconds first, and with `throttle_every=N`
+every Nth request is answered 429 with Retry-After instead.
+
+Use it in-process:
+
+    with FakeGraph() as graph:
+        graph.faults.append(Fault("disconnect", after_bytes=100_000))
+        ...upload to graph.api_base...
+        graph.files["Load Board.xlsx"]
+        service.sharepoint_url = graph.share("Load Board.xlsx")
+
+point a separate process at it through config (FakeGraph.env), or run it
+standalone and copy the printed settings:
+
+    python -m devtools.fake_graph --tls --file "Load Board.xlsx" --latency-ms 40
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import ssl
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+from urllib.parse import parse_qs, unquote, urlparse
+
+from services.xlsx_patch import XlsxPatcher, column_index
+
+UPLOAD_CHUNK_MULTIPLE = 320 * 1024
+BATCH_MAX_REQUESTS = 20
+
+ITEM_PATH = re.compile(
+    r"^/v1\.0/users/[^/]+/drive/root:/(.+?):/(createUploadSession|content|workbook/createSession|workbook/closeSession)$"
+)
+RANGE_PATH = re.compile(
+    r"^/users/[^/]+/drive/root:/(.+?):/workbook/worksheets\('(.+)'\)/range\(address='([A-Z]+)(\d+):([A-Z]+)(\d+)'\)$"
+)
+OIDC_PATH = re.compile(r"^/([^/]+)/v2\.0/\.well-known/openid-configuration$")
+TOKEN_PATH = re.compile(r"^/([^/]+)/oauth2/v2\.0/token$")
+NUMBER = re.compile(r"^\s*-?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?\s*$")
+UPLOAD_PATH = re.compile(r"^/upload/([0-9a-f]+)$")
+SHARE_DOWNLOAD_PATH = re.compile(r"^/personal/[^/]+/_layouts/15/download\.aspx$")
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+@dataclass
+class Fault:
+    """One injected failure, consumed by the next chunk PUT or $batch sub-request.
+
+    kind "disconnect": store `after_bytes` of the chunk, then drop the
+    connection without answering. kind "status": answer `status` (with
+    Retry-After if `retry_after` is set) and store nothing. kind "expire":
+    discard the upload or workbook session, so this and later requests get
+    404. A None entry in FakeGraph.faults lets one request through untouched.
+    """
+
+    kind: str
+    status: int = 503
+    after_bytes: int = 0
+    retry_after: Optional[int] = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def graph(self) -> "FakeGraph":
+        return self.server.graph
+
+    def _reply(self, status: int, body=None, headers: Optional[dict] = None):
+        data = b"" if body is None else body if isinstance(body, bytes) else json.dumps(body).encode()
+        self.send_response(status)
+        if body is not None and not isinstance(body, bytes):
+            self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, code: str, message: str, headers: Optional[dict] = None):
+        self._reply(status, {"error": {"code": code, "message": message}}, headers)
+
+    def setup(self):
+        super().setup()
+        if isinstance(self.connection, ssl.SSLSocket):
+            # In this connection's thread rather than the accept loop
+            self.connection.do_handshake()
+
+    def _begin(self) -> bool:
+        """Count the request and apply latency and throttling; True if it was answered 429."""
+        self.graph.count(self.command)
+        if self.graph.latency:
+            time.sleep(self.graph.latency)
+        if not self.graph.throttle_now():
+            return False
+        self._read_body()
+        self._error(429, "TooManyRequests", "Throttled", {"Retry-After": self.graph.throttle_retry_after})
+        return True
+
+    def _authorized(self) -> bool:
+        """Check the bearer token on a Graph route, answering 401 if it isn't valid."""
+        if not self.graph.require_auth:
+            return True
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ")
+        if token in self.graph.tokens:
+            return True
+        self._error(401, "InvalidAuthenticationToken", "Access token is missing, expired or revoked")
+        return False
+
+    def _token(self, form: dict):
+        """Client-credentials grant, answered the way the identity platform does."""
+        form = {name: values[0] for name, values in form.items()}
+        if form.get("grant_type") != "client_credentials":
+            return self._reply(400, {"error": "unsupported_grant_type"})
+        if self.graph.credentials and (form.get("client_id"), form.get("client_secret")) != self.graph.credentials:
+            return self._reply(401, {"error": "invalid_client", "error_description": "Invalid client secret"})
+        token = uuid.uuid4().hex
+        with self.graph.lock:
+            self.graph.tokens.add(token)
+            self.graph.token_requests += 1
+        self._reply(200, {
+            "token_type": "Bearer", "expires_in": self.graph.token_lifetime,
+            "ext_expires_in": self.graph.token_lifetime, "access_token": token,
+        })
+
+    def _openid_configuration(self, tenant: str):
+        base = f"{self.graph.base_url}/{tenant}"
+        self._reply(200, {
+            "issuer": f"{base}/v2.0",
+            "authorization_endpoint": f"{base}/oauth2/v2.0/authorize",
+            "token_endpoint": f"{base}/oauth2/v2.0/token",
+        })
+
+    def _read_body(self, limit: Optional[int] = None) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        self.graph.largest_body = max(self.graph.largest_body, length)
+        self.graph.request_bytes += length if limit is None else min(limit, length)
+        return self.rfile.read(length if limit is None else min(limit, length))
+
+    def do_POST(self):
+        if self._begin():
+            return
+        path = urlparse(self.path).path
+        body = self._read_body()
+        match = TOKEN_PATH.match(path)
+        if match:
+            return self._token(parse_qs(body.decode()))
+        if path.startswith("/v1.0/") and not self._authorized():
+            return
+        if path == "/v1.0/$batch":
+            return self._batch(json.loads(body or b"{}").get("requests", []))
+        match = ITEM_PATH.match(path)
+        if not match or match.group(2) == "content":
+            return self._error(404, "itemNotFound", "Unknown route")
+        item = unquote(match.group(1))
+        if match.group(2) == "workbook/createSession":
+            if item not in self.graph.files:
+                return self._error(404, "itemNotFound", "Item not found")
+            session_id = uuid.uuid4().hex
+            self.graph.workbook_sessions[session_id] = item
+            return self._reply(201, {"id": session_id, "persistChanges": True})
+        if match.group(2) == "workbook/closeSession":
+            self.graph.workbook_sessions.pop(self.headers.get("workbook-session-id", ""), None)
+            self.graph.flush(item)
+            return self._reply(204)
+
+        session_id = uuid.uuid4().hex
+        with self.graph.lock:
+            self.graph.sessions[session_id] = {"path": unquote(match.group(1)), "data": bytearray(), "total": None}
+        self._reply(200, {
+            "uploadUrl": f"{self.graph.base_url}/upload/{session_id}",
+            "expirationDateTime": "2099-01-01T00:00:00Z",
+            "nextExpectedRanges": ["0-"],
+        })
+
+    def do_GET(self):
+        if self._begin():
+            return
+        url = urlparse(self.path)
+        match = UPLOAD_PATH.match(url.path)
+        if match:
+            session = self.graph.sessions.get(match.group(1))
+            if session is None:
+                return self._error(404, "itemNotFound", "Upload session not found")
+            return self._reply(200, self._session_status(session))
+        match = OIDC_PATH.match(url.path)
+        if match:
+            return self._openid_configuration(match.group(1))
+        match = ITEM_PATH.match(url.path)
+        if match and match.group(2) == "content":
+            if not self._authorized():
+                return
+            return self._send_file(unquote(match.group(1)))
+        if SHARE_DOWNLOAD_PATH.match(url.path):
+            share_id = parse_qs(url.query).get("share", [""])[0]
+            return self._send_file(self.graph.shares.get(share_id, ""))
+        self._error(404, "itemNotFound", "Unknown route")
+
+    def _batch(self, requests_: list):
+        if len(requests_) > BATCH_MAX_REQUESTS:
+            return self._error(400, "invalidRequest", f"A batch may hold at most {BATCH_MAX_REQUESTS} requests")
+        self.graph.batches += 1
+        self._reply(200, {"responses": [self._batch_request(request) for request in requests_]})
+
+    def _batch_request(self, request: dict) -> dict:
+        """Apply one $batch sub-request; returns its entry in "responses"."""
+        def answer(status: int, body: dict, headers: Optional[dict] = None) -> dict:
+            return {"id": request.get("id"), "status": status, "headers": headers or {}, "body": body}
+
+        def error(status: int, code: str, message: str, headers: Optional[dict] = None) -> dict:
+            return answer(status, {"error": {"code": code, "message": message}}, headers)
+
+        headers = {name.lower(): value for name, value in (request.get("headers") or {}).items()}
+        session_id = headers.get("workbook-session-id")
+        fault = self.graph.next_fault()
+        if fault is not None and fault.kind == "status":
+            retry = {"Retry-After": str(fault.retry_after)} if fault.retry_after is not None else None
+            return error(fault.status, "serviceNotAvailable", "Injected failure", retry)
+        if fault is not None and fault.kind == "expire":
+            self.graph.workbook_sessions.pop(session_id, None)
+
+        match = RANGE_PATH.match(unquote(request.get("url", "")))
+        if request.get("method") != "PATCH" or not match:
+            return error(404, "itemNotFound", "Unknown route")
+        if session_id is not None and session_id not in self.graph.workbook_sessions:
+            return error(404, "invalidSessionId", "Workbook session not found")
+        item, sheet, first_col, top, last_col, bottom = match.groups()
+        sheet = sheet.replace("''", "'")
+        first_col, last_col, top, bottom = column_index(first_col), column_index(last_col), int(top), int(bottom)
+        values = (request.get("body") or {}).get("values") or []
+        if len(values) != bottom - top + 1 or any(len(row) != last_col - first_col + 1 for row in values):
+            return error(400, "invalidArgument", "values do not match the range address")
+
+        edits = [
+            (sheet, top + i, first_col + j, _excel_value(value))
+            for i, row in enumerate(values)
+            for j, value in enumerate(row)
+            if value is not None
+        ]
+        with self.graph.lock:
+            self.graph.pending_edits.setdefault(item, []).extend(edits)
+            self.graph.ranges_written += 1
+            self.graph.cells_written += len(edits)
+        return answer(200, {"address": f"{sheet}!{match.group(3)}{top}:{match.group(5)}{bottom}"})
+
+    def _send_file(self, path: str):
+        """Item content with validators; 304 when the client's copy is current."""
+        self.graph.flush(path)
+        content = self.graph.files.get(path)
+        if content is None:
+            return self._error(404, "itemNotFound", "Item not found")
+        etag = f'"{hashlib.sha1(content).hexdigest()}"'
+        modified = int(self.graph.modified.get(path, self.graph.started))
+        headers = {"ETag": etag, "Last-Modified": formatdate(modified, usegmt=True)}
+
+        if_none_match = self.headers.get("If-None-Match")
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_none_match is not None:
+            not_modified = etag in [tag.strip() for tag in if_none_match.split(",")]
+        elif if_modified_since is not None:
+            not_modified = modified <= parsedate_to_datetime(if_modified_since).timestamp()
+        else:
+            not_modified = False
+        if not_modified:
+            self.graph.not_modified += 1
+            self._reply(304, None, headers)
+        else:
+            self._reply(200, content, headers)
+        hook, self.graph.after_download = self.graph.after_download, None
+        if hook is not None:
+            hook(path)
+
+    def do_DELETE(self):
+        if self._begin():
+            return
+        match = UPLOAD_PATH.match(urlparse(self.path).path)
+        if match and self.graph.sessions.pop(match.group(1), None) is not None:
+            return self._reply(204)
+        self._error(404, "itemNotFound", "Upload session not found")
+
+    def do_PUT(self):
+        if self._begin():
+            return
+        match = UPLOAD_PATH.match(urlparse(self.path).path)
+        session = self.graph.sessions.get(match.group(1)) if match else None
+        if session is None:
+            self._read_body()
+            return self._error(404, "itemNotFound", "Upload session not found")
+
+        fault = self.graph.next_fault()
+        if fault is not None and fault.kind == "expire":
+            self._read_body()
+            self.graph.sessions.pop(match.group(1), None)
+            return self._error(404, "itemNotFound", "Upload session not found")
+        if fault is not None and fault.kind == "status":
+            self._read_body()
+            headers = {"Retry-After": fault.retry_after} if fault.retry_after is not None else None
+            return self._error(fault.status, "serviceNotAvailable", "Injected failure", headers)
+
+        range_match = CONTENT_RANGE.match(self.headers.get("Content-Range", ""))
+        if not range_match:
+            self._read_body()
+            return self._error(400, "invalidRequest", "Missing or invalid Content-Range")
+        start, end, total = (int(value) for value in range_match.groups())
+        if start != len(session["data"]):
+            self._read_body()
+            return self._error(416, "invalidRange", "Range does not start at the next expected byte")
+        if end + 1 < total and (end - start + 1) % UPLOAD_CHUNK_MULTIPLE:
+            self._read_body()
+            return self._error(400, "invalidRange", "Chunk size must be a multiple of 320 KiB")
+
+        if fault is not None and fault.kind == "disconnect":
+            session["data"] += self._read_body(fault.after_bytes)
+            self.graph.bytes_received += fault.after_bytes
+            self.close_connection = True
+            self.connection.close()
+            return
+
+        body = self._read_body()
+        self.graph.bytes_received += len(body)
+        session["data"] += body
+        session["total"] = total
+        if len(session["data"]) < total:
+            return self._reply(202, self._session_status(session))
+
+        self.graph.put_file(session["path"], bytes(session["data"]))
+        self.graph.sessions.pop(match.group(1), None)
+        self._reply(201, {"id": uuid.uuid4().hex, "name": session["path"].rsplit("/", 1)[-1], "size": total})
+
+    @staticmethod
+    def _session_status(session: dict) -> dict:
+        return {"expirationDateTime": "2099-01-01T00:00:00Z", "nextExpectedRanges": [f"{len(session['data'])}-"]}
+
+
+def _excel_value(value):
+    """What Excel stores when a range PATCH sends `value`."""
+    if isinstance(value, str):
+        if value.startswith("'"):
+            return value[1:]
+        if value == "":
+            return None
+        if value.strip().lower() in ("true", "false"):
+            return value.strip().lower() == "true"
+        if NUMBER.match(value):
+            number = float(value)
+            return int(number) if number.is_integer() else number
+    return value
+
+
+class FakeGraph:
+    """The fake server plus its state: stored files, open sessions, pending faults.
+
+    `credentials` is the (client id, secret) pair the token endpoint accepts
+    (any pair when None); `latency`, `throttle_every` and
+    `throttle_retry_after` can be changed while the server runs.
+    """
+
+    def __init__(self, port: int = 0, tls: bool = False, latency: float = 0.0, throttle_every: int = 0,
+                 throttle_retry_after: int = 1, require_auth: bool = False, credentials: Optional[tuple] = None,
+                 token_lifetime: int = 3599):
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.throttle_retry_after = throttle_retry_after
+        self.throttled = 0
+        self._seen = 0
+        self.require_auth = require_auth
+        self.credentials = credentials
+        self.token_lifetime = token_lifetime
+        self.tokens = set()
+        self.token_requests = 0
+        self.files = {}
+        self.modified = {}
+        self.shares = {}
+        self.started = time.time()
+        self.not_modified = 0
+        self.workbook_sessions = {}
+        self.pending_edits = {}
+        self.batches = 0
+        self.ranges_written = 0
+        self.cells_written = 0
+        self.sessions = {}
+        self.faults = []
+        self.requests = {}
+        self.bytes_received = 0
+        self.request_bytes = 0
+        self.largest_body = 0
+        # Called once with the item path right after the next download,
+        # e.g. to simulate someone editing in Excel Online mid-export
+        self.after_download = None
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.graph = self
+        self._thread = None
+        self._tmp = tempfile.TemporaryDirectory(prefix="fake-graph-")
+        self.cert_path = self._enable_tls() if tls else None
+
+    def _enable_tls(self) -> str:
+        """Serve https with a fresh self-signed certificate for 127.0.0.1; returns its path."""
+        import datetime
+        import ipaddress
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.x509.oid import NameOID
+
+        key = ec.generate_private_key(ec.SECP256R1())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "fake-graph")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(minutes=5))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName(
+                [x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]
+            ), critical=False)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256())
+        )
+        cert_path, key_path = Path(self._tmp.name) / "cert.pem", Path(self._tmp.name) / "key.pem"
+        cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+        key_path.write_bytes(key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ))
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_path, key_path)
+        self._server.socket = context.wrap_socket(
+            self._server.socket, server_side=True, do_handshake_on_connect=False
+        )
+        return str(cert_path)
+
+    @property
+    def base_url(self) -> str:
+        scheme = "https" if self.cert_path else "http"
+        return f"{scheme}://127.0.0.1:{self._server.server_address[1]}"
+
+    @property
+    def api_base(self) -> str:
+        """What to use in place of https://graph.microsoft.com/v1.0."""
+        return f"{self.base_url}/v1.0"
+
+    def put_file(self, path: str, content: bytes):
+        """Store an item as if it had just been uploaded (new ETag and Last-Modified)."""
+        with self.lock:
+            self.files[path] = content
+            self.modified[path] = time.time()
+
+    def edit(self, path: str, sheet: str, row: int, column: int, value):
+        """Change one cell of a stored workbook, as a user in Excel Online would."""
+        with self.lock:
+            self.pending_edits.setdefault(path, []).append((sheet, row, column, value))
+        self.flush(path)
+
+    def flush(self, path: str):
+        """Apply buffered range edits to the stored workbook."""
+        with self.lock:
+            edits = self.pending_edits.pop(path, None)
+        if not edits:
+            return
+        with tempfile.TemporaryDirectory() as tmp:
+            source, patched = Path(tmp) / "source.xlsx", Path(tmp) / "patched.xlsx"
+            source.write_bytes(self.files[path])
+            with XlsxPatcher(source) as patcher:
+                for sheet, row, column, value in edits:
+                    patcher.set_cell(sheet, row, column, value)
+                patcher.save(patched)
+            self.put_file(path, patched.read_bytes())
+
+    def share(self, path: str) -> str:
+        """A OneDrive-style sharing link for `path`, usable as SHAREPOINT_EXCEL_URL."""
+        share_id = uuid.uuid4().hex
+        self.shares[share_id] = path
+        return f"{self.base_url}/:x:/g/personal/someone/{share_id}?e=fake"
+
+    def env(self, path: str, tenant: str = "tenant", user: str = "someone") -> dict:
+        """Environment variables that point a sync process at this server for `path`."""
+        client_id, client_secret = self.credentials or ("client", "secret")
+        env = {
+            "GRAPH_AUTHORITY_HOST": self.base_url,
+            "GRAPH_API_BASE": self.api_base,
+            "GRAPH_TENANT_ID": tenant,
+            "GRAPH_CLIENT_ID": client_id,
+            "GRAPH_CLIENT_SECRET": client_secret,
+            "SHAREPOINT_EXCEL_URL": self.share(path),
+            "SHAREPOINT_FILE_PATH": path,
+            "SHAREPOINT_USER": user,
+        }
+        if self.cert_path:
+            env["REQUESTS_CA_BUNDLE"] = self.cert_path
+        return env
+
+    def revoke_tokens(self):
+        """Invalidate every issued token, as if the secret had been rotated."""
+        with self.lock:
+            self.tokens.clear()
+
+    def throttle_now(self) -> bool:
+        with self.lock:
+            self._seen += 1
+            throttled = bool(self.throttle_every) and self._seen % self.throttle_every == 0
+            self.throttled += throttled
+        return throttled
+
+    def count(self, method: str):
+        with self.lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+
+    def next_fault(self) -> Optional[Fault]:
+        with self.lock:
+            return self.faults.pop(0) if self.faults else None
+
+    def start(self) -> "FakeGraph":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-graph", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._tmp.cleanup()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tls", action="store_true", help="serve https (needed for msal's token requests)")
+    parser.add_argument("--file", type=Path, help="workbook to serve, under its file name")
+    parser.add_argument("--latency-ms", type=int, default=0, help="delay before answering each request")
+    parser.add_argument("--throttle-every", type=int, default=0, help="answer every Nth request with 429")
+    parser.add_argument("--require-auth", action="store_true", help="check bearer tokens on Graph routes")
+    args = parser.parse_args()
+    graph = FakeGraph(args.port, tls=args.tls, latency=args.latency_ms / 1000,
+                      throttle_every=args.throttle_every, require_auth=args.require_auth)
+    print(f"Fake Graph listening on {graph.api_base}")
+    if args.file:
+        graph.put_file(args.file.name, args.file.read_bytes())
+        for name, value in graph.env(args.file.name).items():
+            print(f"{name}={value}")
+    try:
+        graph._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        graph.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""In-process change event broker behind the /api/events SSE stream.
+
+Write paths (shipment routers, Excel sync) publish compact events from
+whatever thread they run on; the broker numbers them, keeps a short replay
+history for `Last-Event-ID` resumes and fans them out to every connected
+stream on the event loop.
+
+Events are per process. Stats deltas are also produced by a periodic
+watcher that reads the versioned dashboard cache, so changes committed by
+other gunicorn workers (and the midnight rollover) still reach clients.
+"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+# Seconds between SSE heartbeat comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+# Seconds between stats checks by the background watcher
+STATS_WATCH_SECONDS = 30
+
+# Events kept for Last-Event-ID replay
+HISTORY_SIZE = 1000
+
+# Events buffered per subscriber before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 500
+
+
+class EventBroker:
+    """Thread-safe publisher with replay history and asyncio subscribers."""
+
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        # Ids are "<boot>-<seq>" so a resume against a restarted process is
+        # detected instead of silently skipping events
+        self._boot = str(int(time.time()))
+        self._seq = 0
+        self._history = deque(maxlen=history_size)
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._loop = None
+        self._last_stats = None
+
+    def bind_loop(self, loop: asyncio.AbstractEventLoop):
+        """Attach the event loop that owns the subscriber queues."""
+        self._loop = loop
+
+    def publish(self, event_type: str, data: dict):
+        """Record an event and deliver it to all subscribers (any thread)."""
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+            event = (f"{self._boot}-{seq}", event_type, data)
+            self._history.append(event)
+
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._fanout, seq, event)
+
+    def publish_stats(self, stats: dict):
+        """Publish only the dashboard stats fields that changed since last time."""
+        with self._lock:
+            previous = self._last_stats
+            self._last_stats = dict(stats)
+        if previous is None:
+            return
+        delta = {k: v for k, v in stats.items() if previous.get(k) != v}
+        if delta:
+            self.publish("stats", delta)
+
+    def _fanout(self, seq: int, event):
+        for queue in list(self._subscribers):
+            # Published before this queue subscribed: already in its replay
+            # (or predates the stream), but the fanout was still in flight
+            if seq <= queue.subscribed_at:
+                continue
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too far behind; the stream tells the client to resync
+                queue.overflowed = True
+
+    def subscribe(self, last_event_id: Optional[str] = None):
+        """Register a subscriber queue (event loop thread only).
+
+        Returns (queue, replay) where replay lists the events after
+        `last_event_id`, or is None if they are no longer available and the
+        client must reload its state.
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        queue.overflowed = False
+
+        with self._lock:
+            replay = []
+            if last_event_id:
+                boot, _, seq = last_event_id.partition("-")
+                history = list(self._history)
+                oldest = int(history[0][0].split("-")[1]) if history else self._seq + 1
+                if boot != self._boot or not seq.isdigit() or int(seq) < oldest - 1:
+                    replay = None
+                else:
+                    replay = [e for e in history if int(e[0].split("-")[1]) > int(seq)]
+            queue.subscribed_at = self._seq
+            self._subscribers.add(queue)
+
+        return queue, replay
+
+    def unsubscribe(self, queue):
+        """Remove a subscriber queue."""
+        self._subscribers.discard(queue)
+
+
+def format_sse(event_id: Optional[str], event_type: str, data: dict) -> str:
+    """Serialize one event in text/event-stream format."""
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, default=str, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+broker = EventBroker()
+
+
+def publish_shipment_change(direction: str, action: str, shipment_id: int, shipment: Optional[dict] = None):
+    """Publish a shipment created/updated/deleted event plus any stats delta."""
+    data = {"direction": direction, "id": shipment_id}
+    if shipment is not None:
+        data["shipment"] = shipment
+    broker.publish(f"shipment.{action}", data)
+    publish_current_stats()
+
+
+def publish_current_stats():
+    """Recompute (cached) dashboard stats and publish what changed (blocking)."""
+    from routers.dashboard import current_stats
+    broker.publish_stats(current_stats())
+
+
+async def watch_stats():
+    """Background task publishing stats deltas for changes made elsewhere."""
+    from database import run_db
+
+    while True:
+        try:
+            await run_db(publish_current_stats)
+        except Exception as e:
+            print(f"Stats watcher error: {e}")
+        await asyncio.sleep(STATS_WATCH_SECONDS)
@@ -1,15 +1,20 @@
 """FastAPI application entry point for Load Board."""
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
+from cache import dashboard_cache
 from config import CORS_ORIGINS
-from database import init_database
-from routers import inbound, outbound, reference, dashboard, sync
+from database import init_database, close_all_connections, shutdown_executor
+from events import broker, watch_stats
+from routers import inbound, outbound, reference, dashboard, sync, stream
+from services.sync_jobs import job_runner
 
 # Static files directory for frontend
 STATIC_DIR = Path(__file__).parent / "static"
@@ -17,11 +22,27 @@ STATIC_DIR = Path(__file__).parent / "static"
 # Initialize the database
 init_database()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup/shutdown hooks."""
+    broker.bind_loop(asyncio.get_running_loop())
+    stats_watcher = asyncio.create_task(watch_stats())
+    job_runner.start()
+    yield
+    stats_watcher.cancel()
+    job_runner.stop()
+    shutdown_executor()
+    close_all_connections()
+    dashboard_cache.close()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Load Board API",
     description="API for managing the Load Board shipment tracking system",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -39,6 +60,7 @@ app.include_router(outbound.router, prefix="/api/outbound", tags=["Outbound Ship
 app.include_router(reference.router, prefix="/api/reference", tags=["Reference Data"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["Dashboard"])
 app.include_router(sync.router, prefix="/api/sync", tags=["Excel Sync"])
+app.include_router(stream.router, prefix="/api/events", tags=["Live Updates"])
 
 
 @app.get("/api/health")
@@ -183,6 +183,25 @@ class SyncResult(BaseModel):
     message: str
     records_processed: int = 0
     errors: list[str] = []
+    timings: dict[str, float] = {}  # seconds per sheet/phase
+    unchanged: bool = False  # import found nothing new and wrote nothing
+    unchanged_sheets: list[str] = []  # sheets skipped because their content hash matched
+
+
+class SyncJob(BaseModel):
+    id: int
+    job_type: str  # import, export
+    triggered_by: str  # manual, schedule
+    force: bool = False
+    status: str  # queued, running, succeeded, failed
+    phase: Optional[str] = None
+    progress: float = 0  # 0..1
+    message: Optional[str] = None
+    result: Optional[SyncResult] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 
 # Pagination
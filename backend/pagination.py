@@ -0,0 +1,52 @@
+"""Keyset (cursor) pagination helpers for shipment listings."""
+
+import base64
+import binascii
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(values: list) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor."""
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor produced by encode_cursor, rejecting malformed input."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size or not isinstance(values[-1], int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def date_id_seek(last_date, last_id: int) -> list[tuple[str, list]]:
+    """Seek conditions that continue a `ship_date DESC, id DESC` ordering.
+
+    SQLite sorts NULL dates last in descending order, so the seek is split into
+    an index-friendly row-value range over dated rows followed by the undated
+    rows. Each segment is queried in order until the page is full.
+    """
+    if last_date is None:
+        return [("ship_date IS NULL AND id < ?", [last_id])]
+    return [
+        ("(ship_date, id) < (?, ?)", [last_date, last_id]),
+        ("ship_date IS NULL", []),
+    ]
+
+
+def fetch_keyset_page(conn, base_query: str, params: list, segments: list, order_by: str, page_size: int):
+    """Run seek segments in order and return (rows, has_more) for one page."""
+    rows = []
+    for clause, segment_params in segments:
+        remaining = page_size + 1 - len(rows)
+        if remaining <= 0:
+            break
+        query = f"{base_query} AND {clause} ORDER BY {order_by} LIMIT ?"
+        rows.extend(conn.execute(query, params + segment_params + [remaining]).fetchall())
+    return rows[:page_size], len(rows) > page_size
@@ -1,9 +1,12 @@
 """Dashboard and analytics endpoints."""
 
+import functools
 from datetime import datetime, date, timedelta
-from fastapi import APIRouter
+from typing import Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
 
-from database import get_db
+from cache import dashboard_cache
+from database import get_db, run_db, normalize_customer_key
 from models import DashboardStats
 
 router = APIRouter()
@@ -14,103 +17,70 @@ def row_to_dict(row):
     return dict(zip(row.keys(), row))
 
 
+async def _cached(endpoint: str, compute, *args):
+    """Serve a response from the versioned dashboard cache (see cache.py)."""
+    return await run_db(
+        dashboard_cache.get_or_compute, (endpoint, *args), functools.partial(compute, *args)
+    )
+
+
 @router.get("/stats", response_model=DashboardStats)
 async def get_dashboard_stats():
     """Get dashboard statistics."""
+    return await _cached("stats", _get_dashboard_stats)
+
+
+def _get_dashboard_stats() -> DashboardStats:
     today = date.today().isoformat()
     week_ago = (date.today() - timedelta(days=7)).isoformat()
 
     with get_db() as conn:
         cursor = conn.cursor()
 
-        # Today's inbound
-        cursor.execute(
-            "SELECT COUNT(*) FROM inbound_shipments WHERE ship_date = ?",
-            (today,)
-        )
-        total_inbound_today = cursor.fetchone()[0]
-
-        # Today's outbound
-        cursor.execute(
-            "SELECT COUNT(*) FROM outbound_shipments WHERE ship_date = ?",
-            (today,)
-        )
-        total_outbound_today = cursor.fetchone()[0]
-
-        # Pending inbound (today, not received)
-        cursor.execute(
-            "SELECT COUNT(*) FROM inbound_shipments WHERE ship_date = ? AND received = 0",
-            (today,)
-        )
-        pending_inbound = cursor.fetchone()[0]
-
-        # Pending outbound (today, not shipped)
-        cursor.execute(
-            "SELECT COUNT(*) FROM outbound_shipments WHERE ship_date = ? AND shipped = 0",
-            (today,)
-        )
-        pending_outbound = cursor.fetchone()[0]
-
-        # Completed inbound today
-        cursor.execute(
-            "SELECT COUNT(*) FROM inbound_shipments WHERE ship_date = ? AND received = 1",
-            (today,)
-        )
-        completed_inbound_today = cursor.fetchone()[0]
-
-        # Completed outbound today
-        cursor.execute(
-            "SELECT COUNT(*) FROM outbound_shipments WHERE ship_date = ? AND shipped = 1",
-            (today,)
-        )
-        completed_outbound_today = cursor.fetchone()[0]
-
-        # Overdue inbound (past date, not received)
-        cursor.execute(
-            "SELECT COUNT(*) FROM inbound_shipments WHERE ship_date < ? AND received = 0",
-            (today,)
-        )
-        overdue_inbound = cursor.fetchone()[0]
+        # One pass over the trigger-maintained daily rollups (see daily_summary.py)
+        cursor.execute("""
+            SELECT direction,
+                   COALESCE(SUM(CASE WHEN ship_date = :today THEN total END), 0),
+                   COALESCE(SUM(CASE WHEN ship_date = :today THEN pending END), 0),
+                   COALESCE(SUM(CASE WHEN ship_date = :today THEN completed END), 0),
+                   COALESCE(SUM(CASE WHEN ship_date < :today THEN pending END), 0),
+                   COALESCE(SUM(CASE WHEN ship_date >= :week_ago THEN total END), 0)
+            FROM daily_shipment_summary
+            GROUP BY direction
+        """, {"today": today, "week_ago": week_ago})
+        totals = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        inbound = totals.get("inbound", (0, 0, 0, 0, 0))
+        outbound = totals.get("outbound", (0, 0, 0, 0, 0))
 
-        # Overdue outbound (past date, not shipped)
-        cursor.execute(
-            "SELECT COUNT(*) FROM outbound_shipments WHERE ship_date < ? AND shipped = 0",
-            (today,)
+        return DashboardStats(
+            total_inbound_today=inbound[0],
+            total_outbound_today=outbound[0],
+            pending_inbound=inbound[1],
+            pending_outbound=outbound[1],
+            completed_inbound_today=inbound[2],
+            completed_outbound_today=outbound[2],
+            overdue_inbound=inbound[3],
+            overdue_outbound=outbound[3],
+            shipments_this_week=inbound[4] + outbound[4],
         )
-        overdue_outbound = cursor.fetchone()[0]
 
-        # This week's shipments
-        cursor.execute(
-            """SELECT COUNT(*) FROM (
-                SELECT id FROM inbound_shipments WHERE ship_date >= ?
-                UNION ALL
-                SELECT id FROM outbound_shipments WHERE ship_date >= ?
-            )""",
-            (week_ago, week_ago)
-        )
-        shipments_this_week = cursor.fetchone()[0]
 
-        return DashboardStats(
-            total_inbound_today=total_inbound_today,
-            total_outbound_today=total_outbound_today,
-            pending_inbound=pending_inbound,
-            pending_outbound=pending_outbound,
-            completed_inbound_today=completed_inbound_today,
-            completed_outbound_today=completed_outbound_today,
-            overdue_inbound=overdue_inbound,
-            overdue_outbound=overdue_outbound,
-            shipments_this_week=shipments_this_week,
-        )
+def current_stats() -> dict:
+    """Dashboard stats as a plain dict, served from the cache (blocking)."""
+    return dashboard_cache.get_or_compute(("stats",), _get_dashboard_stats).model_dump()
 
 
 @router.get("/shipments-by-carrier")
 async def get_shipments_by_carrier():
     """Get shipment counts grouped by carrier for charts."""
-    with get_db() as conn:
-        cursor = conn.cursor()
+    return await _cached("shipments-by-carrier", _get_shipments_by_carrier)
+
 
+def _get_shipments_by_carrier():
+    with get_db() as conn:
         # Combined inbound and outbound by carrier
-        cursor.execute("""
+        rows = conn.execute("""
             SELECT carrier, COUNT(*) as count FROM (
                 SELECT carrier FROM inbound_shipments WHERE carrier IS NOT NULL
                 UNION ALL
@@ -119,68 +89,182 @@ async def get_shipments_by_carrier():
             GROUP BY carrier
             ORDER BY count DESC
             LIMIT 10
-        """)
-        rows = cursor.fetchall()
+        """).fetchall()
 
-        return [{"name": row[0] or "Unknown", "value": row[1]} for row in rows]
+    return [{"name": row[0] or "Unknown", "value": row[1]} for row in rows]
 
 
 @router.get("/shipments-by-customer")
 async def get_shipments_by_customer():
     """Get outbound shipment counts grouped by customer."""
-    with get_db() as conn:
-        cursor = conn.cursor()
+    return await _cached("shipments-by-customer", _get_shipments_by_customer)
 
-        cursor.execute("""
+
+def _get_shipments_by_customer():
+    with get_db() as conn:
+        rows = conn.execute("""
             SELECT customer, COUNT(*) as count
             FROM outbound_shipments
             WHERE customer IS NOT NULL
             GROUP BY customer
             ORDER BY count DESC
             LIMIT 10
-        """)
-        rows = cursor.fetchall()
-
-        return [{"name": row[0] or "Unknown", "value": row[1]} for row in rows]
+        """).fetchall()
+
+    return [{"name": row[0] or "Unknown", "value": row[1]} for row in rows]
+
+
+# SQL expression mapping ship_date to the first day of its bucket
+VOLUME_BUCKETS = {
+    "day": "ship_date",
+    "week": "date(ship_date, 'weekday 0', '-6 days')",  # Monday-start weeks
+    "month": "strftime('%Y-%m-01', ship_date)",
+}
+
+VOLUME_LABELS = {
+    "day": "%b %d",
+    "week": "Wk of %b %d",
+    "month": "%b %Y",
+}
+
+# Breakdown column per direction; inbound shipments have no customer
+VOLUME_BREAKDOWNS = {
+    "carrier": {"inbound": "carrier", "outbound": "carrier"},
+    "customer": {"outbound": "customer"},
+    "source": {"inbound": "source", "outbound": "source"},
+}
+
+MAX_VOLUME_BUCKETS = 1000
+
+
+def _bucket_starts(start: date, end: date, granularity: str) -> list[date]:
+    """Every bucket start between start and end, used to fill gaps with zeros."""
+    if granularity == "day":
+        current = start
+    elif granularity == "week":
+        current = start - timedelta(days=start.weekday())
+    else:
+        current = start.replace(day=1)
+
+    buckets = []
+    while current <= end:
+        buckets.append(current)
+        if len(buckets) > MAX_VOLUME_BUCKETS:
+            raise HTTPException(status_code=400, detail="Date range too large for this granularity")
+        if granularity == "day":
+            current += timedelta(days=1)
+        elif granularity == "week":
+            current += timedelta(days=7)
+        elif current.month == 12:
+            current = current.replace(year=current.year + 1, month=1)
+        else:
+            current = current.replace(month=current.month + 1)
+    return buckets
+
+
+@router.get("/volume")
+async def get_volume(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: Literal["day", "week", "month"] = "day",
+    breakdown: Optional[Literal["carrier", "customer", "source"]] = None,
+):
+    """Get inbound/outbound shipment volume per day, week or month.
+
+    Defaults to the last 7 days, 12 weeks or 12 months ending today. Buckets
+    at the edges of the range only count shipments inside [start, end].
+    """
+    end = end or date.today()
+    if start is None:
+        if granularity == "day":
+            start = end - timedelta(days=6)
+        elif granularity == "week":
+            start = end - timedelta(weeks=11)
+        else:
+            months_back = end.year * 12 + end.month - 1 - 11
+            start = date(months_back // 12, months_back % 12 + 1, 1)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be on or before end")
+
+    return await _cached("volume", _get_volume, start, end, granularity, breakdown)
+
+
+def _get_volume(start: date, end: date, granularity: str, breakdown: Optional[str]):
+    buckets = _bucket_starts(start, end, granularity)
+    bucket_sql = VOLUME_BUCKETS[granularity]
+    range_params = (start.isoformat(), end.isoformat())
+
+    counts = {"inbound": {}, "outbound": {}}
+    breakdowns = {"inbound": {}, "outbound": {}}
 
-
-@router.get("/weekly-volume")
-async def get_weekly_volume():
-    """Get shipment volume by day for the last 7 days."""
     with get_db() as conn:
         cursor = conn.cursor()
 
-        result = []
-        for i in range(6, -1, -1):
-            day = date.today() - timedelta(days=i)
-            day_str = day.isoformat()
-            day_name = day.strftime("%a")
+        if breakdown is None:
+            # Plain totals come straight from the per-day rollups
+            cursor.execute(f"""
+                SELECT direction, {bucket_sql} AS bucket, SUM(total)
+                FROM daily_shipment_summary
+                WHERE ship_date BETWEEN ? AND ?
+                GROUP BY direction, bucket
+            """, range_params)
+            for direction, bucket, total in cursor.fetchall():
+                counts[direction][bucket] = total
+        else:
+            for direction, table in (("inbound", "inbound_shipments"), ("outbound", "outbound_shipments")):
+                column = VOLUME_BREAKDOWNS[breakdown].get(direction)
+                key_sql = column if column else "NULL"
+                cursor.execute(f"""
+                    SELECT {bucket_sql} AS bucket, {key_sql} AS key, COUNT(*)
+                    FROM {table}
+                    WHERE ship_date BETWEEN ? AND ?
+                    GROUP BY bucket, key
+                """, range_params)
+                for bucket, key, total in cursor.fetchall():
+                    counts[direction][bucket] = counts[direction].get(bucket, 0) + total
+                    if column:
+                        by_key = breakdowns[direction].setdefault(bucket, {})
+                        by_key[key or "Unknown"] = by_key.get(key or "Unknown", 0) + total
+
+    result = []
+    for bucket in buckets:
+        key = bucket.isoformat()
+        point = {
+            "name": bucket.strftime(VOLUME_LABELS[granularity]),
+            "date": key,
+            "inbound": counts["inbound"].get(key, 0),
+            "outbound": counts["outbound"].get(key, 0),
+        }
+        if breakdown is not None:
+            point["breakdown"] = {
+                direction: breakdowns[direction].get(key, {})
+                for direction in VOLUME_BREAKDOWNS[breakdown]
+            }
+        result.append(point)
+
+    return result
 
-            cursor.execute(
-                "SELECT COUNT(*) FROM inbound_shipments WHERE ship_date = ?",
-                (day_str,)
-            )
-            inbound = cursor.fetchone()[0]
 
-            cursor.execute(
-                "SELECT COUNT(*) FROM outbound_shipments WHERE ship_date = ?",
-                (day_str,)
-            )
-            outbound = cursor.fetchone()[0]
+@router.get("/weekly-volume")
+async def get_weekly_volume():
+    """Get shipment volume by day for the last 7 days."""
+    return await _cached("weekly-volume", _get_weekly_volume, date.today())
 
-            result.append({
-                "name": day_name,
-                "date": day_str,
-                "inbound": inbound,
-                "outbound": outbound,
-            })
 
-        return result
+def _get_weekly_volume(today: date):
+    result = _get_volume(today - timedelta(days=6), today, "day", None)
+    for point in result:
+        point["name"] = date.fromisoformat(point["date"]).strftime("%a")
+    return result
 
 
 @router.get("/today")
 async def get_todays_shipments():
     """Get all shipments scheduled for today."""
+    return await _cached("today", _get_todays_shipments)
+
+
+def _get_todays_shipments():
     today = date.today().isoformat()
 
     with get_db() as conn:
@@ -210,6 +294,10 @@ async def get_todays_shipments():
 @router.get("/overdue")
 async def get_overdue_shipments():
     """Get all overdue shipments (past date, not completed)."""
+    return await _cached("overdue", _get_overdue_shipments)
+
+
+def _get_overdue_shipments():
     today = date.today().isoformat()
 
     with get_db() as conn:
@@ -235,64 +323,75 @@ async def get_overdue_shipments():
         }
 
 
-@router.get("/autozone-pallets")
-async def get_autozone_pallets():
-    """Get AutoZone pallet counts for current month and all previous months this year."""
-    today = date.today()
-    current_year = today.year
+@router.get("/customer-pallets")
+async def get_customer_pallets(
+    customer: str = Query(..., min_length=1),
+    year: Optional[int] = Query(None, ge=2000, le=2100),
+):
+    """Get shipped pallets per month for a customer in one year.
+
+    The customer is matched anywhere in its normalized key, so "Auto Zone"
+    covers "AutoZone", "AUTO ZONE", "AutoZone #1234" and "Store 12 - AutoZone".
+    """
+    return await _cached("customer-pallets", _get_customer_pallets, customer, year or date.today().year)
 
-    # Current month boundaries
-    current_month_start = today.replace(day=1).isoformat()
-    current_month_name = today.strftime("%B")
-    current_month_num = today.month
+
+def _get_customer_pallets(customer: str, year: int):
+    # Normalized keys are plain [a-z0-9], so a substring test needs no escaping
+    key = normalize_customer_key(customer) or ""
 
     with get_db() as conn:
         cursor = conn.cursor()
 
-        # Current month AutoZone pallets (shipped only)
-        # Match "Auto Zone" or "AutoZone" (case insensitive)
+        # One grouped pass over the year's shipped rows; the substring test
+        # runs on the key stored in idx_outbound_shipped_effective_date
         cursor.execute("""
-            SELECT COALESCE(SUM(pallets), 0)
+            SELECT CAST(strftime('%m', COALESCE(actual_date, ship_date)) AS INTEGER) AS month,
+                   COALESCE(SUM(pallets), 0)
             FROM outbound_shipments
-            WHERE LOWER(REPLACE(customer, ' ', '')) LIKE '%autozone%'
+            WHERE instr(customer_key, ?) > 0
               AND shipped = 1
-              AND (actual_date >= ? OR (actual_date IS NULL AND ship_date >= ?))
-        """, (current_month_start, current_month_start))
-        current_month_pallets = cursor.fetchone()[0] or 0
-
-        # Get all previous months this year (January through previous month)
-        previous_months = []
-        for month_num in range(1, current_month_num):
-            # Calculate month boundaries
-            month_start = date(current_year, month_num, 1)
-            if month_num == 12:
-                month_end = date(current_year, 12, 31)
-            else:
-                month_end = date(current_year, month_num + 1, 1) - timedelta(days=1)
-
-            month_name = month_start.strftime("%B")
-
-            cursor.execute("""
-                SELECT COALESCE(SUM(pallets), 0)
-                FROM outbound_shipments
-                WHERE LOWER(REPLACE(customer, ' ', '')) LIKE '%autozone%'
-                  AND shipped = 1
-                  AND (
-                    (actual_date >= ? AND actual_date <= ?)
-                    OR (actual_date IS NULL AND ship_date >= ? AND ship_date <= ?)
-                  )
-            """, (month_start.isoformat(), month_end.isoformat(),
-                  month_start.isoformat(), month_end.isoformat()))
-            month_pallets = cursor.fetchone()[0] or 0
-
-            previous_months.append({
-                "month_name": month_name,
-                "pallets": float(month_pallets),
-            })
-
-        return {
-            "current_month_name": current_month_name,
-            "current_month_pallets": float(current_month_pallets),
-            "previous_months": previous_months,
-            "year": current_year,
+              AND COALESCE(actual_date, ship_date) BETWEEN ? AND ?
+            GROUP BY month
+        """, (key, f"{year}-01-01", f"{year}-12-31"))
+        pallets_by_month = {month: pallets for month, pallets in cursor.fetchall()}
+
+    months = [
+        {
+            "month": month_num,
+            "month_name": date(year, month_num, 1).strftime("%B"),
+            "pallets": float(pallets_by_month.get(month_num, 0)),
         }
+        for month_num in range(1, 13)
+    ]
+
+    return {
+        "customer": customer,
+        "year": year,
+        "months": months,
+        "total_pallets": sum(m["pallets"] for m in months),
+    }
+
+
+@router.get("/autozone-pallets")
+async def get_autozone_pallets():
+    """Get AutoZone pallet counts for current month and all previous months this year."""
+    today = date.today()
+    rollup = await _cached("customer-pallets", _get_customer_pallets, "AutoZone", today.year)
+    months = rollup["months"]
+
+    return {
+        "current_month_name": today.strftime("%B"),
+        "current_month_pallets": months[today.month - 1]["pallets"],
+        "previous_months": [
+            {"month_name": m["month_name"], "pallets": m["pallets"]}
+            for m in months[:today.month - 1]
+        ],
+        "year": today.year,
+    }
+
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """Get hit/miss counters for the dashboard response cache."""
+    return dashboard_cache.stats()
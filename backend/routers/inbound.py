@@ -1,15 +1,19 @@
 """Inbound shipment endpoints."""
 
 from datetime import datetime, date
-from typing import Optional
+from typing import Literal, Optional
 from fastapi import APIRouter, HTTPException, Query
 
-from database import get_db
+from cache import dashboard_cache
+from database import get_db, run_db, fetch_all, fetch_one, fetch_value
 from models import (
     InboundShipment,
     InboundShipmentCreate,
     InboundShipmentUpdate,
 )
+from events import publish_shipment_change
+from search import search_clause, ranked_source
+from pagination import encode_cursor, decode_cursor, date_id_seek, fetch_keyset_page
 
 router = APIRouter()
 
@@ -29,94 +33,128 @@ async def get_inbound_shipments(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    sort: Literal["date", "relevance"] = "date",
 ):
-    """Get all inbound shipments with filtering and pagination."""
-    with get_db() as conn:
-        cursor = conn.cursor()
+    """Get all inbound shipments with filtering and pagination.
+
+    Pass `cursor` (empty for the first page, then the returned `next_cursor`)
+    to page by keyset instead of OFFSET; `include_total=false` skips the count.
+    With `search`, `sort=relevance` orders page results by FTS rank.
+    """
+    # Build filters
+    where = "1=1"
+    params = []
+
+    if source:
+        where += " AND source = ?"
+        params.append(source)
+
+    if carrier:
+        where += " AND carrier LIKE ?"
+        params.append(f"%{carrier}%")
+
+    if received is not None:
+        where += " AND received = ?"
+        params.append(1 if received else 0)
+
+    if start_date:
+        where += " AND ship_date >= ?"
+        params.append(start_date.isoformat())
+
+    if end_date:
+        where += " AND ship_date <= ?"
+        params.append(end_date.isoformat())
+
+    # Search goes through the FTS index (see search.py); kept separate from
+    # the other filters so relevance ordering can join on the matches instead
+    search_where, search_params = "", []
+    if search:
+        clause, search_params = search_clause("inbound_shipments", search)
+        search_where = f" AND {clause}"
+
+    # Get total count
+    total = None
+    if include_total:
+        total = await fetch_value(
+            f"SELECT COUNT(*) FROM inbound_shipments WHERE {where}{search_where}", params + search_params
+        )
+
+    if cursor is not None:
+        return await run_db(_get_inbound_page_by_cursor, where + search_where, params + search_params, cursor, page_size, total)
+
+    # Add pagination
+    ranked = ranked_source("inbound_shipments", search) if search and sort == "relevance" else None
+    if ranked:
+        from_clause, rank_params, rank = ranked
+        query = f"SELECT inbound_shipments.* FROM {from_clause} WHERE {where} ORDER BY {rank}, ship_date DESC, id DESC LIMIT ? OFFSET ?"
+        query_params = rank_params + params
+    else:
+        query = f"SELECT * FROM inbound_shipments WHERE {where}{search_where} ORDER BY ship_date DESC, id DESC LIMIT ? OFFSET ?"
+        query_params = params + search_params
+    rows = await fetch_all(query, query_params + [page_size, (page - 1) * page_size])
+
+    items = [row_to_dict(row) for row in rows]
+    total_pages = (total + page_size - 1) // page_size if total is not None else None
+
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+    }
+
+
+def _get_inbound_page_by_cursor(where: str, params: list, cursor: str, page_size: int, total: Optional[int]):
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, 2)
+        segments = date_id_seek(last_date, last_id)
+    else:
+        segments = [("1=1", [])]
 
-        # Build query
-        query = "SELECT * FROM inbound_shipments WHERE 1=1"
-        count_query = "SELECT COUNT(*) FROM inbound_shipments WHERE 1=1"
-        params = []
-
-        if source:
-            query += " AND source = ?"
-            count_query += " AND source = ?"
-            params.append(source)
-
-        if carrier:
-            query += " AND carrier LIKE ?"
-            count_query += " AND carrier LIKE ?"
-            params.append(f"%{carrier}%")
-
-        if received is not None:
-            query += " AND received = ?"
-            count_query += " AND received = ?"
-            params.append(1 if received else 0)
-
-        if start_date:
-            query += " AND ship_date >= ?"
-            count_query += " AND ship_date >= ?"
-            params.append(start_date.isoformat())
-
-        if end_date:
-            query += " AND ship_date <= ?"
-            count_query += " AND ship_date <= ?"
-            params.append(end_date.isoformat())
-
-        if search:
-            search_clause = """ AND (
-                item_number LIKE ? OR
-                po LIKE ? OR
-                carrier LIKE ? OR
-                bol_number LIKE ? OR
-                notes LIKE ?
-            )"""
-            query += search_clause
-            count_query += search_clause
-            search_param = f"%{search}%"
-            params.extend([search_param] * 5)
-
-        # Get total count
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()[0]
-
-        # Add pagination
-        query += " ORDER BY ship_date DESC, id DESC LIMIT ? OFFSET ?"
-        params.extend([page_size, (page - 1) * page_size])
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-
-        items = [row_to_dict(row) for row in rows]
-        total_pages = (total + page_size - 1) // page_size
-
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": total_pages,
-        }
+    with get_db() as conn:
+        rows, has_more = fetch_keyset_page(
+            conn,
+            f"SELECT * FROM inbound_shipments WHERE {where}",
+            params,
+            segments,
+            "ship_date DESC, id DESC",
+            page_size,
+        )
+
+    items = [row_to_dict(row) for row in rows]
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor([items[-1]["ship_date"], items[-1]["id"]])
+
+    return {
+        "items": items,
+        "total": total,
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+    }
 
 
 @router.get("/{shipment_id}")
 async def get_inbound_shipment(shipment_id: int):
     """Get a single inbound shipment by ID."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM inbound_shipments WHERE id = ?", (shipment_id,))
-        row = cursor.fetchone()
+    row = await fetch_one("SELECT * FROM inbound_shipments WHERE id = ?", (shipment_id,))
 
-        if not row:
-            raise HTTPException(status_code=404, detail="Shipment not found")
+    if not row:
+        raise HTTPException(status_code=404, detail="Shipment not found")
 
-        return row_to_dict(row)
+    return row_to_dict(row)
 
 
 @router.post("/", response_model=dict)
 async def create_inbound_shipment(shipment: InboundShipmentCreate):
     """Create a new inbound shipment."""
+    return await run_db(_create_inbound_shipment, shipment)
+
+
+def _create_inbound_shipment(shipment: InboundShipmentCreate):
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -144,15 +182,21 @@ async def create_inbound_shipment(shipment: InboundShipmentCreate):
 
         shipment_id = cursor.lastrowid
         conn.commit()
+        dashboard_cache.invalidate()
 
         cursor.execute("SELECT * FROM inbound_shipments WHERE id = ?", (shipment_id,))
-        row = cursor.fetchone()
-        return row_to_dict(row)
+        result = row_to_dict(cursor.fetchone())
+        publish_shipment_change("inbound", "created", shipment_id, result)
+        return result
 
 
 @router.put("/{shipment_id}")
 async def update_inbound_shipment(shipment_id: int, shipment: InboundShipmentUpdate):
     """Update an existing inbound shipment."""
+    return await run_db(_update_inbound_shipment, shipment_id, shipment)
+
+
+def _update_inbound_shipment(shipment_id: int, shipment: InboundShipmentUpdate):
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -183,15 +227,21 @@ async def update_inbound_shipment(shipment_id: int, shipment: InboundShipmentUpd
 
         cursor.execute(f"UPDATE inbound_shipments SET {set_clause} WHERE id = ?", values)
         conn.commit()
+        dashboard_cache.invalidate()
 
         cursor.execute("SELECT * FROM inbound_shipments WHERE id = ?", (shipment_id,))
-        row = cursor.fetchone()
-        return row_to_dict(row)
+        result = row_to_dict(cursor.fetchone())
+        publish_shipment_change("inbound", "updated", shipment_id, result)
+        return result
 
 
 @router.delete("/{shipment_id}")
 async def delete_inbound_shipment(shipment_id: int):
     """Delete an inbound shipment."""
+    return await run_db(_delete_inbound_shipment, shipment_id)
+
+
+def _delete_inbound_shipment(shipment_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -201,6 +251,8 @@ async def delete_inbound_shipment(shipment_id: int):
 
         cursor.execute("DELETE FROM inbound_shipments WHERE id = ?", (shipment_id,))
         conn.commit()
+        dashboard_cache.invalidate()
+        publish_shipment_change("inbound", "deleted", shipment_id)
 
         return {"message": "Shipment deleted successfully"}
 
@@ -208,6 +260,10 @@ async def delete_inbound_shipment(shipment_id: int):
 @router.post("/{shipment_id}/mark-received")
 async def mark_as_received(shipment_id: int):
     """Mark a shipment as received."""
+    return await run_db(_mark_as_received, shipment_id)
+
+
+def _mark_as_received(shipment_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -221,7 +277,9 @@ async def mark_as_received(shipment_id: int):
             WHERE id = ?
         """, (datetime.now().isoformat(), shipment_id))
         conn.commit()
+        dashboard_cache.invalidate()
 
         cursor.execute("SELECT * FROM inbound_shipments WHERE id = ?", (shipment_id,))
-        row = cursor.fetchone()
-        return row_to_dict(row)
+        result = row_to_dict(cursor.fetchone())
+        publish_shipment_change("inbound", "updated", shipment_id, result)
+        return result
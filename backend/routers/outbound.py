@@ -1,14 +1,18 @@
 """Outbound shipment endpoints."""
 
 from datetime import datetime, date
-from typing import Optional
+from typing import Literal, Optional
 from fastapi import APIRouter, HTTPException, Query
 
-from database import get_db
+from cache import dashboard_cache
+from database import get_db, run_db, fetch_all, fetch_one, fetch_value, normalize_customer_key
 from models import (
     OutboundShipmentCreate,
     OutboundShipmentUpdate,
 )
+from events import publish_shipment_change
+from search import search_clause, ranked_source
+from pagination import encode_cursor, decode_cursor, date_id_seek, fetch_keyset_page
 
 router = APIRouter()
 
@@ -30,110 +34,148 @@ async def get_outbound_shipments(
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    sort: Literal["date", "relevance"] = "date",
 ):
-    """Get all outbound shipments with filtering and pagination."""
-    with get_db() as conn:
-        cursor = conn.cursor()
+    """Get all outbound shipments with filtering and pagination.
+
+    Pass `cursor` (empty for the first page, then the returned `next_cursor`)
+    to page by keyset instead of OFFSET; `include_total=false` skips the count.
+    With `search`, `sort=relevance` orders page results by FTS rank.
+    """
+    # Build filters
+    where = "1=1"
+    params = []
+
+    if source:
+        where += " AND source = ?"
+        params.append(source)
+
+    if carrier:
+        where += " AND carrier LIKE ?"
+        params.append(f"%{carrier}%")
+
+    if customer:
+        where += " AND customer LIKE ?"
+        params.append(f"%{customer}%")
+
+    if shipped is not None:
+        where += " AND shipped = ?"
+        params.append(1 if shipped else 0)
+
+    if pending_routing is not None:
+        if pending_routing:
+            # Filter for shipments missing reference_number, ship_date, or carrier
+            # Must have order_number to be considered Pending Routing
+            where += " AND order_number IS NOT NULL AND order_number != '' AND (reference_number IS NULL OR reference_number = '' OR ship_date IS NULL OR carrier IS NULL OR carrier = '')"
+        else:
+            # Filter for shipments that have all routing info
+            where += " AND reference_number IS NOT NULL AND reference_number != '' AND ship_date IS NOT NULL AND carrier IS NOT NULL AND carrier != ''"
+
+    if start_date:
+        where += " AND ship_date >= ?"
+        params.append(start_date.isoformat())
+
+    if end_date:
+        where += " AND ship_date <= ?"
+        params.append(end_date.isoformat())
+
+    # Search goes through the FTS index (see search.py); kept separate from
+    # the other filters so relevance ordering can join on the matches instead
+    search_where, search_params = "", []
+    if search:
+        clause, search_params = search_clause("outbound_shipments", search)
+        search_where = f" AND {clause}"
+
+    # Get total count
+    total = None
+    if include_total:
+        total = await fetch_value(
+            f"SELECT COUNT(*) FROM outbound_shipments WHERE {where}{search_where}", params + search_params
+        )
+
+    if cursor is not None:
+        return await run_db(_get_outbound_page_by_cursor, where + search_where, params + search_params, cursor, page_size, total)
+
+    # Add pagination - sort non-shipped items first, then by ship date
+    ranked = ranked_source("outbound_shipments", search) if search and sort == "relevance" else None
+    if ranked:
+        from_clause, rank_params, rank = ranked
+        query = f"SELECT outbound_shipments.* FROM {from_clause} WHERE {where} ORDER BY {rank}, shipped ASC, ship_date DESC, id DESC LIMIT ? OFFSET ?"
+        query_params = rank_params + params
+    else:
+        query = f"SELECT * FROM outbound_shipments WHERE {where}{search_where} ORDER BY shipped ASC, ship_date DESC, id DESC LIMIT ? OFFSET ?"
+        query_params = params + search_params
+    rows = await fetch_all(query, query_params + [page_size, (page - 1) * page_size])
+
+    items = [row_to_dict(row) for row in rows]
+    total_pages = (total + page_size - 1) // page_size if total is not None else None
+
+    return {
+        "items": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+    }
+
+
+def _get_outbound_page_by_cursor(where: str, params: list, cursor: str, page_size: int, total: Optional[int]):
+    if cursor:
+        last_shipped, last_date, last_id = decode_cursor(cursor, 3)
+        # Finish the current shipped group, then move on to shipped rows
+        segments = [
+            (f"shipped = ? AND {clause}", [last_shipped] + seek_params)
+            for clause, seek_params in date_id_seek(last_date, last_id)
+        ]
+        if not last_shipped:
+            segments.append(("shipped = 1", []))
+    else:
+        segments = [("1=1", [])]
 
-        # Build query
-        query = "SELECT * FROM outbound_shipments WHERE 1=1"
-        count_query = "SELECT COUNT(*) FROM outbound_shipments WHERE 1=1"
-        params = []
-
-        if source:
-            query += " AND source = ?"
-            count_query += " AND source = ?"
-            params.append(source)
-
-        if carrier:
-            query += " AND carrier LIKE ?"
-            count_query += " AND carrier LIKE ?"
-            params.append(f"%{carrier}%")
-
-        if customer:
-            query += " AND customer LIKE ?"
-            count_query += " AND customer LIKE ?"
-            params.append(f"%{customer}%")
-
-        if shipped is not None:
-            query += " AND shipped = ?"
-            count_query += " AND shipped = ?"
-            params.append(1 if shipped else 0)
-
-        if pending_routing is not None:
-            if pending_routing:
-                # Filter for shipments missing reference_number, ship_date, or carrier
-                # Must have order_number to be considered Pending Routing
-                routing_clause = " AND order_number IS NOT NULL AND order_number != '' AND (reference_number IS NULL OR reference_number = '' OR ship_date IS NULL OR carrier IS NULL OR carrier = '')"
-            else:
-                # Filter for shipments that have all routing info
-                routing_clause = " AND reference_number IS NOT NULL AND reference_number != '' AND ship_date IS NOT NULL AND carrier IS NOT NULL AND carrier != ''"
-            query += routing_clause
-            count_query += routing_clause
-
-        if start_date:
-            query += " AND ship_date >= ?"
-            count_query += " AND ship_date >= ?"
-            params.append(start_date.isoformat())
-
-        if end_date:
-            query += " AND ship_date <= ?"
-            count_query += " AND ship_date <= ?"
-            params.append(end_date.isoformat())
-
-        if search:
-            search_clause = """ AND (
-                reference_number LIKE ? OR
-                order_number LIKE ? OR
-                customer LIKE ? OR
-                carrier LIKE ? OR
-                notes LIKE ?
-            )"""
-            query += search_clause
-            count_query += search_clause
-            search_param = f"%{search}%"
-            params.extend([search_param] * 5)
-
-        # Get total count
-        cursor.execute(count_query, params)
-        total = cursor.fetchone()[0]
-
-        # Add pagination - sort non-shipped items first, then by ship date
-        query += " ORDER BY shipped ASC, ship_date DESC, id DESC LIMIT ? OFFSET ?"
-        params.extend([page_size, (page - 1) * page_size])
-
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-
-        items = [row_to_dict(row) for row in rows]
-        total_pages = (total + page_size - 1) // page_size
-
-        return {
-            "items": items,
-            "total": total,
-            "page": page,
-            "page_size": page_size,
-            "total_pages": total_pages,
-        }
+    with get_db() as conn:
+        rows, has_more = fetch_keyset_page(
+            conn,
+            f"SELECT * FROM outbound_shipments WHERE {where}",
+            params,
+            segments,
+            "shipped ASC, ship_date DESC, id DESC",
+            page_size,
+        )
+
+    items = [row_to_dict(row) for row in rows]
+    next_cursor = None
+    if has_more:
+        last = items[-1]
+        next_cursor = encode_cursor([last["shipped"], last["ship_date"], last["id"]])
+
+    return {
+        "items": items,
+        "total": total,
+        "page_size": page_size,
+        "next_cursor": next_cursor,
+    }
 
 
 @router.get("/{shipment_id}")
 async def get_outbound_shipment(shipment_id: int):
     """Get a single outbound shipment by ID."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM outbound_shipments WHERE id = ?", (shipment_id,))
-        row = cursor.fetchone()
+    row = await fetch_one("SELECT * FROM outbound_shipments WHERE id = ?", (shipment_id,))
 
-        if not row:
-            raise HTTPException(status_code=404, detail="Shipment not found")
+    if not row:
+        raise HTTPException(status_code=404, detail="Shipment not found")
 
-        return row_to_dict(row)
+    return row_to_dict(row)
 
 
 @router.post("/", response_model=dict)
 async def create_outbound_shipment(shipment: OutboundShipmentCreate):
     """Create a new outbound shipment."""
+    return await run_db(_create_outbound_shipment, shipment)
+
+
+def _create_outbound_shipment(shipment: OutboundShipmentCreate):
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -141,8 +183,8 @@ async def create_outbound_shipment(shipment: OutboundShipmentCreate):
             INSERT INTO outbound_shipments (
                 source, reference_number, order_number, customer, ship_date,
                 carrier, shipped, delayed, actual_date, pallets, pro, seal, notes,
-                pickup_time, created_at, updated_at
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                pickup_time, customer_key, created_at, updated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             shipment.source,
             shipment.reference_number,
@@ -158,21 +200,28 @@ async def create_outbound_shipment(shipment: OutboundShipmentCreate):
             shipment.seal,
             shipment.notes,
             shipment.pickup_time,
+            normalize_customer_key(shipment.customer),
             datetime.now().isoformat(),
             datetime.now().isoformat(),
         ))
 
         shipment_id = cursor.lastrowid
         conn.commit()
+        dashboard_cache.invalidate()
 
         cursor.execute("SELECT * FROM outbound_shipments WHERE id = ?", (shipment_id,))
-        row = cursor.fetchone()
-        return row_to_dict(row)
+        result = row_to_dict(cursor.fetchone())
+        publish_shipment_change("outbound", "created", shipment_id, result)
+        return result
 
 
 @router.put("/{shipment_id}")
 async def update_outbound_shipment(shipment_id: int, shipment: OutboundShipmentUpdate):
     """Update an existing outbound shipment."""
+    return await run_db(_update_outbound_shipment, shipment_id, shipment)
+
+
+def _update_outbound_shipment(shipment_id: int, shipment: OutboundShipmentUpdate):
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -199,6 +248,10 @@ async def update_outbound_shipment(shipment_id: int, shipment: OutboundShipmentU
         if "delayed" in update_data:
             update_data["delayed"] = 1 if update_data["delayed"] else 0
 
+        # Keep the indexed customer key in step with the name
+        if "customer" in update_data:
+            update_data["customer_key"] = normalize_customer_key(update_data["customer"])
+
         update_data["updated_at"] = datetime.now().isoformat()
 
         set_clause = ", ".join([f"{k} = ?" for k in update_data.keys()])
@@ -207,15 +260,21 @@ async def update_outbound_shipment(shipment_id: int, shipment: OutboundShipmentU
 
         cursor.execute(f"UPDATE outbound_shipments SET {set_clause} WHERE id = ?", values)
         conn.commit()
+        dashboard_cache.invalidate()
 
         cursor.execute("SELECT * FROM outbound_shipments WHERE id = ?", (shipment_id,))
-        row = cursor.fetchone()
-        return row_to_dict(row)
+        result = row_to_dict(cursor.fetchone())
+        publish_shipment_change("outbound", "updated", shipment_id, result)
+        return result
 
 
 @router.delete("/{shipment_id}")
 async def delete_outbound_shipment(shipment_id: int):
     """Delete an outbound shipment."""
+    return await run_db(_delete_outbound_shipment, shipment_id)
+
+
+def _delete_outbound_shipment(shipment_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -225,6 +284,8 @@ async def delete_outbound_shipment(shipment_id: int):
 
         cursor.execute("DELETE FROM outbound_shipments WHERE id = ?", (shipment_id,))
         conn.commit()
+        dashboard_cache.invalidate()
+        publish_shipment_change("outbound", "deleted", shipment_id)
 
         return {"message": "Shipment deleted successfully"}
 
@@ -232,6 +293,10 @@ async def delete_outbound_shipment(shipment_id: int):
 @router.post("/{shipment_id}/mark-shipped")
 async def mark_as_shipped(shipment_id: int):
     """Mark a shipment as shipped with current timestamp."""
+    return await run_db(_mark_as_shipped, shipment_id)
+
+
+def _mark_as_shipped(shipment_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -254,7 +319,9 @@ async def mark_as_shipped(shipment_id: int):
             shipment_id
         ))
         conn.commit()
+        dashboard_cache.invalidate()
 
         cursor.execute("SELECT * FROM outbound_shipments WHERE id = ?", (shipment_id,))
-        row = cursor.fetchone()
-        return row_to_dict(row)
+        result = row_to_dict(cursor.fetchone())
+        publish_shipment_change("outbound", "updated", shipment_id, result)
+        return result
@@ -2,7 +2,7 @@
 
 from fastapi import APIRouter, HTTPException
 
-from database import get_db
+from database import get_db, run_db, fetch_all, fetch_one
 from models import CarrierCreate, CustomerCreate, ProductCreate
 
 router = APIRouter()
@@ -17,16 +17,17 @@ def row_to_dict(row):
 @router.get("/carriers")
 async def get_carriers():
     """Get all carriers."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM carriers ORDER BY name")
-        rows = cursor.fetchall()
-        return [row_to_dict(row) for row in rows]
+    rows = await fetch_all("SELECT * FROM carriers ORDER BY name")
+    return [row_to_dict(row) for row in rows]
 
 
 @router.post("/carriers")
 async def create_carrier(carrier: CarrierCreate):
     """Create a new carrier."""
+    return await run_db(_create_carrier, carrier)
+
+
+def _create_carrier(carrier: CarrierCreate):
     with get_db() as conn:
         cursor = conn.cursor()
         try:
@@ -41,6 +42,10 @@ async def create_carrier(carrier: CarrierCreate):
 @router.delete("/carriers/{carrier_id}")
 async def delete_carrier(carrier_id: int):
     """Delete a carrier."""
+    return await run_db(_delete_carrier, carrier_id)
+
+
+def _delete_carrier(carrier_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM carriers WHERE id = ?", (carrier_id,))
@@ -55,16 +60,17 @@ async def delete_carrier(carrier_id: int):
 @router.get("/customers")
 async def get_customers():
     """Get all customers."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM customers ORDER BY name")
-        rows = cursor.fetchall()
-        return [row_to_dict(row) for row in rows]
+    rows = await fetch_all("SELECT * FROM customers ORDER BY name")
+    return [row_to_dict(row) for row in rows]
 
 
 @router.post("/customers")
 async def create_customer(customer: CustomerCreate):
     """Create a new customer."""
+    return await run_db(_create_customer, customer)
+
+
+def _create_customer(customer: CustomerCreate):
     with get_db() as conn:
         cursor = conn.cursor()
         try:
@@ -79,6 +85,10 @@ async def create_customer(customer: CustomerCreate):
 @router.delete("/customers/{customer_id}")
 async def delete_customer(customer_id: int):
     """Delete a customer."""
+    return await run_db(_delete_customer, customer_id)
+
+
+def _delete_customer(customer_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM customers WHERE id = ?", (customer_id,))
@@ -93,28 +103,26 @@ async def delete_customer(customer_id: int):
 @router.get("/products")
 async def get_products():
     """Get all products."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM products ORDER BY item_number")
-        rows = cursor.fetchall()
-        return [row_to_dict(row) for row in rows]
+    rows = await fetch_all("SELECT * FROM products ORDER BY item_number")
+    return [row_to_dict(row) for row in rows]
 
 
 @router.get("/products/{item_number}")
 async def get_product(item_number: str):
     """Get a product by item number."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM products WHERE item_number = ?", (item_number,))
-        row = cursor.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Product not found")
-        return row_to_dict(row)
+    row = await fetch_one("SELECT * FROM products WHERE item_number = ?", (item_number,))
+    if not row:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return row_to_dict(row)
 
 
 @router.post("/products")
 async def create_product(product: ProductCreate):
     """Create a new product."""
+    return await run_db(_create_product, product)
+
+
+def _create_product(product: ProductCreate):
     with get_db() as conn:
         cursor = conn.cursor()
         try:
@@ -150,6 +158,10 @@ async def create_product(product: ProductCreate):
 @router.delete("/products/{product_id}")
 async def delete_product(product_id: int):
     """Delete a product."""
+    return await run_db(_delete_product, product_id)
+
+
+def _delete_product(product_id: int):
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM products WHERE id = ?", (product_id,))
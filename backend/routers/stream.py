@@ -0,0 +1,54 @@
+"""Server-Sent Events endpoint streaming live shipment and stats changes."""
+
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, Request
+from fastapi.responses import StreamingResponse
+
+from events import broker, format_sse, HEARTBEAT_SECONDS
+
+router = APIRouter()
+
+# Client reconnect delay advertised to EventSource (milliseconds)
+RETRY_MS = 5000
+
+
+@router.get("")
+async def stream_events(request: Request, last_event_id: Optional[str] = Header(None)):
+    """Stream change events as text/event-stream.
+
+    Event types: shipment.created, shipment.updated, shipment.deleted,
+    stats (changed fields only), sync.completed and resync (the client missed
+    events and should reload its data). Reconnects resume from the
+    Last-Event-ID header that EventSource sends automatically.
+    """
+    queue, replay = broker.subscribe(last_event_id)
+
+    async def event_stream():
+        try:
+            yield f"retry: {RETRY_MS}\n\n"
+            if replay is None:
+                yield format_sse(None, "resync", {})
+            else:
+                for event in replay:
+                    yield format_sse(*event)
+
+            while not await request.is_disconnected():
+                if queue.overflowed:
+                    yield format_sse(None, "resync", {})
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_sse(*event)
+        finally:
+            broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,11 @@
 """Excel sync endpoints."""
 
-from datetime import datetime
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
-from database import get_db
-from models import SyncStatus, SyncResult
+from database import fetch_all, fetch_one, run_db
+from models import SyncStatus, SyncJob
 from services.excel_sync import ExcelSyncService
+from services.sync_jobs import enqueue_job, get_job, list_jobs
 
 router = APIRouter()
 
@@ -13,76 +13,78 @@ router = APIRouter()
 @router.get("/status", response_model=SyncStatus)
 async def get_sync_status():
     """Get the last sync status."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT sync_type, status, records_processed, timestamp
-            FROM sync_log
-            ORDER BY timestamp DESC
-            LIMIT 1
-        """)
-        row = cursor.fetchone()
-
-        if row:
-            return SyncStatus(
-                last_sync=row[3],
-                sync_type=row[0],
-                status=row[1],
-                records_processed=row[2],
-            )
-        return SyncStatus()
-
-
-@router.post("/import", response_model=SyncResult)
-async def import_from_excel():
-    """Import data from Excel file into the database."""
-    try:
-        service = ExcelSyncService()
-        result = service.import_from_excel()
-        return result
-    except FileNotFoundError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
-
-
-@router.post("/export", response_model=SyncResult)
+    row = await fetch_one("""
+        SELECT sync_type, status, records_processed, timestamp
+        FROM sync_log
+        ORDER BY timestamp DESC
+        LIMIT 1
+    """)
+
+    if row:
+        return SyncStatus(
+            last_sync=row[3],
+            sync_type=row[0],
+            status=row[1],
+            records_processed=row[2],
+        )
+    return SyncStatus()
+
+
+@router.post("/import", response_model=SyncJob, status_code=202)
+async def import_from_excel(force: bool = False):
+    """Queue an import from the Excel file; poll /jobs/{id} for progress.
+
+    Unchanged workbooks and sheets are skipped unless `force` is set. If an
+    import is already queued or running, that job is returned instead.
+    """
+    return await run_db(enqueue_job, "import", "manual", force)
+
+
+@router.post("/export", response_model=SyncJob, status_code=202)
 async def export_to_excel():
-    """Export database changes to the Excel file."""
-    try:
-        service = ExcelSyncService()
-        result = service.export_to_excel()
-        return result
-    except FileNotFoundError as e:
-        raise HTTPException(status_code=404, detail=str(e))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Export failed: {str(e)}")
+    """Queue an export of database changes to the Excel file; poll /jobs/{id} for progress.
+
+    If an export is already queued or running, that job is returned instead.
+    """
+    return await run_db(enqueue_job, "export", "manual")
+
+
+@router.get("/jobs", response_model=list[SyncJob])
+async def get_sync_jobs(limit: int = Query(20, ge=1, le=100)):
+    """Recent sync jobs, newest first."""
+    return await run_db(list_jobs, limit)
+
+
+@router.get("/jobs/{job_id}", response_model=SyncJob)
+async def get_sync_job(job_id: int):
+    """Status, phase and progress of one sync job (result once finished)."""
+    job = await run_db(get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
 
 
 @router.get("/log")
 async def get_sync_log(limit: int = 20):
     """Get recent sync log entries."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, sync_type, status, records_processed, timestamp, details
-            FROM sync_log
-            ORDER BY timestamp DESC
-            LIMIT ?
-        """, (limit,))
-        rows = cursor.fetchall()
-
-        return [
-            {
-                "id": row[0],
-                "sync_type": row[1],
-                "status": row[2],
-                "records_processed": row[3],
-                "timestamp": row[4],
-                "details": row[5],
-            }
-            for row in rows
-        ]
+    rows = await fetch_all("""
+        SELECT id, sync_type, status, records_processed, timestamp, details
+        FROM sync_log
+        ORDER BY timestamp DESC
+        LIMIT ?
+    """, (limit,))
+
+    return [
+        {
+            "id": row[0],
+            "sync_type": row[1],
+            "status": row[2],
+            "records_processed": row[3],
+            "timestamp": row[4],
+            "details": row[5],
+        }
+        for row in rows
+    ]
 
 
 @router.get("/env-debug")
@@ -109,6 +111,14 @@ async def get_env_debug():
     }
 
 
+@router.get("/graph-stats")
+async def get_graph_stats():
+    """Get Graph token cache hits and per-operation HTTP latency for this worker."""
+    from services.graph_client import graph_metrics
+
+    return graph_metrics.stats()
+
+
 @router.get("/sharepoint-status")
 async def get_sharepoint_status():
     """Check if SharePoint upload is configured."""
@@ -0,0 +1,114 @@
+"""Full-text search over shipments using SQLite FTS5 trigram indexes.
+
+Each shipment table has an external-content FTS5 shadow table
+(`<table>_fts`) kept in sync by triggers. The trigram tokenizer matches
+arbitrary substrings case-insensitively, so it answers the same questions as
+the old `LIKE '%term%'` filters without scanning the base table.
+"""
+
+import sqlite3
+from typing import Optional
+
+# Columns covered by the `search` parameter of each listing endpoint
+SEARCH_COLUMNS = {
+    "inbound_shipments": ["item_number", "po", "carrier", "bol_number", "notes"],
+    "outbound_shipments": ["reference_number", "order_number", "customer", "carrier", "notes"],
+}
+
+# Trigram queries need at least three characters
+MIN_FTS_TERM_LENGTH = 3
+
+_fts_available = False
+
+
+def create_search_index(cursor) -> bool:
+    """Create the FTS tables and sync triggers; returns False if FTS5 is unavailable."""
+    global _fts_available
+
+    try:
+        for table, columns in SEARCH_COLUMNS.items():
+            fts = f"{table}_fts"
+            cols = ", ".join(columns)
+            new_cols = ", ".join(f"new.{c}" for c in columns)
+            old_cols = ", ".join(f"old.{c}" for c in columns)
+
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (fts,))
+            is_new = cursor.fetchone() is None
+
+            cursor.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+                    {cols},
+                    content='{table}', content_rowid='id', tokenize='trigram'
+                )
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                END
+            """)
+            cursor.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN
+                    INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols});
+                    INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols});
+                END
+            """)
+
+            # Existing databases: index the rows that predate the FTS table
+            if is_new:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    except sqlite3.OperationalError as e:
+        # SQLite built without FTS5 or the trigram tokenizer (< 3.34)
+        print(f"Full-text search unavailable, falling back to LIKE: {e}")
+        _fts_available = False
+        return False
+
+    _fts_available = True
+    return True
+
+
+def rebuild_search_index(conn):
+    """Rebuild both FTS indexes from their base tables."""
+    for table in SEARCH_COLUMNS:
+        fts = f"{table}_fts"
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+    conn.commit()
+
+
+def _uses_fts(term: str) -> bool:
+    return _fts_available and len(term) >= MIN_FTS_TERM_LENGTH
+
+
+def _match_expression(term: str) -> str:
+    # Quote the whole term as one phrase so FTS5 operators are taken literally
+    return '"' + term.replace('"', '""') + '"'
+
+
+def search_clause(table: str, term: str) -> tuple[str, list]:
+    """Return an SQL condition (to AND onto a WHERE) and its params for `term`."""
+    if _uses_fts(term):
+        fts = f"{table}_fts"
+        return f"id IN (SELECT rowid FROM {fts} WHERE {fts} MATCH ?)", [_match_expression(term)]
+
+    like = " OR ".join(f"{col} LIKE ?" for col in SEARCH_COLUMNS[table])
+    return f"({like})", [f"%{term}%"] * len(SEARCH_COLUMNS[table])
+
+
+def ranked_source(table: str, term: str) -> Optional[tuple[str, list, str]]:
+    """FROM clause joining `table` to its FTS matches for relevance ordering.
+
+    Returns (from_clause, params, rank_expression), or None when the term
+    can't be served by the index and the caller should keep date ordering.
+    """
+    if not _uses_fts(term):
+        return None
+    fts = f"{table}_fts"
+    from_clause = (
+        f"{table} JOIN (SELECT rowid AS fts_id, rank AS fts_rank FROM {fts} WHERE {fts} MATCH ?) m"
+        f" ON m.fts_id = {table}.id"
+    )
+    return from_clause, [_match_expression(term)], "m.fts_rank"
@@ -1,9 +1,16 @@
 """Excel synchronization service."""
 
+import hashlib
+import multiprocessing
+import os
+import queue
 import shutil
 import re
-import requests
+import tempfile
+import time
+from collections import deque
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
 from typing import Optional
 from urllib.parse import urlparse, parse_qs
@@ -13,25 +20,231 @@ from openpyxl.styles import Alignment
 
 from config import (
     EXCEL_FILE_PATH, BACKUP_DIR, SHAREPOINT_EXCEL_URL,
-    GRAPH_TENANT_ID, GRAPH_CLIENT_ID, GRAPH_CLIENT_SECRET,
-    SHAREPOINT_FILE_PATH, SHAREPOINT_USER
+    GRAPH_TENANT_ID, GRAPH_CLIENT_ID, GRAPH_CLIENT_SECRET, GRAPH_API_BASE,
+    SHAREPOINT_FILE_PATH, SHAREPOINT_USER, IMPORT_BATCH_SIZE, IMPORT_PARALLEL_WORKERS,
+    EXPORT_ENGINE, SHAREPOINT_CACHE_MAX_AGE_SECONDS
 )
-from database import get_db
+from cache import dashboard_cache
+from events import broker, publish_current_stats
+from database import get_db, normalize_customer_key, EXPORT_DIRTY_CONDITION
 from models import SyncResult
+from services.graph_client import (
+    MSAL_AVAILABLE, GraphUploadError, GraphWorkbookError, UploadSessionLost, WorkbookSession,
+    cell_ranges, create_upload_session, upload_in_chunks, graph_metrics, token_cache, timed_request
+)
+from services.sync_lease import SyncLease, SyncBusyError
+from services.xlsx_patch import XlsxPatcher
+
+
+# Imported sheets in import order: sheet name -> (record kind, shipment source)
+IMPORT_SHEETS = {
+    "TP INBOUND": ("inbound", "TP"),
+    "OTHERINBOUND": ("inbound", "OTHER"),
+    "TP OUTBOUND": ("outbound", "TP"),
+    "OTHEROUTBOUND": ("outbound", "OTHER"),
+    "Carriers&Customers": ("reference", None),
+    "Product Counts": ("products", None),
+}
+
+# Exported sheets in export order: (sheet name, record kind, shipment source)
+EXPORT_SHEETS = [
+    (name, kind, source)
+    for name, (kind, source) in IMPORT_SHEETS.items()
+    if kind in ("inbound", "outbound")
+]
+
+# Batched upserts per record kind. Shipments already linked to a sheet row
+# are updated in place, and only when a value differs, so updated_at marks
+# real changes; products.item_number is UNIQUE.
+UPSERT_SQL = {
+    "inbound": """
+        INSERT INTO inbound_shipments (
+            source, item_number, cases, po, carrier, bol_number,
+            tp_receipt_number, ship_date, received, pallets, notes,
+            excel_row, created_at, updated_at, synced_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (source, excel_row) DO UPDATE SET
+            item_number = excluded.item_number, cases = excluded.cases,
+            po = excluded.po, carrier = excluded.carrier,
+            bol_number = excluded.bol_number, tp_receipt_number = excluded.tp_receipt_number,
+            ship_date = excluded.ship_date, received = excluded.received,
+            pallets = excluded.pallets, notes = excluded.notes,
+            updated_at = excluded.updated_at, synced_at = excluded.synced_at
+        WHERE (item_number, cases, po, carrier, bol_number, tp_receipt_number,
+               ship_date, received, pallets, notes)
+        IS NOT (excluded.item_number, excluded.cases, excluded.po, excluded.carrier,
+                excluded.bol_number, excluded.tp_receipt_number, excluded.ship_date,
+                excluded.received, excluded.pallets, excluded.notes)
+    """,
+    "outbound": """
+        INSERT INTO outbound_shipments (
+            source, reference_number, order_number, customer,
+            ship_date, carrier, shipped, delayed, actual_date, pallets,
+            pro, seal, notes, pickup_time, customer_key, excel_row,
+            created_at, updated_at, synced_at
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (source, excel_row) DO UPDATE SET
+            reference_number = excluded.reference_number, order_number = excluded.order_number,
+            customer = excluded.customer, ship_date = excluded.ship_date,
+            carrier = excluded.carrier, shipped = excluded.shipped,
+            delayed = excluded.delayed, actual_date = excluded.actual_date,
+            pallets = excluded.pallets, pro = excluded.pro, seal = excluded.seal,
+            notes = excluded.notes, pickup_time = excluded.pickup_time,
+            customer_key = excluded.customer_key,
+            updated_at = excluded.updated_at, synced_at = excluded.synced_at
+        WHERE (reference_number, order_number, customer, ship_date, carrier, shipped,
+               delayed, actual_date, pallets, pro, seal, notes, pickup_time)
+        IS NOT (excluded.reference_number, excluded.order_number, excluded.customer,
+                excluded.ship_date, excluded.carrier, excluded.shipped, excluded.delayed,
+                excluded.actual_date, excluded.pallets, excluded.pro, excluded.seal,
+                excluded.notes, excluded.pickup_time)
+    """,
+    "products": """
+        INSERT INTO products (
+            item_number, items_per_case, items_per_pallet,
+            cases_per_pallet, layers_per_pallet, cases_per_layer, notes
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (item_number) DO UPDATE SET
+            items_per_case = excluded.items_per_case,
+            items_per_pallet = excluded.items_per_pallet,
+            cases_per_pallet = excluded.cases_per_pallet,
+            layers_per_pallet = excluded.layers_per_pallet,
+            cases_per_layer = excluded.cases_per_layer,
+            notes = excluded.notes
+    """,
+}
+
+
+# sync_state keys for the content hashes of the last imported workbook
+IMPORT_FILE_HASH_KEY = "import.file_sha256"
+IMPORT_SHEET_HASH_PREFIX = "import.sheet_sha256:"
+
+# Local copy of the last SharePoint download (in the backup dir) and the
+# sync_state keys describing it: source URL, validators and when SharePoint
+# last confirmed it current (epoch seconds)
+DOWNLOAD_CACHE_NAME = "sharepoint_cache.xlsx"
+DOWNLOAD_URL_KEY = "download.url"
+DOWNLOAD_ETAG_KEY = "download.etag"
+DOWNLOAD_LAST_MODIFIED_KEY = "download.last_modified"
+DOWNLOAD_VALIDATED_KEY = "download.validated_at"
+
+# Bytes per write while streaming a download to disk
+DOWNLOAD_BLOCK_BYTES = 1024 * 1024
+
+
+def _file_sha256(path: Path) -> str:
+    """SHA-256 of a file, read in 1 MB chunks."""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+FINGERPRINT_UPSERT_SQL = """
+    INSERT INTO row_fingerprints (sheet, excel_row, hash) VALUES (?, ?, ?)
+    ON CONFLICT (sheet, excel_row) DO UPDATE SET hash = excluded.hash
+"""
+
+
+def _row_fingerprint(row: tuple) -> bytes:
+    """128-bit hash of a sheet row's raw cell values."""
+    # Trailing empty cells come and go with the sheet's dimension
+    end = len(row)
+    while end and row[end - 1] is None:
+        end -= 1
+    return hashlib.blake2b(repr(row[:end]).encode("utf-8"), digest_size=16).digest()
+
+
+# Text that Excel would turn into a number, date, time, boolean or formula
+# when written through the workbook API
+_EXCEL_COERCED_TEXT = re.compile(r"^\s*(?:[=+\-@']|[\d.,$%/:\s-]+$|(?:true|false)\s*$)", re.IGNORECASE)
+
+
+def _graph_cell_value(value):
+    """A cell value as Graph range `values` expect it.
+
+    Empty cells are "" (null would leave the cell unchanged), and text that
+    Excel would reinterpret gets the apostrophe prefix so it stays text, as
+    in the file exports.
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str) and value and _EXCEL_COERCED_TEXT.match(value):
+        return "'" + value
+    return value
+
+
+def _batched(iterable, size: int):
+    """Yield lists of up to `size` items from any iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class _CellRecorder:
+    """Stands in for an XlsxPatcher: patches it and also records every cell set.
+
+    Lets the Graph export reuse the XML export's diffing, then send the
+    recorded cells as range updates.
+    """
+
+    def __init__(self, patcher: XlsxPatcher):
+        self.patcher = patcher
+        self.cells = {}
+
+    def scan(self, sheet_name: str, rows=()):
+        return self.patcher.scan(sheet_name, rows)
+
+    def set_cell(self, sheet_name: str, row: int, column: int, value):
+        self.patcher.set_cell(sheet_name, row, column, value)
+        self.cells.setdefault(sheet_name, {})[(row, column)] = value
+
+
+class FreeRowAllocator:
+    """Hands out empty sheet rows for new records in O(1) per row.
+
+    Built from one scan of column A (see from_sheet and XlsxPatcher.scan):
+    gaps left by deleted rows are reused first, top to bottom, then rows past
+    the end of the sheet are handed out in order. Rows already claimed by a
+    database record are never handed out, even if their column A cell is blank.
+    """
+
+    def __init__(self, blank_rows, max_row: int, claimed_rows=()):
+        self._claimed = set(claimed_rows)
+        self._gaps = deque(row for row in blank_rows if row not in self._claimed)
+        self._next_row = max_row + 1
 
-# Try to import msal for Microsoft Graph authentication
-try:
-    import msal
-    MSAL_AVAILABLE = True
-except ImportError:
-    MSAL_AVAILABLE = False
+    @classmethod
+    def from_sheet(cls, sheet, claimed_rows=()) -> "FreeRowAllocator":
+        """Build from an openpyxl worksheet."""
+        blank_rows = [
+            row_num
+            for row_num, (value,) in enumerate(sheet.iter_rows(min_row=2, max_col=1, values_only=True), start=2)
+            if value is None
+        ]
+        return cls(blank_rows, sheet.max_row, claimed_rows)
+
+    def allocate(self) -> int:
+        """Return the next free row number."""
+        if self._gaps:
+            return self._gaps.popleft()
+        while self._next_row in self._claimed:
+            self._next_row += 1
+        row_num = self._next_row
+        self._next_row += 1
+        return row_num
 
 
 class ExcelSyncService:
     """Service for syncing data between Excel and SQLite database."""
 
-    def __init__(self):
-        import os
+    def __init__(self, progress=None, lease: Optional[SyncLease] = None):
+        # Optional progress(phase, fraction) callback, e.g. from a sync job
+        self.progress = progress
+        # A sync lease already held by the caller (the job runner); without
+        # one, each import/export takes the lease itself
+        self.lease = lease
         self.excel_path = EXCEL_FILE_PATH
         self.backup_dir = BACKUP_DIR
         self.sharepoint_url = SHAREPOINT_EXCEL_URL
@@ -41,6 +254,37 @@ class ExcelSyncService:
         self.graph_client_secret = os.environ.get("GRAPH_CLIENT_SECRET", "") or GRAPH_CLIENT_SECRET
         self.sharepoint_file_path = os.environ.get("SHAREPOINT_FILE_PATH", "") or SHAREPOINT_FILE_PATH
         self.sharepoint_user = os.environ.get("SHAREPOINT_USER", "") or SHAREPOINT_USER
+        self.graph_api_base = GRAPH_API_BASE
+
+    def _report_progress(self, phase: str, fraction: float):
+        """Pass a phase name and 0..1 completion to the progress callback, if any."""
+        if self.progress is not None:
+            self.progress(phase, fraction)
+
+    def _temp_workbook(self, prefix: str) -> Path:
+        """A new, uniquely named empty .xlsx in the backup dir."""
+        fd, path = tempfile.mkstemp(prefix=prefix, suffix=".xlsx", dir=self.backup_dir)
+        os.close(fd)
+        return Path(path)
+
+    def _run_under_lease(self, sync_type: str, run) -> SyncResult:
+        """Run an import/export while holding the cross-worker sync lease."""
+        if self.lease is not None and self.lease.held:
+            return run()
+        try:
+            with SyncLease() as lease:
+                self.lease = lease
+                try:
+                    return run()
+                finally:
+                    self.lease = None
+        except SyncBusyError as e:
+            return SyncResult(success=False, message=f"{sync_type.capitalize()} skipped: {e}", errors=[str(e)])
+
+    def _confirm_lease(self, cursor):
+        """Renew the sync lease in the open transaction; raises SyncLeaseLost if it moved on."""
+        if self.lease is not None:
+            self.lease.confirm(cursor)
 
     def _get_graph_access_token(self) -> Optional[str]:
         """Get Microsoft Graph API access token using client credentials."""
@@ -53,72 +297,73 @@ class ExcelSyncService:
             return None
 
         try:
-            app = msal.ConfidentialClientApplication(
-                self.graph_client_id,
-                authority=f"https://login.microsoftonline.com/{self.graph_tenant_id}",
-                client_credential=self.graph_client_secret,
-            )
-
-            result = app.acquire_token_silent(
-                scopes=["https://graph.microsoft.com/.default"],
-                account=None
-            )
-
-            if not result:
-                result = app.acquire_token_for_client(
-                    scopes=["https://graph.microsoft.com/.default"]
-                )
-
-            if "access_token" in result:
-                return result["access_token"]
-            else:
-                print(f"Failed to get token: {result.get('error_description', 'Unknown error')}")
-                return None
+            # Cached per app registration until shortly before expiry
+            return token_cache.get_token(self.graph_tenant_id, self.graph_client_id, self.graph_client_secret)
 
         except Exception as e:
             print(f"Error getting Graph token: {e}")
             return None
 
-    def _upload_to_sharepoint(self, file_path: Path) -> tuple[bool, str]:
-        """Upload file to SharePoint/OneDrive using Microsoft Graph API."""
+    def _sharepoint_item_path(self) -> str:
+        """Graph path of the workbook in the user's OneDrive, relative to the API base."""
+        # Format: /users/{user-id}/drive/root:/{path}
+        encoded_path = self.sharepoint_file_path.replace(" ", "%20")
+        return f"/users/{self.sharepoint_user}/drive/root:/{encoded_path}"
+
+    def _sharepoint_item_url(self) -> str:
+        """Graph URL of the workbook in the user's OneDrive."""
+        return f"{self.graph_api_base}{self._sharepoint_item_path()}"
+
+    def _mark_download_stale(self):
+        """SharePoint's copy just changed; never reuse the cached download as fresh."""
+        # Its ETag no longer matches either, so the next download is full
+        with get_db() as conn:
+            self._write_sync_state(conn.cursor(), {DOWNLOAD_VALIDATED_KEY: "0"})
+            conn.commit()
+
+    def _create_upload_session(self, item_url: str) -> str:
+        """Start an upload session, refreshing a rejected token once."""
         token = self._get_graph_access_token()
         if not token:
-            return False, "Could not get Microsoft Graph access token. Check credentials."
-
+            raise GraphUploadError("Could not get Microsoft Graph access token. Check credentials.")
         try:
-            # Read the file content
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
+            return create_upload_session(item_url, token)
+        except GraphUploadError as e:
+            if e.status != 401:
+                raise
+            # Token revoked before its expiry; fetch a fresh one once
+            token_cache.invalidate(self.graph_tenant_id, self.graph_client_id, self.graph_client_secret)
+            token = self._get_graph_access_token()
+            if not token:
+                raise
+            return create_upload_session(item_url, token)
 
-            # Construct the upload URL for OneDrive
-            # Format: /users/{user-id}/drive/root:/{path}:/content
-            encoded_path = self.sharepoint_file_path.replace(" ", "%20")
-            upload_url = f"https://graph.microsoft.com/v1.0/users/{self.sharepoint_user}/drive/root:/{encoded_path}:/content"
+    def _upload_to_sharepoint(self, file_path: Path) -> tuple[bool, str]:
+        """Upload file to SharePoint/OneDrive through a Graph upload session.
 
-            print(f"Upload URL: {upload_url}")
-            print(f"File size: {len(file_content)} bytes")
+        The file is streamed from disk in chunks and a failed chunk resumes
+        from where the server left off; a session that expires mid-upload
+        is restarted once.
+        """
+        if not self._get_graph_access_token():
+            return False, "Could not get Microsoft Graph access token. Check credentials."
 
-            headers = {
-                "Authorization": f"Bearer {token}",
-                "Content-Type": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            }
+        try:
+            item_url = self._sharepoint_item_url()
+            print(f"Upload URL: {item_url}:/createUploadSession")
+            print(f"File size: {file_path.stat().st_size} bytes")
 
-            response = requests.put(upload_url, headers=headers, data=file_content, timeout=120)
+            try:
+                response = upload_in_chunks(self._create_upload_session(item_url), file_path)
+            except UploadSessionLost as e:
+                print(f"Upload session lost ({e}), starting a new one")
+                response = upload_in_chunks(self._create_upload_session(item_url), file_path)
 
             print(f"Response status: {response.status_code}")
-            print(f"Response body: {response.text[:500] if response.text else '(empty)'}")
-
-            if response.status_code in [200, 201]:
-                return True, "Successfully uploaded to SharePoint"
-            else:
-                try:
-                    error_data = response.json()
-                    error_msg = error_data.get("error", {}).get("message", "Unknown error")
-                    error_code = error_data.get("error", {}).get("code", "Unknown")
-                    return False, f"Upload failed ({response.status_code}): {error_code} - {error_msg}"
-                except:
-                    return False, f"Upload failed ({response.status_code}): {response.text[:200]}"
+            return True, "Successfully uploaded to SharePoint"
 
+        except GraphUploadError as e:
+            return False, f"Upload failed: {e}"
         except Exception as e:
             import traceback
             return False, f"Upload error: {str(e)} - {traceback.format_exc()[:300]}"
@@ -155,27 +400,68 @@ class ExcelSyncService:
             return sharing_url + '&download=1'
         return sharing_url + '?download=1'
 
-    def _download_from_sharepoint(self) -> Optional[Path]:
-        """Download Excel file from SharePoint/OneDrive and return local path."""
+    def _download_from_sharepoint(self, max_age: float = 0) -> Optional[Path]:
+        """Download the Excel file from SharePoint/OneDrive to a new temp file.
+
+        The body is streamed to disk. The last download is cached in the
+        backup dir and revalidated with If-None-Match/If-Modified-Since, so
+        an unchanged workbook costs a 304 and a local copy. A cached copy
+        confirmed less than `max_age` seconds ago is used without a request.
+        """
         if not self.sharepoint_url:
             return None
 
+        temp_path = None
         try:
             download_url = self._convert_sharepoint_to_download_url(self.sharepoint_url)
+            state = self._read_sync_state()
+            cache_path = self.backup_dir / DOWNLOAD_CACHE_NAME
+            cached = cache_path.exists() and state.get(DOWNLOAD_URL_KEY) == download_url
+            temp_path = self._temp_workbook("sharepoint_download_")
+
+            if cached and time.time() - float(state.get(DOWNLOAD_VALIDATED_KEY) or 0) < max_age:
+                graph_metrics.increment("download_fresh_cache")
+                shutil.copyfile(cache_path, temp_path)
+                return temp_path
+
+            headers = {}
+            if cached and state.get(DOWNLOAD_ETAG_KEY):
+                headers["If-None-Match"] = state[DOWNLOAD_ETAG_KEY]
+            if cached and state.get(DOWNLOAD_LAST_MODIFIED_KEY):
+                headers["If-Modified-Since"] = state[DOWNLOAD_LAST_MODIFIED_KEY]
+
+            with timed_request(
+                "download", "GET", download_url, headers=headers, stream=True, allow_redirects=True, timeout=60
+            ) as response:
+                if cached and response.status_code == 304:
+                    graph_metrics.increment("download_not_modified")
+                    shutil.copyfile(cache_path, temp_path)
+                    validators = {}
+                else:
+                    response.raise_for_status()
+                    graph_metrics.increment("download_full")
+                    with open(temp_path, 'wb') as f:
+                        for block in response.iter_content(DOWNLOAD_BLOCK_BYTES):
+                            f.write(block)
+                    # Swap the cached copy in whole; nothing reads it half-written
+                    cache_temp = self._temp_workbook("sharepoint_cache_")
+                    shutil.copyfile(temp_path, cache_temp)
+                    os.replace(cache_temp, cache_path)
+                    validators = {
+                        DOWNLOAD_URL_KEY: download_url,
+                        DOWNLOAD_ETAG_KEY: response.headers.get("ETag", ""),
+                        DOWNLOAD_LAST_MODIFIED_KEY: response.headers.get("Last-Modified", ""),
+                    }
 
-            # Download the file
-            response = requests.get(download_url, allow_redirects=True, timeout=60)
-            response.raise_for_status()
-
-            # Save to temp file
-            temp_path = self.backup_dir / "sharepoint_download.xlsx"
-            with open(temp_path, 'wb') as f:
-                f.write(response.content)
-
+            with get_db() as conn:
+                self._write_sync_state(conn.cursor(), {**validators, DOWNLOAD_VALIDATED_KEY: str(time.time())})
+                conn.commit()
             return temp_path
 
         except Exception as e:
             print(f"Failed to download from SharePoint: {e}")
+            if temp_path is not None:
+                temp_path.unlink(missing_ok=True)
             return None
 
     def _create_backup(self) -> Path:
@@ -199,8 +485,8 @@ class ExcelSyncService:
             value = value.strip()
             if not value:
                 return None
-            # Try common date formats
-            for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y"]:
+            # Try common date formats, and the MM-DD-YYYY text export writes
+            for fmt in ["%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%d/%m/%Y", "%m-%d-%Y"]:
                 try:
                     return datetime.strptime(value, fmt).date().isoformat()
                 except ValueError:
@@ -266,10 +552,49 @@ class ExcelSyncService:
             """, (sync_type, status, records, details))
             conn.commit()
 
-    def import_from_excel(self) -> SyncResult:
-        """Import data from Excel file into the database."""
+        broker.publish("sync.completed", {
+            "sync_type": sync_type,
+            "status": status,
+            "records_processed": records,
+        })
+        if sync_type == "import":
+            publish_current_stats()
+
+    def _read_sync_state(self) -> dict[str, str]:
+        """All sync_state entries as a dict."""
+        with get_db() as conn:
+            return dict(conn.execute("SELECT key, value FROM sync_state").fetchall())
+
+    def _write_sync_state(self, cursor, values: dict[str, str]):
+        """Upsert sync_state entries in the caller's transaction."""
+        cursor.executemany("""
+            INSERT INTO sync_state (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+        """, list(values.items()))
+
+    def _sheet_hashes(self, path: Path) -> dict[str, str]:
+        """Content hashes of the imported sheets; empty if the package can't be read."""
+        try:
+            with XlsxPatcher(path) as patcher:
+                return patcher.sheet_digests([name for name in IMPORT_SHEETS if name in patcher.sheetnames])
+        except Exception as e:
+            print(f"Could not hash workbook sheets, importing all of them: {e}")
+            return {}
+
+    def import_from_excel(self, force: bool = False) -> SyncResult:
+        """Import data from Excel file into the database.
+
+        Skips the import when the file is byte-identical to the last one
+        imported, and skips individual sheets whose content hash matches.
+        `force` imports everything regardless. Fails fast if another sync
+        holds the lease.
+        """
+        return self._run_under_lease("import", lambda: self._import_from_excel(force))
+
+    def _import_from_excel(self, force: bool) -> SyncResult:
         errors = []
         records_processed = 0
+        timings = {}
         wb = None
         temp_path = None
         downloaded_from_sharepoint = False
@@ -277,6 +602,7 @@ class ExcelSyncService:
         try:
             # Try SharePoint first
             if self.sharepoint_url:
+                self._report_progress("downloading", 0.0)
                 temp_path = self._download_from_sharepoint()
                 if temp_path and temp_path.exists():
                     downloaded_from_sharepoint = True
@@ -289,61 +615,100 @@ class ExcelSyncService:
                         message=f"Excel file not found: {self.excel_path}",
                         errors=[f"File not found: {self.excel_path}"]
                     )
-                temp_path = self.backup_dir / "temp_import.xlsx"
+                temp_path = self._temp_workbook("temp_import_")
                 # Create a temporary copy to avoid lock issues
                 shutil.copy2(self.excel_path, temp_path)
 
+            source_msg = "from SharePoint" if downloaded_from_sharepoint else "from local file"
+
+            # Content hashes of what was last imported decide what to skip
+            self._report_progress("hashing", 0.1)
+            started = time.perf_counter()
+            file_hash = _file_sha256(temp_path)
+            stored_hashes = self._read_sync_state()
+            if not force and stored_hashes.get(IMPORT_FILE_HASH_KEY) == file_hash:
+                timings["hash"] = round(time.perf_counter() - started, 3)
+                self._log_sync("import", "unchanged", 0, f"Workbook unchanged {source_msg}")
+                return SyncResult(
+                    success=True,
+                    message=f"Workbook {source_msg} is unchanged since the last import",
+                    unchanged=True,
+                    unchanged_sheets=[
+                        key[len(IMPORT_SHEET_HASH_PREFIX):] for key in stored_hashes
+                        if key.startswith(IMPORT_SHEET_HASH_PREFIX)
+                    ],
+                    timings=timings,
+                )
+            sheet_hashes = self._sheet_hashes(temp_path)
+            timings["hash"] = round(time.perf_counter() - started, 3)
+
             wb = load_workbook(temp_path, read_only=True, data_only=True)
 
             with get_db() as conn:
                 cursor = conn.cursor()
 
-                # Import TP INBOUND
-                if "TP INBOUND" in wb.sheetnames:
-                    sheet = wb["TP INBOUND"]
-                    count = self._import_inbound_sheet(cursor, sheet, "TP")
-                    records_processed += count
-
-                # Import OTHERINBOUND
-                if "OTHERINBOUND" in wb.sheetnames:
-                    sheet = wb["OTHERINBOUND"]
-                    count = self._import_inbound_sheet(cursor, sheet, "OTHER")
-                    records_processed += count
-
-                # Import TP OUTBOUND
-                if "TP OUTBOUND" in wb.sheetnames:
-                    sheet = wb["TP OUTBOUND"]
-                    count = self._import_outbound_sheet(cursor, sheet, "TP")
-                    records_processed += count
-
-                # Import OTHEROUTBOUND
-                if "OTHEROUTBOUND" in wb.sheetnames:
-                    sheet = wb["OTHEROUTBOUND"]
-                    count = self._import_outbound_sheet(cursor, sheet, "OTHER")
-                    records_processed += count
-
-                # Import Carriers & Customers
-                if "Carriers&Customers" in wb.sheetnames:
-                    sheet = wb["Carriers&Customers"]
-                    count = self._import_reference_sheet(cursor, sheet)
-                    records_processed += count
-
-                # Import Products
-                if "Product Counts" in wb.sheetnames:
-                    sheet = wb["Product Counts"]
-                    count = self._import_products_sheet(cursor, sheet)
-                    records_processed += count
+                # All sheets are applied in one transaction
+                sheet_names = [name for name in IMPORT_SHEETS if name in wb.sheetnames]
+                unchanged_sheets = [] if force else [
+                    name for name in sheet_names
+                    if name in sheet_hashes
+                    and stored_hashes.get(IMPORT_SHEET_HASH_PREFIX + name) == sheet_hashes[name]
+                ]
+                sheet_names = [name for name in sheet_names if name not in unchanged_sheets]
+                now = datetime.now().isoformat()
+                records_processed = None
+
+                # Parallel parsing only pays off with at least two workers on two CPUs
+                workers = min(IMPORT_PARALLEL_WORKERS, os.cpu_count() or 1, len(sheet_names))
+                if workers > 1:
+                    try:
+                        records_processed = self._import_sheets_parallel(
+                            cursor, temp_path, sheet_names, now, timings, workers, incremental=not force
+                        )
+                    except Exception as e:
+                        # Nothing is committed yet; redo everything on the serial path
+                        print(f"Parallel import failed, falling back to serial: {e}")
+                        conn.rollback()
+                        for sheet_name in sheet_names:
+                            timings.pop(sheet_name, None)
+
+                if records_processed is None:
+                    records_processed = self._import_sheets_serial(
+                        cursor, wb, sheet_names, now, timings, incremental=not force
+                    )
 
+                self._report_progress("committing", 0.95)
+                # Recorded in the same transaction as the rows they describe
+                self._write_sync_state(cursor, {
+                    IMPORT_FILE_HASH_KEY: file_hash,
+                    **{IMPORT_SHEET_HASH_PREFIX + name: digest for name, digest in sheet_hashes.items()},
+                })
+                # Another worker may have taken over while this transaction
+                # blocked the heartbeat; its writes must not land on top
+                self._confirm_lease(cursor)
                 conn.commit()
 
-            source_msg = "from SharePoint" if downloaded_from_sharepoint else "from local file"
-            self._log_sync("import", "success", records_processed, source_msg)
+            if not sheet_names:
+                self._log_sync("import", "unchanged", 0, f"All sheets unchanged {source_msg}")
+                return SyncResult(
+                    success=True,
+                    message=f"All sheets {source_msg} are unchanged since the last import",
+                    unchanged=True,
+                    unchanged_sheets=unchanged_sheets,
+                    timings=timings,
+                )
+
+            dashboard_cache.invalidate()
+            skipped_msg = f" ({len(unchanged_sheets)} unchanged sheets skipped)" if unchanged_sheets else ""
+            self._log_sync("import", "success", records_processed, source_msg + skipped_msg)
 
             return SyncResult(
                 success=True,
-                message=f"Successfully imported {records_processed} records {source_msg}",
+                message=f"Successfully imported {records_processed} records {source_msg}{skipped_msg}",
                 records_processed=records_processed,
-                errors=errors
+                errors=errors,
+                timings=timings,
+                unchanged_sheets=unchanged_sheets,
             )
 
         except PermissionError as e:
@@ -363,21 +728,124 @@ class ExcelSyncService:
                 errors=errors
             )
         finally:
-            # Always close workbook if it was opened
+            # The read-only workbook keeps the file open until closed
             if wb is not None:
-                try:
-                    wb.close()
-                except:
-                    pass
+                wb.close()
             # Clean up temp file
-            temp_path.unlink(missing_ok=True)
+            if temp_path is not None:
+                temp_path.unlink(missing_ok=True)
+
+    def _import_sheets_serial(self, cursor, wb, sheet_names: list[str], now: str, timings: dict, incremental: bool = True) -> int:
+        """Parse and write each sheet in turn, one batch of rows at a time."""
+        count = 0
+        for index, sheet_name in enumerate(sheet_names):
+            kind, source = IMPORT_SHEETS[sheet_name]
+            self._report_progress(f"importing {sheet_name}", 0.15 + 0.8 * index / len(sheet_names))
+            started = time.perf_counter()
+            records = self._sheet_records(wb[sheet_name], kind, source, now)
+            for batch in _batched(records, IMPORT_BATCH_SIZE):
+                count += self._write_records(cursor, sheet_name, batch, incremental)
+            timings[sheet_name] = round(time.perf_counter() - started, 3)
+        return count
 
-    def _import_inbound_sheet(self, cursor, sheet, source: str) -> int:
-        """Import inbound shipments from a sheet."""
+    def _import_sheets_parallel(self, cursor, path: Path, sheet_names: list[str], now: str, timings: dict, workers: int, incremental: bool = True) -> int:
+        """Parse sheets in worker processes while this thread writes their batches.
+
+        Workers send batches through a bounded queue, so memory stays flat
+        just like the serial path. Per-sheet timings are worker parse times.
+        """
+        ctx = multiprocessing.get_context("spawn")
+        messages = ctx.Queue(maxsize=workers * 4)
+        waiting = list(sheet_names)
+        running = {}
         count = 0
-        rows = list(sheet.iter_rows(min_row=2, values_only=True))
 
-        for row_num, row in enumerate(rows, start=2):
+        try:
+            while waiting or running:
+                while waiting and len(running) < workers:
+                    sheet_name = waiting.pop(0)
+                    process = ctx.Process(
+                        target=_parse_sheet_worker,
+                        args=(messages, str(path), sheet_name, now),
+                        daemon=True,
+                    )
+                    process.start()
+                    running[sheet_name] = process
+
+                try:
+                    sheet_name, status, payload = messages.get(timeout=1)
+                except queue.Empty:
+                    # A worker killed outright (e.g. out of memory) never reports back
+                    for name, process in running.items():
+                        if process.exitcode not in (None, 0):
+                            raise RuntimeError(f"Parser for {name} exited with code {process.exitcode}")
+                    continue
+
+                if status == "batch":
+                    count += self._write_records(cursor, sheet_name, payload, incremental)
+                elif status == "done":
+                    timings[sheet_name] = payload
+                    running.pop(sheet_name).join()
+                    done = len(sheet_names) - len(waiting) - len(running)
+                    self._report_progress(f"imported {sheet_name}", 0.15 + 0.8 * done / len(sheet_names))
+                else:
+                    raise RuntimeError(f"Failed to parse {sheet_name}: {payload}")
+        finally:
+            for process in running.values():
+                process.terminate()
+
+        return count
+
+    def _sheet_records(self, sheet, kind: str, source: Optional[str], now: str):
+        """Yield the write tuples for one sheet (see IMPORT_SHEETS).
+
+        Shipment sheets yield (excel_row, fingerprint, record) triples.
+        """
+        if kind == "inbound":
+            return self._inbound_records(sheet, source, now)
+        if kind == "outbound":
+            return self._outbound_records(sheet, source, now)
+        if kind == "reference":
+            return self._reference_records(sheet)
+        return self._product_records(sheet)
+
+    def _write_records(self, cursor, sheet_name: str, batch: list, incremental: bool = True) -> int:
+        """Write one batch of parsed records; returns the number of records written.
+
+        With `incremental`, shipment rows whose fingerprint matches the last
+        import (and that are still linked to a record) are skipped.
+        """
+        kind, source = IMPORT_SHEETS[sheet_name]
+        if kind == "reference":
+            carriers = [(carrier,) for carrier, _ in batch if carrier]
+            customers = [(customer,) for _, customer in batch if customer]
+            cursor.executemany("INSERT OR IGNORE INTO carriers (name) VALUES (?)", carriers)
+            cursor.executemany("INSERT OR IGNORE INTO customers (name) VALUES (?)", customers)
+            return len(carriers) + len(customers)
+        if kind == "products":
+            cursor.executemany(UPSERT_SQL[kind], batch)
+            return len(batch)
+
+        if incremental and batch:
+            # Batches arrive in sheet order, so one range scan covers them
+            cursor.execute(f"""
+                SELECT f.excel_row, f.hash FROM row_fingerprints f
+                JOIN {kind}_shipments s ON s.source = ? AND s.excel_row = f.excel_row
+                WHERE f.sheet = ? AND f.excel_row BETWEEN ? AND ?
+            """, (source, sheet_name, batch[0][0], batch[-1][0]))
+            known = dict(cursor.fetchall())
+            batch = [item for item in batch if known.get(item[0]) != item[1]]
+
+        cursor.executemany(UPSERT_SQL[kind], [record for _, _, record in batch])
+        cursor.executemany(
+            FINGERPRINT_UPSERT_SQL,
+            [(sheet_name, row_num, fingerprint) for row_num, fingerprint, _ in batch]
+        )
+        return len(batch)
+
+    def _inbound_records(self, sheet, source: str, now: str):
+        """Yield (excel_row, fingerprint, inbound upsert tuple) from a sheet, one row at a time."""
+        for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
             if not row or all(cell is None for cell in row):
                 continue
 
@@ -407,52 +875,15 @@ class ExcelSyncService:
                 pallets = self._parse_number(row[7])
                 notes = str(row[8]) if len(row) > 8 and row[8] else None
 
-            # Check if record exists by excel_row
-            cursor.execute(
-                "SELECT id FROM inbound_shipments WHERE source = ? AND excel_row = ?",
-                (source, row_num)
+            yield row_num, _row_fingerprint(row), (
+                source, item_number, int(cases) if cases else None, po, carrier,
+                bol_number, tp_receipt, ship_date, 1 if received else 0,
+                pallets, notes, row_num, now, now, now
             )
-            existing = cursor.fetchone()
-
-            now = datetime.now().isoformat()
-
-            if existing:
-                cursor.execute("""
-                    UPDATE inbound_shipments SET
-                        item_number = ?, cases = ?, po = ?, carrier = ?,
-                        bol_number = ?, tp_receipt_number = ?, ship_date = ?,
-                        received = ?, pallets = ?, notes = ?,
-                        updated_at = ?, synced_at = ?
-                    WHERE id = ?
-                """, (
-                    item_number, int(cases) if cases else None, po, carrier,
-                    bol_number, tp_receipt, ship_date,
-                    1 if received else 0, pallets, notes,
-                    now, now, existing[0]
-                ))
-            else:
-                cursor.execute("""
-                    INSERT INTO inbound_shipments (
-                        source, item_number, cases, po, carrier, bol_number,
-                        tp_receipt_number, ship_date, received, pallets, notes,
-                        excel_row, created_at, updated_at, synced_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    source, item_number, int(cases) if cases else None, po, carrier,
-                    bol_number, tp_receipt, ship_date, 1 if received else 0,
-                    pallets, notes, row_num, now, now, now
-                ))
-
-            count += 1
-
-        return count
-
-    def _import_outbound_sheet(self, cursor, sheet, source: str) -> int:
-        """Import outbound shipments from a sheet."""
-        count = 0
-        rows = list(sheet.iter_rows(min_row=2, values_only=True))
 
-        for row_num, row in enumerate(rows, start=2):
+    def _outbound_records(self, sheet, source: str, now: str):
+        """Yield (excel_row, fingerprint, outbound upsert tuple) from a sheet, one row at a time."""
+        for row_num, row in enumerate(sheet.iter_rows(min_row=2, values_only=True), start=2):
             if not row or all(cell is None for cell in row):
                 continue
 
@@ -485,53 +916,16 @@ class ExcelSyncService:
                 notes = str(row[10]) if len(row) > 10 and row[10] else None
                 pickup_time = None
 
-            # Check if record exists
-            cursor.execute(
-                "SELECT id FROM outbound_shipments WHERE source = ? AND excel_row = ?",
-                (source, row_num)
+            yield row_num, _row_fingerprint(row), (
+                source, reference_number, order_number, customer,
+                ship_date, carrier, 1 if shipped else 0, 1 if delayed else 0, actual_date,
+                pallets, pro, seal, notes, pickup_time, normalize_customer_key(customer),
+                row_num, now, now, now
             )
-            existing = cursor.fetchone()
-
-            now = datetime.now().isoformat()
-
-            if existing:
-                cursor.execute("""
-                    UPDATE outbound_shipments SET
-                        reference_number = ?, order_number = ?, customer = ?,
-                        ship_date = ?, carrier = ?, shipped = ?, delayed = ?, actual_date = ?,
-                        pallets = ?, pro = ?, seal = ?, notes = ?, pickup_time = ?,
-                        updated_at = ?, synced_at = ?
-                    WHERE id = ?
-                """, (
-                    reference_number, order_number, customer, ship_date,
-                    carrier, 1 if shipped else 0, 1 if delayed else 0, actual_date, pallets,
-                    pro, seal, notes, pickup_time, now, now, existing[0]
-                ))
-            else:
-                cursor.execute("""
-                    INSERT INTO outbound_shipments (
-                        source, reference_number, order_number, customer,
-                        ship_date, carrier, shipped, delayed, actual_date, pallets,
-                        pro, seal, notes, pickup_time, excel_row,
-                        created_at, updated_at, synced_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    source, reference_number, order_number, customer,
-                    ship_date, carrier, 1 if shipped else 0, 1 if delayed else 0, actual_date,
-                    pallets, pro, seal, notes, pickup_time, row_num,
-                    now, now, now
-                ))
-
-            count += 1
-
-        return count
 
-    def _import_reference_sheet(self, cursor, sheet) -> int:
-        """Import carriers and customers from reference sheet."""
-        count = 0
-        rows = list(sheet.iter_rows(min_row=2, values_only=True))
-
-        for row in rows:
+    def _reference_records(self, sheet):
+        """Yield (carrier, customer) name pairs from the reference sheet."""
+        for row in sheet.iter_rows(min_row=2, values_only=True):
             if not row:
                 continue
 
@@ -539,40 +933,17 @@ class ExcelSyncService:
             carrier = str(row[0]).strip() if row[0] else None
             customer = str(row[1]).strip() if len(row) > 1 and row[1] else None
 
-            if carrier:
-                cursor.execute(
-                    "INSERT OR IGNORE INTO carriers (name) VALUES (?)",
-                    (carrier,)
-                )
-                count += 1
-
-            if customer:
-                cursor.execute(
-                    "INSERT OR IGNORE INTO customers (name) VALUES (?)",
-                    (customer,)
-                )
-                count += 1
-
-        return count
-
-    def _import_products_sheet(self, cursor, sheet) -> int:
-        """Import products from product counts sheet."""
-        count = 0
-        rows = list(sheet.iter_rows(min_row=2, values_only=True))
+            if carrier or customer:
+                yield (carrier, customer)
 
-        for row in rows:
+    def _product_records(self, sheet):
+        """Yield product upsert tuples from the product counts sheet."""
+        for row in sheet.iter_rows(min_row=2, values_only=True):
             if not row or not row[0]:
                 continue
 
             item_number = str(row[0]).strip()
 
-            # Check if product exists
-            cursor.execute(
-                "SELECT id FROM products WHERE item_number = ?",
-                (item_number,)
-            )
-            existing = cursor.fetchone()
-
             # Parse product data
             items_per_case = int(self._parse_number(row[1]) or 0) if len(row) > 1 else None
             items_per_pallet = int(self._parse_number(row[2]) or 0) if len(row) > 2 else None
@@ -581,31 +952,18 @@ class ExcelSyncService:
             cases_per_layer = int(self._parse_number(row[5]) or 0) if len(row) > 5 else None
             notes = str(row[6]) if len(row) > 6 and row[6] else None
 
-            if existing:
-                cursor.execute("""
-                    UPDATE products SET
-                        items_per_case = ?, items_per_pallet = ?,
-                        cases_per_pallet = ?, layers_per_pallet = ?,
-                        cases_per_layer = ?, notes = ?
-                    WHERE id = ?
-                """, (
-                    items_per_case, items_per_pallet, cases_per_pallet,
-                    layers_per_pallet, cases_per_layer, notes, existing[0]
-                ))
-            else:
-                cursor.execute("""
-                    INSERT INTO products (
-                        item_number, items_per_case, items_per_pallet,
-                        cases_per_pallet, layers_per_pallet, cases_per_layer, notes
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    item_number, items_per_case, items_per_pallet,
-                    cases_per_pallet, layers_per_pallet, cases_per_layer, notes
-                ))
-
-            count += 1
+            yield (
+                item_number, items_per_case, items_per_pallet,
+                cases_per_pallet, layers_per_pallet, cases_per_layer, notes
+            )
 
-        return count
+    def _claimed_rows(self, cursor, table: str, source: str) -> list[int]:
+        """Sheet rows already linked to a database record."""
+        cursor.execute(
+            f"SELECT excel_row FROM {table} WHERE source = ? AND excel_row IS NOT NULL",
+            (source,)
+        )
+        return [row[0] for row in cursor.fetchall()]
 
     def _wait_for_file_access(self, file_path: Path, max_retries: int = 5, delay: float = 1.0) -> bool:
         """Wait for file to become accessible (not locked by another process)."""
@@ -622,17 +980,30 @@ class ExcelSyncService:
         return False
 
     def export_to_excel(self) -> SyncResult:
-        """Export database changes to the Excel file."""
+        """Export database changes to the Excel file.
+
+        Fails fast if another sync holds the lease.
+        """
+        return self._run_under_lease("export", self._export_to_excel)
+
+    def _export_to_excel(self) -> SyncResult:
         errors = []
         records_processed = 0
-        wb = None
-        temp_path = self.backup_dir / "temp_export.xlsx"
+        temp_path = self._temp_workbook("temp_export_")
         source_file = None
+        downloaded = False
+        # Rows edited after this instant stay dirty for the next export
+        started_at = datetime.now().isoformat()
+        exported = {"inbound_shipments": [], "outbound_shipments": []}
 
         try:
             # Try to get the source file - prefer SharePoint, fall back to local
             if self.sharepoint_url:
-                source_file = self._download_from_sharepoint()
+                self._report_progress("downloading", 0.0)
+                # Graph writes are diffed against this copy, so always revalidate it
+                max_age = 0 if EXPORT_ENGINE == "graph" else SHAREPOINT_CACHE_MAX_AGE_SECONDS
+                source_file = self._download_from_sharepoint(max_age=max_age)
+                downloaded = source_file is not None
 
             if not source_file or not source_file.exists():
                 # Fall back to local file
@@ -649,54 +1020,46 @@ class ExcelSyncService:
             # Copy source to temp file for editing
             shutil.copy2(source_file, temp_path)
 
-            # Work with the temp copy
-            wb = load_workbook(temp_path)
-
-            with get_db() as conn:
-                cursor = conn.cursor()
-
-                # Export TP INBOUND
-                if "TP INBOUND" in wb.sheetnames:
-                    sheet = wb["TP INBOUND"]
-                    count = self._export_inbound_sheet(cursor, sheet, "TP")
-                    records_processed += count
-
-                # Export OTHERINBOUND
-                if "OTHERINBOUND" in wb.sheetnames:
-                    sheet = wb["OTHERINBOUND"]
-                    count = self._export_inbound_sheet(cursor, sheet, "OTHER")
-                    records_processed += count
-
-                # Export TP OUTBOUND
-                if "TP OUTBOUND" in wb.sheetnames:
-                    sheet = wb["TP OUTBOUND"]
-                    count = self._export_outbound_sheet(cursor, sheet, "TP")
-                    records_processed += count
-
-                # Export OTHEROUTBOUND
-                if "OTHEROUTBOUND" in wb.sheetnames:
-                    sheet = wb["OTHEROUTBOUND"]
-                    count = self._export_outbound_sheet(cursor, sheet, "OTHER")
-                    records_processed += count
-
-                # Commit excel_row updates for new records
-                conn.commit()
-
-            # Save to temp file first
-            wb.save(temp_path)
-            wb.close()
-            wb = None
+            self._report_progress("writing workbook", 0.2)
+            records_processed = None
+            written_through_graph = False
+            if EXPORT_ENGINE == "graph" and downloaded and self.is_sharepoint_upload_configured():
+                try:
+                    records_processed = self._export_with_xml_patch(temp_path, exported, through_graph=True)
+                    written_through_graph = True
+                except Exception as e:
+                    # Only excel_row assignments were committed; the file
+                    # export below writes those rows in place and rewrites
+                    # any ranges that did go through
+                    print(f"Graph workbook export failed, uploading the file instead: {e}")
+                    for record_ids in exported.values():
+                        record_ids.clear()
+            if records_processed is None and EXPORT_ENGINE in ("xml", "graph"):
+                try:
+                    records_processed = self._export_with_xml_patch(temp_path, exported)
+                except Exception as e:
+                    print(f"XML export failed, falling back to openpyxl: {e}")
+                    for record_ids in exported.values():
+                        record_ids.clear()
+            if records_processed is None:
+                records_processed = self._export_with_openpyxl(temp_path, exported)
 
             # Try to upload to SharePoint if configured
             sharepoint_status = ""
             uploaded_to_sharepoint = False
-            if self.is_sharepoint_upload_configured():
+            if written_through_graph:
+                sharepoint_status = " and written to SharePoint cell by cell"
+                uploaded_to_sharepoint = True
+                self._mark_download_stale()
+            elif self.is_sharepoint_upload_configured():
+                self._report_progress("uploading", 0.7)
                 print(f"Attempting SharePoint upload to user: {self.sharepoint_user}, path: {self.sharepoint_file_path}")
                 upload_success, upload_msg = self._upload_to_sharepoint(temp_path)
                 print(f"SharePoint upload result: success={upload_success}, msg={upload_msg}")
                 if upload_success:
                     sharepoint_status = " and uploaded to SharePoint"
                     uploaded_to_sharepoint = True
+                    self._mark_download_stale()
                 else:
                     errors.append(f"SharePoint upload failed: {upload_msg}")
                     sharepoint_status = f" (SharePoint upload failed: {upload_msg})"
@@ -730,12 +1093,16 @@ class ExcelSyncService:
 
             temp_path.unlink(missing_ok=True)
 
-            # Update synced_at for all records
-            now = datetime.now().isoformat()
+            # Mark only the rows written by this export as synced
+            self._report_progress("finalizing", 0.95)
             with get_db() as conn:
                 cursor = conn.cursor()
-                cursor.execute("UPDATE inbound_shipments SET synced_at = ?", (now,))
-                cursor.execute("UPDATE outbound_shipments SET synced_at = ?", (now,))
+                for table, record_ids in exported.items():
+                    cursor.executemany(
+                        f"UPDATE {table} SET synced_at = ? WHERE id = ?",
+                        [(started_at, record_id) for record_id in record_ids]
+                    )
+                self._confirm_lease(cursor)
                 conn.commit()
 
             self._log_sync("export", "success", records_processed, sharepoint_status)
@@ -764,21 +1131,10 @@ class ExcelSyncService:
                 errors=errors
             )
         finally:
-            # Always close workbook if it was opened
-            if wb is not None:
-                try:
-                    wb.close()
-                except:
-                    pass
-            # Clean up temp file
+            # Clean up temp files
             temp_path.unlink(missing_ok=True)
-
-    def _find_next_available_row(self, sheet) -> int:
-        """Find the next empty row in a sheet (first row where column A is empty)."""
-        for row_num in range(2, sheet.max_row + 2):  # Start from row 2 (after header)
-            if sheet.cell(row=row_num, column=1).value is None:
-                return row_num
-        return sheet.max_row + 1
+            if downloaded:
+                source_file.unlink(missing_ok=True)
 
     def _cell_value_matches(self, cell_value, db_value) -> bool:
         """Check if Excel cell value matches database value."""
@@ -829,23 +1185,24 @@ class ExcelSyncService:
                 pass
         return str(value) if value else None
 
-    def _update_cell_if_changed(self, sheet, row, col, new_value, is_date: bool = False, is_new_row: bool = False, is_notes_col: bool = False) -> bool:
-        """Update cell only if value has changed. Returns True if updated."""
-        current = sheet.cell(row=row, column=col).value
-
+    def _changed_cell_value(self, current, new_value, is_date: bool = False) -> tuple[bool, object]:
+        """Compare a cell with its database value; returns (changed, value to write)."""
         # For dates, normalize both values for comparison
         if is_date:
-            current_normalized = self._normalize_date_for_comparison(current)
-            new_normalized = self._normalize_date_for_comparison(new_value)
-            if current_normalized == new_normalized:
-                return False
+            if new_value is None and self._parse_date(current) is None:
+                # Blank, or text like "TBD" that imported as no date; keep it
+                return False, None
+            changed = self._normalize_date_for_comparison(current) != self._normalize_date_for_comparison(new_value)
             # Format the date for Excel output
-            formatted_value = self._format_date_for_excel(new_value) if new_value else None
-            cell = sheet.cell(row=row, column=col, value=formatted_value)
-        else:
-            if self._cell_value_matches(current, new_value):
-                return False
-            cell = sheet.cell(row=row, column=col, value=new_value)
+            return changed, self._format_date_for_excel(new_value) if new_value else None
+        return not self._cell_value_matches(current, new_value), new_value
+
+    def _update_cell_if_changed(self, sheet, row, col, new_value, is_date: bool = False, is_new_row: bool = False, is_notes_col: bool = False) -> bool:
+        """Update cell only if value has changed. Returns True if updated."""
+        changed, value = self._changed_cell_value(sheet.cell(row=row, column=col).value, new_value, is_date)
+        if not changed:
+            return False
+        cell = sheet.cell(row=row, column=col, value=value)
 
         # Apply alignment for new rows
         if is_new_row:
@@ -856,119 +1213,234 @@ class ExcelSyncService:
 
         return True
 
-    def _export_inbound_sheet(self, cursor, sheet, source: str) -> int:
-        """Export inbound shipments to Excel sheet."""
-        count = 0
-        new_records_to_update = []  # Track new records that need excel_row assigned
-
-        # Get ALL records for this source (both existing and new)
-        cursor.execute("""
-            SELECT * FROM inbound_shipments
-            WHERE source = ?
+    def _export_cells(self, kind: str, source: str, row) -> list[tuple]:
+        """Sheet cells for one shipment: (column, value, is_date, is_notes_col) tuples."""
+        if kind == "inbound":
+            received = "Yes" if row["received"] else ""
+            if source == "TP":
+                return [
+                    (1, row["item_number"], False, False),
+                    (2, row["cases"], False, False),
+                    (3, row["po"], False, False),
+                    (4, row["carrier"], False, False),
+                    (5, row["bol_number"], False, False),
+                    (6, row["tp_receipt_number"], False, False),
+                    (7, row["ship_date"], True, False),
+                    (8, received, False, False),
+                    (9, row["pallets"], False, False),
+                    (10, row["notes"], False, True),
+                ]
+            return [
+                (1, row["item_number"], False, False),
+                (2, row["cases"], False, False),
+                (3, row["po"], False, False),
+                (4, row["carrier"], False, False),
+                (5, row["bol_number"], False, False),
+                (6, row["ship_date"], True, False),
+                (7, received, False, False),
+                (8, row["pallets"], False, False),
+                (9, row["notes"], False, True),
+            ]
+
+        # Determine shipped value for Excel
+        # "No" for unshipped, "Yes" for shipped, "Yes-Delayed" for shipped but late
+        if row["shipped"]:
+            shipped_value = "Yes-Delayed" if row["delayed"] else "Yes"
+        else:
+            shipped_value = "No"
+
+        cells = [
+            (1, row["reference_number"], False, False),
+            (2, row["order_number"], False, False),
+            (3, row["customer"], False, False),
+            (4, row["ship_date"], True, False),
+            (5, row["carrier"], False, False),
+            (6, shipped_value, False, False),
+        ]
+        if source == "TP":
+            cells += [
+                (7, row["pallets"], False, False),
+                (8, row["pro"], False, False),
+                (9, row["seal"], False, False),
+                (10, row["notes"], False, True),
+                (11, row["pickup_time"], False, False),
+            ]
+        else:
+            cells += [
+                (7, row["actual_date"], True, False),
+                (8, row["pallets"], False, False),
+                (9, row["pro"], False, False),
+                (10, row["seal"], False, False),
+                (11, row["notes"], False, True),
+            ]
+        return cells
+
+    def _dirty_rows(self, cursor, table: str, source: str) -> list:
+        """Rows that are new or changed since the last export."""
+        cursor.execute(f"""
+            SELECT * FROM {table}
+            WHERE source = ? AND {EXPORT_DIRTY_CONDITION}
+            ORDER BY id
         """, (source,))
-        rows = cursor.fetchall()
+        return cursor.fetchall()
 
-        for row in rows:
-            excel_row = row["excel_row"]
-            record_id = row["id"]
-
-            # If no excel_row, this is a new record - find next available row
-            is_new_row = excel_row is None
-            if is_new_row:
-                excel_row = self._find_next_available_row(sheet)
-                new_records_to_update.append((excel_row, record_id))
-
-            # Update cells only if changed, based on source
-            if source == "TP":
-                self._update_cell_if_changed(sheet, excel_row, 1, row["item_number"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 2, row["cases"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 3, row["po"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 4, row["carrier"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 5, row["bol_number"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 6, row["tp_receipt_number"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 7, row["ship_date"], is_date=True, is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 8, "Yes" if row["received"] else "", is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 9, row["pallets"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 10, row["notes"], is_new_row=is_new_row, is_notes_col=True)
-            else:
-                self._update_cell_if_changed(sheet, excel_row, 1, row["item_number"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 2, row["cases"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 3, row["po"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 4, row["carrier"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 5, row["bol_number"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 6, row["ship_date"], is_date=True, is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 7, "Yes" if row["received"] else "", is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 8, row["pallets"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 9, row["notes"], is_new_row=is_new_row, is_notes_col=True)
-
-            count += 1
+    def _export_with_openpyxl(self, temp_path: Path, exported: dict) -> int:
+        """Export by loading and re-saving the whole workbook with openpyxl."""
+        records_processed = 0
+        wb = load_workbook(temp_path)
+        try:
+            with get_db() as conn:
+                cursor = conn.cursor()
+                for sheet_name, kind, source in EXPORT_SHEETS:
+                    if sheet_name in wb.sheetnames:
+                        records_processed += self._export_sheet(
+                            cursor, wb[sheet_name], kind, source, exported[f"{kind}_shipments"]
+                        )
 
-        # Update excel_row for new records in database
-        for excel_row, record_id in new_records_to_update:
-            cursor.execute(
-                "UPDATE inbound_shipments SET excel_row = ? WHERE id = ?",
-                (excel_row, record_id)
-            )
+                # Commit excel_row updates for new records
+                self._confirm_lease(cursor)
+                conn.commit()
 
-        return count
+            # Save to temp file first
+            wb.save(temp_path)
+        finally:
+            wb.close()
+        return records_processed
 
-    def _export_outbound_sheet(self, cursor, sheet, source: str) -> int:
-        """Export outbound shipments to Excel sheet."""
-        count = 0
+    def _export_sheet(self, cursor, sheet, kind: str, source: str, exported_ids: list) -> int:
+        """Export changed shipments to an openpyxl sheet; appends written ids to exported_ids."""
+        table = f"{kind}_shipments"
         new_records_to_update = []  # Track new records that need excel_row assigned
-
-        # Get ALL records for this source (both existing and new)
-        cursor.execute("""
-            SELECT * FROM outbound_shipments
-            WHERE source = ?
-        """, (source,))
-        rows = cursor.fetchall()
+        rows = self._dirty_rows(cursor, table, source)
+        allocator = None  # Built on the first new record
 
         for row in rows:
             excel_row = row["excel_row"]
-            record_id = row["id"]
+            exported_ids.append(row["id"])
 
-            # If no excel_row, this is a new record - find next available row
+            # If no excel_row, this is a new record - take the next free row
             is_new_row = excel_row is None
             if is_new_row:
-                excel_row = self._find_next_available_row(sheet)
-                new_records_to_update.append((excel_row, record_id))
-
-            # Determine shipped value for Excel
-            # "No" for unshipped, "Yes" for shipped, "Yes-Delayed" for shipped but late
-            if row["shipped"]:
-                shipped_value = "Yes-Delayed" if row["delayed"] else "Yes"
-            else:
-                shipped_value = "No"
+                if allocator is None:
+                    allocator = FreeRowAllocator.from_sheet(sheet, self._claimed_rows(cursor, table, source))
+                excel_row = allocator.allocate()
+                new_records_to_update.append((excel_row, row["id"]))
 
             # Update cells only if changed
-            self._update_cell_if_changed(sheet, excel_row, 1, row["reference_number"], is_new_row=is_new_row)
-            self._update_cell_if_changed(sheet, excel_row, 2, row["order_number"], is_new_row=is_new_row)
-            self._update_cell_if_changed(sheet, excel_row, 3, row["customer"], is_new_row=is_new_row)
-            self._update_cell_if_changed(sheet, excel_row, 4, row["ship_date"], is_date=True, is_new_row=is_new_row)
-            self._update_cell_if_changed(sheet, excel_row, 5, row["carrier"], is_new_row=is_new_row)
-            self._update_cell_if_changed(sheet, excel_row, 6, shipped_value, is_new_row=is_new_row)
+            for col, value, is_date, is_notes_col in self._export_cells(kind, source, row):
+                self._update_cell_if_changed(
+                    sheet, excel_row, col, value,
+                    is_date=is_date, is_new_row=is_new_row, is_notes_col=is_notes_col
+                )
 
-            if source == "TP":
-                self._update_cell_if_changed(sheet, excel_row, 7, row["pallets"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 8, row["pro"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 9, row["seal"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 10, row["notes"], is_new_row=is_new_row, is_notes_col=True)
-                self._update_cell_if_changed(sheet, excel_row, 11, row["pickup_time"], is_new_row=is_new_row)
-            else:
-                self._update_cell_if_changed(sheet, excel_row, 7, row["actual_date"], is_date=True, is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 8, row["pallets"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 9, row["pro"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 10, row["seal"], is_new_row=is_new_row)
-                self._update_cell_if_changed(sheet, excel_row, 11, row["notes"], is_new_row=is_new_row, is_notes_col=True)
+        # Update excel_row for new records in database
+        cursor.executemany(f"UPDATE {table} SET excel_row = ? WHERE id = ?", new_records_to_update)
+        return len(rows)
+
+    def _export_with_xml_patch(self, temp_path: Path, exported: dict, through_graph: bool = False) -> int:
+        """Export by patching only the changed cells in the sheet XML.
+
+        With `through_graph`, temp_path is the workbook just downloaded from
+        SharePoint, and the same changed cells are also written straight to
+        SharePoint as range updates in one workbook session. The excel_row
+        assignments are committed before that, so no write lock is held over
+        the network; if the Graph writes fail, the rows are still unsynced
+        and the next export writes them into their assigned rows.
+        """
+        records_processed = 0
+        patched_path = temp_path.with_name(f"{temp_path.stem}_patched.xlsx")
+        try:
+            with XlsxPatcher(temp_path) as patcher:
+                writer = _CellRecorder(patcher) if through_graph else patcher
+                with get_db() as conn:
+                    cursor = conn.cursor()
+                    for sheet_name, kind, source in EXPORT_SHEETS:
+                        if sheet_name in patcher.sheetnames:
+                            records_processed += self._export_sheet_xml(
+                                cursor, writer, sheet_name, kind, source, exported[f"{kind}_shipments"]
+                            )
+                    # Before anything leaves this process
+                    self._confirm_lease(cursor)
+                    if not through_graph:
+                        # Write the file before committing excel_row
+                        # assignments; an exception here rolls them back
+                        patcher.save(patched_path)
+                    conn.commit()
+                if through_graph:
+                    self._write_cells_through_graph(writer.cells)
+                    patcher.save(patched_path)
+            os.replace(patched_path, temp_path)
+        finally:
+            patched_path.unlink(missing_ok=True)
+        return records_processed
+
+    def _write_cells_through_graph(self, cells: dict):
+        """Send {sheet: {(row, col): value}} as range PATCHes in one workbook session."""
+        if not cells:
+            return
+        token = self._get_graph_access_token()
+        if not token:
+            raise GraphWorkbookError("Could not get Microsoft Graph access token")
+        with WorkbookSession(self.graph_api_base, self._sharepoint_item_path(), token) as session:
+            for sheet_name, sheet_cells in cells.items():
+                values = {position: _graph_cell_value(value) for position, value in sheet_cells.items()}
+                session.patch_ranges(sheet_name, cell_ranges(values))
+        print(f"Wrote {sum(len(c) for c in cells.values())} cells in {session.ranges_sent} ranges through Graph")
+
+    def _export_sheet_xml(self, cursor, patcher: XlsxPatcher, sheet_name: str, kind: str, source: str, exported_ids: list) -> int:
+        """Queue changed shipments as cell patches; appends written ids to exported_ids.
+
+        Existing rows are compared with the sheet and only differing cells are
+        patched. New rows are written in full; their cells take the style of
+        the row above instead of the fixed alignment the openpyxl path applies.
+        """
+        table = f"{kind}_shipments"
+        rows = self._dirty_rows(cursor, table, source)
+        if not rows:
+            return 0
 
-            count += 1
+        new_records_to_update = []
+        scan = patcher.scan(sheet_name, {row["excel_row"] for row in rows if row["excel_row"] is not None})
+        allocator = None
 
-        # Update excel_row for new records in database
-        for excel_row, record_id in new_records_to_update:
-            cursor.execute(
-                "UPDATE outbound_shipments SET excel_row = ? WHERE id = ?",
-                (excel_row, record_id)
-            )
+        for row in rows:
+            excel_row = row["excel_row"]
+            exported_ids.append(row["id"])
 
-        return count
+            is_new_row = excel_row is None
+            if is_new_row:
+                if allocator is None:
+                    allocator = FreeRowAllocator(scan.blank_rows, scan.max_row, self._claimed_rows(cursor, table, source))
+                excel_row = allocator.allocate()
+                new_records_to_update.append((excel_row, row["id"]))
+
+            current = {} if is_new_row else scan.values.get(excel_row, {})
+            for col, value, is_date, _ in self._export_cells(kind, source, row):
+                changed, cell_value = self._changed_cell_value(current.get(col), value, is_date)
+                if changed or is_new_row:
+                    patcher.set_cell(sheet_name, excel_row, col, cell_value)
+
+        cursor.executemany(f"UPDATE {table} SET excel_row = ? WHERE id = ?", new_records_to_update)
+        return len(rows)
+
+
+def _parse_sheet_worker(messages, path: str, sheet_name: str, now: str):
+    """Process entry point for parallel import: parse one sheet into batches.
+
+    Sends ("batch", records) messages followed by ("done", seconds), or
+    ("error", description) if parsing fails.
+    """
+    try:
+        started = time.perf_counter()
+        kind, source = IMPORT_SHEETS[sheet_name]
+        service = ExcelSyncService()
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            records = service._sheet_records(wb[sheet_name], kind, source, now)
+            for batch in _batched(records, IMPORT_BATCH_SIZE):
+                messages.put((sheet_name, "batch", batch))
+        finally:
+            wb.close()
+        messages.put((sheet_name, "done", round(time.perf_counter() - started, 3)))
+    except Exception as e:
+        messages.put((sheet_name, "error", f"{type(e).__name__}: {e}"))
@@ -0,0 +1,487 @@
+"""Shared HTTP plumbing for Microsoft Graph and SharePoint calls.
+
+- `http_session`: one process-wide requests.Session, so downloads, uploads
+  and token requests reuse keep-alive connections. Its adapter retries
+  429/5xx responses, sleeping for Retry-After when the server sends it and
+  backing off exponentially otherwise.
+- `token_cache`: client-credential tokens cached per app registration until
+  shortly before they expire. The msal ConfidentialClientApplication is kept
+  too, so msal's own cache works instead of starting empty on every call.
+- `graph_metrics`: token cache hits/misses, download cache outcomes and
+  per-operation request latency, served by GET /api/sync/graph-stats.
+- `create_upload_session`/`upload_in_chunks`: resumable uploads that stream
+  the file from disk one chunk at a time.
+- `WorkbookSession`/`cell_ranges`: cell-level writes through the Excel
+  workbook API, batched with $batch.
+"""
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import (
+    GRAPH_AUTHORITY_HOST, GRAPH_HTTP_RETRIES, GRAPH_HTTP_BACKOFF, GRAPH_UPLOAD_CHUNK_BYTES,
+    GRAPH_UPLOAD_MAX_FAILURES
+)
+from services.xlsx_patch import column_letters
+
+try:
+    import msal
+    MSAL_AVAILABLE = True
+except ImportError:
+    MSAL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+GRAPH_SCOPES = ["https://graph.microsoft.com/.default"]
+
+# Upload session chunks must be a multiple of this (except the last one)
+UPLOAD_CHUNK_MULTIPLE = 320 * 1024
+
+# Refresh a cached token this long before it actually expires
+TOKEN_EXPIRY_SKEW_SECONDS = 300
+
+# Statuses worth retrying: throttling and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _build_session() -> requests.Session:
+    retry = Retry(
+        total=GRAPH_HTTP_RETRIES,
+        connect=GRAPH_HTTP_RETRIES,
+        read=GRAPH_HTTP_RETRIES,
+        status=GRAPH_HTTP_RETRIES,
+        backoff_factor=GRAPH_HTTP_BACKOFF,
+        status_forcelist=RETRY_STATUSES,
+        # Upload chunks are PUTs of a fixed byte range, and a repeated token
+        # or createUploadSession POST only wastes a token or a session, so
+        # every method is safe to repeat
+        allowed_methods=None,
+        respect_retry_after_header=True,
+        # Hand the last response back instead of raising, so callers can
+        # report Graph's error body
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=8)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+http_session = _build_session()
+
+
+class GraphMetrics:
+    """Counters for token lookups and timed HTTP requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.token_hits = 0
+            self.token_misses = 0
+            self.counters = {}
+            self._requests = {}
+
+    def record_token(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.token_hits += 1
+            else:
+                self.token_misses += 1
+
+    def increment(self, counter: str):
+        """Bump a named event counter, e.g. a download cache outcome."""
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + 1
+
+    def record_request(self, operation: str, seconds: float, status: Optional[int], retries: int):
+        with self._lock:
+            entry = self._requests.setdefault(
+                operation, {"count": 0, "errors": 0, "retries": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+            )
+            entry["count"] += 1
+            entry["retries"] += retries
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            if status is None or status >= 400:
+                entry["errors"] += 1
+
+    def stats(self) -> dict:
+        """Snapshot for monitoring."""
+        with self._lock:
+            lookups = self.token_hits + self.token_misses
+            return {
+                "token": {
+                    "hits": self.token_hits,
+                    "misses": self.token_misses,
+                    "hit_rate": round(self.token_hits / lookups, 3) if lookups else 0.0,
+                },
+                "counters": dict(self.counters),
+                "requests": {
+                    operation: {
+                        "count": entry["count"],
+                        "errors": entry["errors"],
+                        "retries": entry["retries"],
+                        "avg_ms": round(1000 * entry["total_seconds"] / entry["count"], 1),
+                        "max_ms": round(1000 * entry["max_seconds"], 1),
+                    }
+                    for operation, entry in self._requests.items()
+                },
+            }
+
+
+graph_metrics = GraphMetrics()
+
+
+def timed_request(operation: str, method: str, url: str, **kwargs) -> requests.Response:
+    """Send a request through the shared session and record its latency.
+
+    The time covers every retry and Retry-After wait, i.e. what the sync
+    actually spent on the call.
+    """
+    started = time.perf_counter()
+    status = None
+    retries = 0
+    try:
+        response = http_session.request(method, url, **kwargs)
+        status = response.status_code
+        retry_state = getattr(response.raw, "retries", None)
+        retries = len(retry_state.history) if retry_state is not None else 0
+        return response
+    finally:
+        graph_metrics.record_request(operation, time.perf_counter() - started, status, retries)
+
+
+class GraphTokenCache:
+    """Client-credential tokens cached per (tenant, client id, secret)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._apps = {}
+        self._tokens = {}
+
+    def get_token(self, tenant_id: str, client_id: str, client_secret: str) -> Optional[str]:
+        """A valid access token, fetched only when none is cached or it is about to expire."""
+        key = (tenant_id, client_id, client_secret)
+        # Held across the fetch so concurrent callers wait for one token
+        # request instead of each making their own
+        with self._lock:
+            cached = self._tokens.get(key)
+            if cached is not None and cached[1] > time.time() + TOKEN_EXPIRY_SKEW_SECONDS:
+                graph_metrics.record_token(hit=True)
+                return cached[0]
+            graph_metrics.record_token(hit=False)
+
+            app = self._apps.get(key)
+            if app is None:
+                app = msal.ConfidentialClientApplication(
+                    client_id,
+                    authority=f"{GRAPH_AUTHORITY_HOST}/{tenant_id}",
+                    client_credential=client_secret,
+                    http_client=http_session,
+                    # msal skips instance discovery for Microsoft's own hosts anyway; for
+                    # any other GRAPH_AUTHORITY_HOST it would call login.microsoftonline.com
+                    instance_discovery=False,
+                )
+                self._apps[key] = app
+
+            started = time.perf_counter()
+            result = app.acquire_token_for_client(scopes=GRAPH_SCOPES)
+            graph_metrics.record_request(
+                "token", time.perf_counter() - started, 200 if "access_token" in result else None, 0
+            )
+            if "access_token" not in result:
+                logger.error("Failed to get token: %s", result.get("error_description", "Unknown error"))
+                return None
+
+            self._tokens[key] = (result["access_token"], time.time() + int(result.get("expires_in", 3599)))
+            return result["access_token"]
+
+    def invalidate(self, tenant_id: str, client_id: str, client_secret: str):
+        """Forget a token the server rejected (e.g. revoked before expiry)."""
+        key = (tenant_id, client_id, client_secret)
+        with self._lock:
+            self._tokens.pop(key, None)
+            # msal caches client-credential tokens too and would hand back the same one
+            self._apps.pop(key, None)
+
+
+token_cache = GraphTokenCache()
+
+
+class GraphUploadError(Exception):
+    """An upload session failed for good."""
+
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class UploadSessionLost(GraphUploadError):
+    """The upload session expired or was cancelled; start a new one."""
+
+
+def graph_error_message(response: requests.Response) -> str:
+    """Graph's "code - message" for an error response, or the raw body."""
+    try:
+        error = response.json().get("error", {})
+        return f"{error.get('code', 'Unknown')} - {error.get('message', 'Unknown error')}"
+    except ValueError:
+        return response.text[:200]
+
+
+def create_upload_session(item_url: str, token: str) -> str:
+    """Start an upload session replacing the drive item; returns its upload URL."""
+    response = timed_request(
+        "upload_session", "POST", f"{item_url}:/createUploadSession",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"item": {"@microsoft.graph.conflictBehavior": "replace"}},
+        timeout=30,
+    )
+    if response.status_code != 200:
+        raise GraphUploadError(
+            f"createUploadSession failed ({response.status_code}): {graph_error_message(response)}",
+            response.status_code,
+        )
+    return response.json()["uploadUrl"]
+
+
+def _next_offset(status: dict) -> Optional[int]:
+    """Start of the first range the server still expects ("26-" or "26-49")."""
+    ranges = status.get("nextExpectedRanges") or []
+    return int(ranges[0].split("-")[0]) if ranges else None
+
+
+def _resume_offset(upload_url: str) -> int:
+    """Ask the upload session which byte it expects next."""
+    response = timed_request("upload_status", "GET", upload_url, timeout=30)
+    if response.status_code == 404:
+        raise UploadSessionLost("upload session expired")
+    if response.status_code != 200:
+        raise GraphUploadError(
+            f"upload status failed ({response.status_code}): {graph_error_message(response)}",
+            response.status_code,
+        )
+    offset = _next_offset(response.json())
+    if offset is None:
+        # Every byte arrived but the final response was lost; the session
+        # can't tell us whether the item was committed
+        raise UploadSessionLost("upload session has no remaining ranges")
+    return offset
+
+
+def upload_in_chunks(
+    upload_url: str,
+    path: Path,
+    chunk_size: int = GRAPH_UPLOAD_CHUNK_BYTES,
+    max_failures: int = GRAPH_UPLOAD_MAX_FAILURES,
+) -> requests.Response:
+    """PUT `path` to an upload session chunk by chunk; returns the final response.
+
+    Only one chunk is in memory at a time. The shared session already
+    retries throttled and 5xx chunk requests; when a chunk still fails (or
+    the connection drops partway), wait with exponential backoff, ask the
+    session for the next expected range and continue from there. The upload
+    URL is pre-authenticated, so chunks carry no Authorization header.
+    """
+    chunk_size = max(UPLOAD_CHUNK_MULTIPLE, chunk_size - chunk_size % UPLOAD_CHUNK_MULTIPLE)
+    total = path.stat().st_size
+    if total == 0:
+        raise GraphUploadError("refusing to upload an empty file")
+
+    offset = 0
+    failures = 0
+    with open(path, "rb") as f:
+        while True:
+            f.seek(offset)
+            chunk = f.read(chunk_size)
+            end = offset + len(chunk) - 1
+            try:
+                response = timed_request(
+                    "upload_chunk", "PUT", upload_url, data=chunk,
+                    headers={"Content-Range": f"bytes {offset}-{end}/{total}"},
+                    timeout=120,
+                )
+                error = None
+            except requests.RequestException as e:
+                response, error = None, str(e)
+
+            if response is not None:
+                if response.status_code in (200, 201):
+                    return response
+                if response.status_code == 202:
+                    next_offset = _next_offset(response.json())
+                    offset = end + 1 if next_offset is None else next_offset
+                    failures = 0
+                    continue
+                if response.status_code == 404:
+                    raise UploadSessionLost("upload session expired")
+                error = f"{response.status_code}: {graph_error_message(response)}"
+
+            logger.warning("Upload chunk at byte %d failed (%s); resuming", offset, error)
+            # A network blip can fail the status check too; it counts as
+            # another failure and gets the next, longer backoff
+            while True:
+                failures += 1
+                if failures > max_failures:
+                    raise GraphUploadError(f"chunk at byte {offset} failed {failures} times, last error {error}")
+                time.sleep(min(GRAPH_HTTP_BACKOFF * 2 ** (failures - 1), 30))
+                try:
+                    offset = _resume_offset(upload_url)
+                    break
+                except requests.RequestException as e:
+                    error = str(e)
+                    logger.warning("Upload status check failed (%s); retrying", error)
+
+
+class GraphWorkbookError(Exception):
+    """A workbook session or range update failed."""
+
+
+# Requests per $batch call (Graph's limit)
+BATCH_MAX_REQUESTS = 20
+
+# Most rows sent in one range PATCH, keeping request bodies small
+RANGE_MAX_ROWS = 500
+
+
+def cell_ranges(cells: dict) -> list[tuple[str, list[list]]]:
+    """Group {(row, col): value} into rectangular ranges: [(address, values)].
+
+    Runs of adjacent columns in a row become one range, and consecutive
+    rows with the same run (new rows written in full) merge into a block.
+    Only the given cells are covered; nothing in between is overwritten.
+    """
+    runs = []
+    for row, col in sorted(cells):
+        if runs and runs[-1][0] == row and runs[-1][2] == col - 1:
+            runs[-1][2] = col
+            runs[-1][3].append(cells[(row, col)])
+        else:
+            runs.append([row, col, col, [cells[(row, col)]]])
+
+    blocks = []
+    for row, first, last, values in runs:
+        block = blocks[-1] if blocks else None
+        if (block and block[1] == row - 1 and block[2] == first and block[3] == last
+                and len(block[4]) < RANGE_MAX_ROWS):
+            block[1] = row
+            block[4].append(values)
+        else:
+            blocks.append([row, row, first, last, [values]])
+
+    return [
+        (f"{column_letters(first)}{top}:{column_letters(last)}{bottom}", values)
+        for top, bottom, first, last, values in blocks
+    ]
+
+
+class WorkbookSession:
+    """A persistent Graph workbook session used to PATCH cell ranges.
+
+    Range updates go out through $batch, BATCH_MAX_REQUESTS at a time, all
+    carrying the session id so Excel applies them in one session and
+    persists them when it closes. Sub-requests answered with 429/5xx are
+    resent (after the longest Retry-After among them, or exponential
+    backoff); any other failure raises GraphWorkbookError.
+    """
+
+    def __init__(self, api_base: str, item_path: str, token: str):
+        self.api_base = api_base
+        self.item_path = item_path
+        self.token = token
+        self.session_id = None
+        self.ranges_sent = 0
+
+    def _headers(self, **extra) -> dict:
+        return {"Authorization": f"Bearer {self.token}", **extra}
+
+    def open(self):
+        response = timed_request(
+            "workbook_session", "POST", f"{self.api_base}{self.item_path}:/workbook/createSession",
+            headers=self._headers(), json={"persistChanges": True}, timeout=60,
+        )
+        if response.status_code not in (200, 201):
+            raise GraphWorkbookError(f"createSession failed ({response.status_code}): {graph_error_message(response)}")
+        self.session_id = response.json()["id"]
+
+    def close(self):
+        if self.session_id is None:
+            return
+        try:
+            timed_request(
+                "workbook_session", "POST", f"{self.api_base}{self.item_path}:/workbook/closeSession",
+                headers=self._headers(**{"workbook-session-id": self.session_id}), timeout=60,
+            )
+        except requests.RequestException as e:
+            # The session expires on its own; changes were already persisted
+            logger.warning("closeSession failed: %s", e)
+        self.session_id = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def patch_ranges(self, sheet_name: str, ranges: list[tuple[str, list[list]]]):
+        """Write each (address, values) range of `sheet_name`."""
+        sheet = quote(sheet_name.replace("'", "''"))
+        requests_ = [
+            {
+                "id": str(index),
+                "method": "PATCH",
+                "url": f"{self.item_path}:/workbook/worksheets('{sheet}')/range(address='{address}')",
+                "headers": {"Content-Type": "application/json", "workbook-session-id": self.session_id},
+                "body": {"values": values},
+            }
+            for index, (address, values) in enumerate(ranges, 1)
+        ]
+        for start in range(0, len(requests_), BATCH_MAX_REQUESTS):
+            self._send_batch(requests_[start:start + BATCH_MAX_REQUESTS])
+        self.ranges_sent += len(requests_)
+
+    def _send_batch(self, batch: list[dict]):
+        pending = {request["id"]: request for request in batch}
+        failures = 0
+        while pending:
+            response = timed_request(
+                "workbook_batch", "POST", f"{self.api_base}/$batch",
+                headers=self._headers(), json={"requests": list(pending.values())}, timeout=120,
+            )
+            if response.status_code != 200:
+                raise GraphWorkbookError(f"$batch failed ({response.status_code}): {graph_error_message(response)}")
+
+            retry_after = 0.0
+            for result in response.json().get("responses", []):
+                status = result.get("status", 0)
+                if status < 300:
+                    pending.pop(result["id"], None)
+                elif status in RETRY_STATUSES:
+                    headers = {name.lower(): value for name, value in (result.get("headers") or {}).items()}
+                    retry_after = max(retry_after, float(headers.get("retry-after", 0)))
+                else:
+                    error = (result.get("body") or {}).get("error", {})
+                    raise GraphWorkbookError(
+                        f"{pending[result['id']]['url']} failed ({status}): "
+                        f"{error.get('code', 'Unknown')} - {error.get('message', 'Unknown error')}"
+                    )
+
+            if pending:
+                failures += 1
+                if failures > GRAPH_HTTP_RETRIES:
+                    raise GraphWorkbookError(f"{len(pending)} range updates still throttled after {failures} attempts")
+                time.sleep(max(retry_after, GRAPH_HTTP_BACKOFF * 2 ** (failures - 1)))
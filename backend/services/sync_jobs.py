@@ -0,0 +1,304 @@
+"""Background runner for Excel sync jobs.
+
+Import/export requests enqueue a row in sync_jobs and return its id at
+once; a request for a job type that is already queued or running gets the
+in-flight job back instead of a duplicate. A worker thread in every app
+process takes the cross-worker sync lease (services/sync_lease.py) before
+claiming queued jobs, so only one process syncs at a time, then runs them
+and records progress phase by phase. A running job whose lease has expired
+belonged to a worker that died and is marked failed. Job state lives in
+SQLite, so any process can answer /api/sync/jobs/{id}. Progress reported
+from inside a sync's transaction can't be written without joining that
+transaction; it is kept in memory until the sync is between transactions
+and merged into the jobs this process reads.
+
+A scheduler thread enqueues an export followed by an import every
+AUTO_SYNC_INTERVAL_MINUTES (0 disables it). Each interval is a numbered
+slot claimed through sync_state, so several processes still produce one
+scheduled run per interval.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from config import AUTO_SYNC_INTERVAL_MINUTES
+from database import get_db, in_get_db
+from services.excel_sync import ExcelSyncService
+from services.sync_lease import SyncLease, SYNC_LEASE_NAME
+
+# Seconds between checks for jobs queued by other processes
+JOB_POLL_SECONDS = 2
+
+# Seconds between scheduler checks for a new interval slot
+SCHEDULE_CHECK_SECONDS = 30
+
+# Order of the jobs enqueued per scheduled run: push local edits first,
+# then pull what changed in the workbook
+SCHEDULED_JOB_TYPES = ("export", "import")
+
+SCHEDULE_SLOT_KEY = "schedule.sync_slot"
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+# Latest phase/progress of jobs running in this process, by job id
+_live_progress = {}
+_live_progress_lock = threading.Lock()
+
+
+def _row_to_job(row) -> dict:
+    """Convert a sync_jobs row to the API shape, with any newer in-process progress."""
+    job = dict(zip(row.keys(), row))
+    job["force"] = bool(job["force"])
+    job["result"] = json.loads(job["result"]) if job["result"] else None
+    if job["status"] == "running":
+        with _live_progress_lock:
+            job.update(_live_progress.get(job["id"], {}))
+    return job
+
+
+def _fail_orphaned_jobs(cursor, now: str):
+    """Fail running jobs whose worker no longer holds the sync lease."""
+    cursor.execute("""
+        UPDATE sync_jobs
+        SET status = 'failed', message = 'Sync worker stopped responding', finished_at = ?, updated_at = ?
+        WHERE status = 'running' AND id NOT IN (
+            SELECT job_id FROM sync_leases WHERE job_id IS NOT NULL AND expires_at > ?
+        )
+    """, (now, now, now))
+
+
+def _enqueue(cursor, job_type: str, triggered_by: str, force: bool, now: str) -> tuple[dict, bool]:
+    """Insert a queued job unless an equivalent one is in flight.
+
+    Returns (job, created). A queued or running job of the same type
+    absorbs the request; a forced import only reuses a forced one. The
+    INSERT ... WHERE NOT EXISTS is one statement, so concurrent requests in
+    different processes can't both insert.
+    """
+    _fail_orphaned_jobs(cursor, now)
+    row = cursor.execute("""
+        INSERT INTO sync_jobs (job_type, triggered_by, force, status, created_at, updated_at)
+        SELECT ?, ?, ?, 'queued', ?, ?
+        WHERE NOT EXISTS (
+            SELECT 1 FROM sync_jobs
+            WHERE job_type = ? AND force >= ? AND status IN ('queued', 'running')
+        )
+        RETURNING *
+    """, (job_type, triggered_by, int(force), now, now, job_type, int(force))).fetchone()
+    if row:
+        return _row_to_job(row), True
+    row = cursor.execute("""
+        SELECT * FROM sync_jobs
+        WHERE job_type = ? AND force >= ? AND status IN ('queued', 'running')
+        ORDER BY id LIMIT 1
+    """, (job_type, int(force))).fetchone()
+    return _row_to_job(row), False
+
+
+def enqueue_job(job_type: str, triggered_by: str = "manual", force: bool = False) -> dict:
+    """Queue an import or export (or join the one in flight) and wake the local worker."""
+    now = datetime.now().isoformat()
+    with get_db() as conn:
+        job, created = _enqueue(conn.cursor(), job_type, triggered_by, force, now)
+        conn.commit()
+    if created:
+        job_runner.wake()
+    return job
+
+
+def get_job(job_id: int) -> Optional[dict]:
+    """Fetch one job, or None."""
+    with get_db() as conn:
+        row = conn.execute("SELECT * FROM sync_jobs WHERE id = ?", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(limit: int = 20) -> list[dict]:
+    """Most recent jobs first."""
+    with get_db() as conn:
+        rows = conn.execute("SELECT * FROM sync_jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+    return [_row_to_job(row) for row in rows]
+
+
+def enqueue_scheduled_jobs(interval_minutes: int) -> list[dict]:
+    """Enqueue the scheduled export+import if this interval hasn't had them yet.
+
+    Returns the jobs created, which is empty when another process already
+    claimed the current slot or the same jobs are still in flight.
+    """
+    slot = int(time.time() // (interval_minutes * 60))
+    now = datetime.now().isoformat()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO sync_state (key, value, updated_at) VALUES (?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT (key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at
+            WHERE CAST(sync_state.value AS INTEGER) < CAST(excluded.value AS INTEGER)
+        """, (SCHEDULE_SLOT_KEY, str(slot)))
+        if cursor.rowcount == 0:
+            return []
+
+        jobs = []
+        for job_type in SCHEDULED_JOB_TYPES:
+            job, created = _enqueue(cursor, job_type, "schedule", False, now)
+            if created:
+                jobs.append(job)
+        conn.commit()
+    if jobs:
+        job_runner.wake()
+    return jobs
+
+
+def _has_queued_jobs() -> bool:
+    with get_db() as conn:
+        return conn.execute("SELECT 1 FROM sync_jobs WHERE status = 'queued' LIMIT 1").fetchone() is not None
+
+
+def _claim_next_job(lease: SyncLease) -> Optional[dict]:
+    """Mark the oldest queued job running under `lease` and return it.
+
+    The job and the lease's job_id change in one transaction, so a running
+    job always points at a live lease until its worker dies.
+    """
+    now = datetime.now().isoformat()
+    with get_db() as conn:
+        cursor = conn.cursor()
+        _fail_orphaned_jobs(cursor, now)
+        row = cursor.execute("""
+            UPDATE sync_jobs
+            SET status = 'running', phase = 'starting', progress = 0, started_at = ?, updated_at = ?
+            WHERE id = (SELECT id FROM sync_jobs WHERE status = 'queued' ORDER BY id LIMIT 1)
+            RETURNING *
+        """, (now, now)).fetchone()
+        if row:
+            cursor.execute(
+                "UPDATE sync_leases SET job_id = ? WHERE name = ? AND owner = ?",
+                (row["id"], SYNC_LEASE_NAME, lease.owner),
+            )
+        conn.commit()
+    if row is None:
+        return None
+    lease.job_id = row["id"]
+    return _row_to_job(row)
+
+
+def _update_job(job_id: int, **fields):
+    """Set job columns (and updated_at)."""
+    fields["updated_at"] = datetime.now().isoformat()
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    with get_db() as conn:
+        conn.execute(f"UPDATE sync_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        conn.commit()
+
+
+def run_job(job: dict, lease: Optional[SyncLease] = None) -> dict:
+    """Run a claimed job to completion, recording progress and the result.
+
+    `lease` is the sync lease the job was claimed under; without one the
+    sync service takes the lease itself.
+    """
+    job_id = job["id"]
+
+    def report(phase: str, progress: float):
+        fields = {"phase": phase, "progress": round(progress, 3)}
+        with _live_progress_lock:
+            _live_progress[job_id] = {**fields, "updated_at": datetime.now().isoformat()}
+        # Inside the sync's transaction the write would only land (or be
+        # rolled back) with the sync's own data
+        if not in_get_db():
+            _update_job(job_id, **fields)
+
+    service = ExcelSyncService(progress=report, lease=lease)
+    try:
+        if job["job_type"] == "import":
+            result = service.import_from_excel(force=job["force"])
+        else:
+            result = service.export_to_excel()
+        _update_job(
+            job_id,
+            status="succeeded" if result.success else "failed",
+            phase="done",
+            progress=1.0,
+            message=result.message,
+            result=result.model_dump_json(),
+            finished_at=datetime.now().isoformat(),
+        )
+    except Exception as e:
+        _update_job(job_id, status="failed", message=str(e), finished_at=datetime.now().isoformat())
+    finally:
+        with _live_progress_lock:
+            _live_progress.pop(job_id, None)
+    return get_job(job_id)
+
+
+class SyncJobRunner:
+    """Per-process worker thread plus the optional interval scheduler."""
+
+    def __init__(self, interval_minutes: int = AUTO_SYNC_INTERVAL_MINUTES):
+        self.interval_minutes = interval_minutes
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        """Start the worker (and scheduler, if an interval is configured)."""
+        if self._threads:
+            return
+        self._stop.clear()
+        self._threads.append(threading.Thread(target=self._work, name="sync-jobs", daemon=True))
+        if self.interval_minutes > 0:
+            self._threads.append(threading.Thread(target=self._schedule, name="sync-scheduler", daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the threads; a job in progress finishes in the background."""
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """Check for queued jobs now instead of at the next poll."""
+        self._wake.set()
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                self._run_queued_jobs()
+            except Exception as e:
+                print(f"Sync job claim failed: {e}")
+            self._wake.wait(JOB_POLL_SECONDS)
+            self._wake.clear()
+
+    def _run_queued_jobs(self):
+        """Take the sync lease and drain the queue; no-op if another process holds it."""
+        if not _has_queued_jobs():
+            return
+        lease = SyncLease()
+        if not lease.try_acquire():
+            return
+        try:
+            while not self._stop.is_set():
+                job = _claim_next_job(lease)
+                if job is None:
+                    break
+                run_job(job, lease)
+                lease.set_job(None)
+        finally:
+            lease.release()
+
+    def _schedule(self):
+        while not self._stop.is_set():
+            try:
+                enqueue_scheduled_jobs(self.interval_minutes)
+            except Exception as e:
+                print(f"Sync scheduler error: {e}")
+            self._stop.wait(SCHEDULE_CHECK_SECONDS)
+
+
+job_runner = SyncJobRunner()
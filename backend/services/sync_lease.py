@@ -0,0 +1,163 @@
+"""Cross-process lease that serializes Excel syncs.
+
+Only one import or export may run at a time across every gunicorn worker,
+so the holder of the "excel" lease is recorded in SQLite together with an
+expiry. Acquiring is a single upsert that only succeeds when the lease is
+free, expired or already ours. While held, a heartbeat thread pushes the
+expiry forward, so a worker that dies stops blocking syncs once
+SYNC_LEASE_SECONDS pass without a heartbeat.
+"""
+
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import SYNC_LEASE_SECONDS
+from database import get_db, close_thread_connection
+
+SYNC_LEASE_NAME = "excel"
+
+
+class SyncBusyError(Exception):
+    """Raised when another worker holds the sync lease."""
+
+    def __init__(self, holder: Optional[dict]):
+        self.holder = holder or {}
+        job = f" (job {self.holder['job_id']})" if self.holder.get("job_id") else ""
+        super().__init__(f"Another sync is already running{job}")
+
+
+class SyncLeaseLost(Exception):
+    """Raised when the lease passed to another worker while a sync was running."""
+
+
+def _new_owner() -> str:
+    """host:pid:random, unique per lease object and readable in the table."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def get_lease_holder(name: str = SYNC_LEASE_NAME) -> Optional[dict]:
+    """The current unexpired holder of a lease, or None."""
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT * FROM sync_leases WHERE name = ? AND expires_at > ?",
+            (name, datetime.now().isoformat()),
+        ).fetchone()
+    return dict(zip(row.keys(), row)) if row else None
+
+
+class SyncLease:
+    """A named lease held by this process until released or expired.
+
+    Use as a context manager (raises SyncBusyError if the lease is taken)
+    or call try_acquire()/release() directly.
+    """
+
+    def __init__(self, name: str = SYNC_LEASE_NAME, ttl_seconds: int = SYNC_LEASE_SECONDS):
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.owner = _new_owner()
+        self.job_id = None
+        self.held = False
+        self._stop_heartbeat = threading.Event()
+        self._heartbeat = None
+
+    def try_acquire(self, job_id: Optional[int] = None) -> bool:
+        """Take the lease if it is free, expired or already ours."""
+        now = datetime.now()
+        with get_db() as conn:
+            cursor = conn.execute("""
+                INSERT INTO sync_leases (name, owner, job_id, acquired_at, heartbeat_at, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    owner = excluded.owner, job_id = excluded.job_id, acquired_at = excluded.acquired_at,
+                    heartbeat_at = excluded.heartbeat_at, expires_at = excluded.expires_at
+                WHERE sync_leases.expires_at <= excluded.heartbeat_at OR sync_leases.owner = excluded.owner
+            """, (self.name, self.owner, job_id, now.isoformat(), now.isoformat(), (now + self.ttl).isoformat()))
+            acquired = cursor.rowcount > 0
+            conn.commit()
+        if acquired:
+            self.job_id = job_id
+            if not self.held:
+                self.held = True
+                self._start_heartbeat()
+        return acquired
+
+    def set_job(self, job_id: Optional[int]):
+        """Record which sync job runs under the lease."""
+        self.job_id = job_id
+        self.renew()
+
+    def renew(self) -> bool:
+        """Push the expiry forward; False if the lease was lost meanwhile."""
+        now = datetime.now()
+        with get_db() as conn:
+            cursor = conn.execute("""
+                UPDATE sync_leases SET job_id = ?, heartbeat_at = ?, expires_at = ?
+                WHERE name = ? AND owner = ?
+            """, (self.job_id, now.isoformat(), (now + self.ttl).isoformat(), self.name, self.owner))
+            renewed = cursor.rowcount > 0
+            conn.commit()
+        return renewed
+
+    def confirm(self, cursor):
+        """Renew the lease inside the caller's open transaction, or raise SyncLeaseLost.
+
+        Call right before a sync commits. While a long write transaction is
+        open the heartbeat can't get the write lock, so the lease may have
+        expired and gone to another worker before the transaction started.
+        Renewing on the same connection needs no extra lock, and the writes
+        and the renewal commit together.
+        """
+        now = datetime.now()
+        cursor.execute("""
+            UPDATE sync_leases SET job_id = ?, heartbeat_at = ?, expires_at = ?
+            WHERE name = ? AND owner = ?
+        """, (self.job_id, now.isoformat(), (now + self.ttl).isoformat(), self.name, self.owner))
+        if cursor.rowcount == 0:
+            raise SyncLeaseLost(f"Sync lease {self.name!r} was taken over by another worker")
+
+    def release(self):
+        """Give the lease up (no-op if it isn't held)."""
+        if not self.held:
+            return
+        self._stop_heartbeat.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        with get_db() as conn:
+            conn.execute("DELETE FROM sync_leases WHERE name = ? AND owner = ?", (self.name, self.owner))
+            conn.commit()
+        self.held = False
+        self.job_id = None
+
+    def _start_heartbeat(self):
+        self._stop_heartbeat.clear()
+        self._heartbeat = threading.Thread(target=self._beat, name=f"lease-{self.name}", daemon=True)
+        self._heartbeat.start()
+
+    def _beat(self):
+        interval = self.ttl.total_seconds() / 3
+        try:
+            while not self._stop_heartbeat.wait(interval):
+                try:
+                    if not self.renew():
+                        print(f"Sync lease {self.name!r} was taken over by another worker")
+                        return
+                except Exception as e:
+                    print(f"Sync lease heartbeat failed: {e}")
+        finally:
+            # Each lease gets its own heartbeat thread; its pooled connection
+            # goes with it
+            close_thread_connection()
+
+    def __enter__(self):
+        if not self.try_acquire(self.job_id):
+            raise SyncBusyError(get_lease_holder(self.name))
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
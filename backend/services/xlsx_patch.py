@@ -0,0 +1,600 @@
+"""Streaming cell patcher for .xlsx workbooks.
+
+An export changes a handful of cells, but openpyxl loads every cell of every
+sheet into objects and serializes the whole package again on save.
+XlsxPatcher treats the workbook as the zip of XML parts it is: a target
+worksheet part is streamed once to read the rows of interest and once more
+to rewrite only the <row> elements that change. Every other zip member is
+copied through unchanged.
+
+The scope is deliberately narrow: cell values in existing sheets. Strings are
+written as inline strings so sharedStrings.xml is never rewritten, edited
+cells keep their style, and cells added to a row copy the style of the cell
+above. Markup the patcher does not understand raises XlsxPatchError so the
+caller can fall back to openpyxl.
+"""
+
+import hashlib
+import html
+import posixpath
+import re
+import shutil
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+# Bytes read from a worksheet part at a time
+CHUNK_SIZE = 1024 * 1024
+
+# Built-in number formats that display dates or times
+_BUILTIN_DATE_FORMATS = set(range(14, 23)) | set(range(27, 37)) | set(range(45, 48)) | set(range(50, 59))
+
+# Literal text, colors/locales and escapes in a number format code
+_FORMAT_LITERALS = re.compile(r'"[^"]*"|\[[^\]]*\]|\\.|_.|\*.')
+_FORMAT_DATE_TOKENS = re.compile(r"[dmyhs]", re.IGNORECASE)
+
+# Characters XML 1.0 cannot carry (same set openpyxl rejects)
+_ILLEGAL_CHARACTERS = re.compile(r"[\000-\010\013\014\016-\037]")
+
+_CELL = re.compile(rb"<c\b[^>]*?(?:/>|>.*?</c>)", re.DOTALL)
+_CELL_REF = re.compile(rb'\br="([A-Z]{1,3})(\d+)"')
+_ROW_NUMBER = re.compile(rb'\br="(\d+)"')
+_ROW_SPANS = re.compile(rb'\sspans="[^"]*"')
+_STYLE = re.compile(rb'\bs="(\d+)"')
+_TYPE = re.compile(rb'\bt="(\w+)"')
+_VALUE = re.compile(rb"<v(?:\s[^>]*)?>(.*?)</v>", re.DOTALL)
+_FORMULA = re.compile(rb"<f\b[^>]*?(?:/>|>(.*?)</f>)", re.DOTALL)
+_INLINE_TEXT = re.compile(rb"<t(?:\s[^>]*)?>(.*?)</t>", re.DOTALL)
+_PHONETIC = re.compile(rb"<rPh\b.*?</rPh>", re.DOTALL)
+_SHARED_STRING_CELL = re.compile(rb'<c\b[^>]*\bt="s"[^>]*>\s*<v>(\d+)</v>')
+_DIMENSION = re.compile(rb'<dimension\s+ref="([^"]*)"')
+_RANGE_END = re.compile(r"([A-Z]{1,3})(\d+)$")
+
+
+class XlsxPatchError(Exception):
+    """The workbook uses markup the patcher does not handle."""
+
+
+class SheetScan(NamedTuple):
+    """What one streaming pass over a worksheet found."""
+    values: dict        # row number -> {column number: value} for the requested rows
+    blank_rows: list    # rows 2..max_row whose column A is empty, in order
+    max_row: int        # last row that contains a cell
+
+
+class _SharedString(int):
+    """Index into the shared-string table, resolved after a scan."""
+
+
+def column_index(letters: str) -> int:
+    """Convert column letters ("A", "AB") to a 1-based column number."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index
+
+
+def column_letters(index: int) -> str:
+    """Convert a 1-based column number to column letters."""
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _rel_id(element) -> Optional[str]:
+    for key, value in element.attrib.items():
+        if key.endswith("}id"):
+            return value
+    return None
+
+
+def _is_date_format(format_code: str) -> bool:
+    return bool(_FORMAT_DATE_TOKENS.search(_FORMAT_LITERALS.sub("", format_code)))
+
+
+def _text(raw: bytes) -> str:
+    return html.unescape(raw.decode("utf-8"))
+
+
+def _iter_sheet(stream):
+    """Split a worksheet part into (is_row, bytes) pieces.
+
+    Row pieces are complete <row> elements. Other pieces always end before
+    a tag, so markup such as </sheetData> is never split across two pieces.
+    """
+    buf = b""
+    pos = 0
+    eof = False
+    while True:
+        start = buf.find(b"<row", pos)
+        while start >= 0 and buf[start + 4:start + 5] not in (b" ", b">", b"/", b"\t", b"\r", b"\n"):
+            if start + 4 >= len(buf):
+                start = -1  # "<row" at the very end; wait for more data
+                break
+            start = buf.find(b"<row", start + 4)
+
+        if start >= 0:
+            close = buf.find(b">", start)
+            end = -1
+            if close >= 0:
+                if buf[close - 1:close] == b"/":
+                    end = close + 1
+                else:
+                    end = buf.find(b"</row>", close)
+                    if end >= 0:
+                        end += 6
+            if end >= 0:
+                if start > pos:
+                    yield False, buf[pos:start]
+                yield True, buf[start:end]
+                pos = end
+                continue
+            if eof:
+                raise XlsxPatchError("Worksheet ends inside a <row> element")
+            # Flush what precedes the incomplete row before reading on
+            if start > pos:
+                yield False, buf[pos:start]
+                pos = start
+        elif not eof:
+            cut = buf.rfind(b"<", pos)
+            cut = len(buf) if cut < 0 else cut
+            if cut > pos:
+                yield False, buf[pos:cut]
+                pos = cut
+        else:
+            if pos < len(buf):
+                yield False, buf[pos:]
+            return
+
+        chunk = stream.read(CHUNK_SIZE)
+        buf = buf[pos:] + chunk
+        pos = 0
+        eof = not chunk
+
+
+def _row_number(row: bytes, previous: int) -> int:
+    match = _ROW_NUMBER.search(row, 0, row.index(b">") + 1)
+    # Rows without r= follow the previous row
+    return int(match.group(1)) if match else previous + 1
+
+
+def _cell_position(cell: bytes) -> tuple[int, int]:
+    match = _CELL_REF.search(cell, 0, cell.index(b">") + 1)
+    if match is None:
+        raise XlsxPatchError("Cell without an r= reference")
+    return column_index(match.group(1).decode("ascii")), int(match.group(2))
+
+
+def _cell_style(cell: bytes) -> Optional[bytes]:
+    match = _STYLE.search(cell, 0, cell.index(b">") + 1)
+    return match.group(1) if match else None
+
+
+def _has_value(cell: bytes) -> bool:
+    return not cell.endswith(b"/>") and (b"<v" in cell or b"<is>" in cell or b"<f" in cell)
+
+
+def _cell_xml(ref: str, value, style: Optional[bytes]) -> bytes:
+    """Serialize one cell; returns b"" for an empty unstyled cell."""
+    style_attr = b' s="' + style + b'"' if style else b""
+    ref = ref.encode("ascii")
+    if value is None or value == "":
+        return b'<c r="' + ref + b'"' + style_attr + b"/>" if style else b""
+    if isinstance(value, bool):
+        return b'<c r="' + ref + b'"' + style_attr + b' t="b"><v>' + (b"1" if value else b"0") + b"</v></c>"
+    if isinstance(value, (int, float)):
+        return b'<c r="' + ref + b'"' + style_attr + b"><v>" + repr(value).encode("ascii") + b"</v></c>"
+
+    text = _ILLEGAL_CHARACTERS.sub("", str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ""
+    inline = f'<is><t{space}>{html.escape(text, quote=False)}</t></is>'.encode("utf-8")
+    return b'<c r="' + ref + b'"' + style_attr + b' t="inlineStr">' + inline + b"</c>"
+
+
+class XlsxPatcher:
+    """Read and patch cell values of an .xlsx file without loading it whole.
+
+    Usage: scan() the rows to compare, set_cell() the changes, then save()
+    a patched copy. Edits are buffered until save().
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._zip = zipfile.ZipFile(self.path)
+        self._edits = {}
+        try:
+            self._read_package()
+        except (KeyError, ET.ParseError) as e:
+            self._zip.close()
+            raise XlsxPatchError(f"Unreadable workbook package: {e}") from e
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._zip.close()
+
+    @property
+    def sheetnames(self) -> list[str]:
+        return list(self._sheets)
+
+    def _read_package(self):
+        root_rels = ET.fromstring(self._zip.read("_rels/.rels"))
+        workbook_part = None
+        for rel in root_rels:
+            if rel.get("Type", "").endswith("/officeDocument"):
+                workbook_part = rel.get("Target").lstrip("/")
+        if workbook_part is None:
+            raise XlsxPatchError("No workbook part in package")
+
+        base = posixpath.dirname(workbook_part)
+        self._workbook_rels_part = posixpath.join(base, "_rels", posixpath.basename(workbook_part) + ".rels")
+        targets = {}
+        self._shared_strings_part = self._styles_part = None
+        self._calc_chain = None  # (part, relationship id)
+        for rel in ET.fromstring(self._zip.read(self._workbook_rels_part)):
+            target = rel.get("Target", "")
+            part = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join(base, target))
+            targets[rel.get("Id")] = part
+            rel_type = rel.get("Type", "")
+            if rel_type.endswith("/sharedStrings"):
+                self._shared_strings_part = part
+            elif rel_type.endswith("/styles"):
+                self._styles_part = part
+            elif rel_type.endswith("/calcChain"):
+                self._calc_chain = (part, rel.get("Id"))
+
+        self._sheets = {}
+        self._date1904 = False
+        for element in ET.fromstring(self._zip.read(workbook_part)).iter():
+            name = _local_name(element.tag)
+            if name == "sheet":
+                part = targets.get(_rel_id(element))
+                if part in self._zip.NameToInfo:
+                    self._sheets[element.get("name")] = part
+            elif name == "workbookPr":
+                self._date1904 = element.get("date1904") in ("1", "true")
+
+        self._date_styles = self._read_date_styles()
+
+    def _read_date_styles(self) -> set[bytes]:
+        """Style indexes (as they appear in s="...") whose number format is a date."""
+        if self._styles_part is None:
+            return set()
+        custom_formats = {}
+        date_styles = set()
+        styles = ET.fromstring(self._zip.read(self._styles_part))
+        for element in styles:
+            name = _local_name(element.tag)
+            if name == "numFmts":
+                for fmt in element:
+                    custom_formats[int(fmt.get("numFmtId"))] = fmt.get("formatCode", "")
+            elif name == "cellXfs":
+                for index, xf in enumerate(element):
+                    fmt_id = int(xf.get("numFmtId", "0"))
+                    if fmt_id in custom_formats:
+                        is_date = _is_date_format(custom_formats[fmt_id])
+                    else:
+                        is_date = fmt_id in _BUILTIN_DATE_FORMATS
+                    if is_date:
+                        date_styles.add(str(index).encode("ascii"))
+        return date_styles
+
+    def _sheet_part(self, sheet_name: str) -> str:
+        try:
+            return self._sheets[sheet_name]
+        except KeyError:
+            raise XlsxPatchError(f"Worksheet not found: {sheet_name}") from None
+
+    def _from_excel_date(self, serial: float) -> datetime:
+        if self._date1904:
+            epoch = datetime(1904, 1, 1)
+        else:
+            # Serials before March 1900 predate Excel's phantom 1900-02-29
+            epoch = datetime(1899, 12, 30) if serial >= 61 else datetime(1899, 12, 31)
+        return epoch + timedelta(days=serial)
+
+    def _cell_value(self, cell: bytes):
+        """Decode a cell the way openpyxl reports it (formulas as "=...")."""
+        if cell.endswith(b"/>"):
+            return None
+        type_match = _TYPE.search(cell, 0, cell.index(b">") + 1)
+        cell_type = type_match.group(1) if type_match else b"n"
+
+        formula = _FORMULA.search(cell)
+        if formula:
+            return "=" + _text(formula.group(1) or b"")
+        if cell_type == b"inlineStr":
+            body = _PHONETIC.sub(b"", cell)
+            return "".join(_text(t) for t in _INLINE_TEXT.findall(body))
+
+        value = _VALUE.search(cell)
+        if value is None:
+            return None
+        raw = value.group(1)
+        if cell_type == b"s":
+            return _SharedString(int(raw))
+        if cell_type in (b"str", b"e"):
+            return _text(raw)
+        if cell_type == b"b":
+            return raw.strip() == b"1"
+        if cell_type == b"d":
+            return datetime.fromisoformat(raw.decode("ascii"))
+
+        text = raw.decode("ascii").strip()
+        number = float(text) if any(ch in text for ch in ".eE") else int(text)
+        if _cell_style(cell) in self._date_styles:
+            return self._from_excel_date(number)
+        return number
+
+    def _shared_strings(self, wanted: set[int]) -> dict[int, str]:
+        """Stream the shared-string table, keeping only the wanted entries."""
+        strings = {}
+        if not wanted or self._shared_strings_part is None:
+            return strings
+        last_wanted = max(wanted)
+        index = 0
+        with self._zip.open(self._shared_strings_part) as stream:
+            for _, element in ET.iterparse(stream):
+                if _local_name(element.tag) != "si":
+                    continue
+                if index in wanted:
+                    parts = []
+                    for child in element:
+                        name = _local_name(child.tag)
+                        if name == "t":
+                            parts.append(child.text or "")
+                        elif name == "r":
+                            parts.extend(t.text or "" for t in child if _local_name(t.tag) == "t")
+                    strings[index] = "".join(parts)
+                element.clear()
+                index += 1
+                if index > last_wanted:
+                    break
+        return strings
+
+    def sheet_digests(self, sheet_names) -> dict[str, str]:
+        """SHA-256 per worksheet over everything that decides its cell values.
+
+        Covers the sheet XML, the shared strings it references, the style
+        table (number formats decide which numbers read back as dates) and
+        the workbook's date system.
+        """
+        styles = self._zip.read(self._styles_part) if self._styles_part else b""
+        common = hashlib.sha256(styles + (b"1904" if self._date1904 else b"1900")).digest()
+        hashers = {}
+        referenced = {}
+        for sheet_name in sheet_names:
+            hasher = hashlib.sha256(common)
+            indexes = set()
+            with self._zip.open(self._sheet_part(sheet_name)) as stream:
+                for is_row, piece in _iter_sheet(stream):
+                    hasher.update(piece)
+                    if is_row and b't="s"' in piece:
+                        indexes.update(int(index) for index in _SHARED_STRING_CELL.findall(piece))
+            hashers[sheet_name] = hasher
+            referenced[sheet_name] = indexes
+
+        strings = self._shared_strings(set().union(*referenced.values()))
+        digests = {}
+        for sheet_name, hasher in hashers.items():
+            for index in sorted(referenced[sheet_name]):
+                hasher.update(b"\0%d\0" % index + strings.get(index, "").encode("utf-8"))
+            digests[sheet_name] = hasher.hexdigest()
+        return digests
+
+    def scan(self, sheet_name: str, rows=()) -> SheetScan:
+        """Stream a worksheet once, collecting cell values for `rows`.
+
+        Also reports which rows have an empty column A and the last row
+        holding a cell, which is what new-row allocation needs.
+        """
+        wanted = set(rows)
+        values = {}
+        blank_rows = []
+        max_row = 0
+        next_row = 2
+        row_num = 0
+        saw_sheet_data = False
+
+        with self._zip.open(self._sheet_part(sheet_name)) as stream:
+            for is_row, piece in _iter_sheet(stream):
+                if not is_row:
+                    saw_sheet_data = saw_sheet_data or b"<sheetData" in piece
+                    continue
+                row_num = _row_number(piece, row_num)
+                first_cell = _CELL.search(piece)
+                if first_cell is None:
+                    continue  # attributes only, e.g. a custom height
+                max_row = row_num
+
+                column, _ = _cell_position(first_cell.group(0))
+                a_filled = column == 1 and _has_value(first_cell.group(0))
+                if row_num >= 2:
+                    blank_rows.extend(range(next_row, row_num))
+                    if not a_filled:
+                        blank_rows.append(row_num)
+                    next_row = row_num + 1
+
+                if row_num in wanted:
+                    values[row_num] = {
+                        _cell_position(cell)[0]: self._cell_value(cell)
+                        for cell in _CELL.findall(piece)
+                    }
+
+        if not saw_sheet_data:
+            raise XlsxPatchError(f"Unsupported worksheet markup in {sheet_name}")
+
+        shared = {value for cells in values.values() for value in cells.values()
+                  if isinstance(value, _SharedString)}
+        if shared:
+            strings = self._shared_strings(shared)
+            for cells in values.values():
+                for column, value in cells.items():
+                    if isinstance(value, _SharedString):
+                        cells[column] = strings.get(value, "")
+
+        blank_rows = [row for row in blank_rows if row <= max_row]
+        return SheetScan(values, blank_rows, max_row)
+
+    def set_cell(self, sheet_name: str, row: int, column: int, value):
+        """Queue a new value for one cell (None clears it)."""
+        self._sheet_part(sheet_name)
+        self._edits.setdefault(sheet_name, {}).setdefault(row, {})[column] = value
+
+    def save(self, out_path: Path):
+        """Write a copy of the workbook with the queued edits applied."""
+        patched = {}
+        replaced_formula = False
+        try:
+            # Patch worksheets first: overwriting a formula invalidates the
+            # calculation chain, which sits in parts written before them
+            for sheet_name, edits in self._edits.items():
+                if not edits:
+                    continue
+                spool = tempfile.SpooledTemporaryFile(max_size=16 * CHUNK_SIZE)
+                patched[self._sheets[sheet_name]] = spool
+                with self._zip.open(self._sheets[sheet_name]) as stream:
+                    replaced_formula |= self._patch_sheet(stream, spool, edits, sheet_name)
+                spool.seek(0)
+
+            drop_calc_chain = replaced_formula and self._calc_chain is not None
+            with zipfile.ZipFile(out_path, "w", zipfile.ZIP_DEFLATED) as out:
+                for info in self._zip.infolist():
+                    if drop_calc_chain and info.filename == self._calc_chain[0]:
+                        continue
+                    target = zipfile.ZipInfo(info.filename, info.date_time)
+                    target.compress_type = info.compress_type
+                    target.external_attr = info.external_attr
+                    if info.filename in patched:
+                        with out.open(target, "w") as dst:
+                            shutil.copyfileobj(patched[info.filename], dst, CHUNK_SIZE)
+                    elif drop_calc_chain and info.filename in (self._workbook_rels_part, "[Content_Types].xml"):
+                        out.writestr(target, self._without_calc_chain(info.filename))
+                    else:
+                        with self._zip.open(info) as src, out.open(target, "w") as dst:
+                            shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        finally:
+            for spool in patched.values():
+                spool.close()
+
+    def _without_calc_chain(self, part: str) -> bytes:
+        """Drop the calcChain relationship or content-type override; Excel rebuilds it."""
+        data = self._zip.read(part)
+        calc_part, rel_id = self._calc_chain
+        if part == self._workbook_rels_part:
+            pattern = rb'<Relationship\b[^>]*\bId="' + re.escape(rel_id.encode()) + rb'"[^>]*/>'
+        else:
+            pattern = rb'<Override\b[^>]*\bPartName="/' + re.escape(calc_part.encode()) + rb'"[^>]*/>'
+        return re.sub(pattern, b"", data)
+
+    def _patch_sheet(self, stream, out, edits: dict, sheet_name: str) -> bool:
+        """Copy a worksheet part, rewriting only edited rows. Returns True if a formula was overwritten."""
+        pending = sorted(edits)
+        next_edit = 0
+        previous_row = None  # last row written, source of styles for new cells
+        replaced_formula = False
+        saw_sheet_data = False
+        row_num = 0
+        max_column = max(column for cells in edits.values() for column in cells)
+
+        def new_rows(before: Optional[int]) -> bytes:
+            nonlocal next_edit, previous_row, replaced_formula
+            pieces = []
+            while next_edit < len(pending) and (before is None or pending[next_edit] < before):
+                number = pending[next_edit]
+                row, replaced = self._patch_row(b'<row r="%d"/>' % number, number, edits[number], previous_row)
+                replaced_formula |= replaced
+                pieces.append(row)
+                previous_row = row
+                next_edit += 1
+            return b"".join(pieces)
+
+        for is_row, piece in _iter_sheet(stream):
+            if not is_row:
+                if b"<dimension" in piece:
+                    piece = _DIMENSION.sub(lambda m: self._grow_dimension(m, pending[-1], max_column), piece, count=1)
+                if b"<sheetData/>" in piece:
+                    saw_sheet_data = True
+                    piece = piece.replace(b"<sheetData/>", b"<sheetData>" + new_rows(None) + b"</sheetData>", 1)
+                elif b"</sheetData>" in piece:
+                    saw_sheet_data = True
+                    head, _, tail = piece.partition(b"</sheetData>")
+                    piece = head + new_rows(None) + b"</sheetData>" + tail
+                elif b"<sheetData" in piece:
+                    saw_sheet_data = True
+                out.write(piece)
+                continue
+
+            row_num = _row_number(piece, row_num)
+            out.write(new_rows(row_num))
+            if next_edit < len(pending) and pending[next_edit] == row_num:
+                piece, replaced = self._patch_row(piece, row_num, edits[row_num], previous_row)
+                replaced_formula |= replaced
+                next_edit += 1
+            out.write(piece)
+            previous_row = piece
+
+        if not saw_sheet_data or next_edit < len(pending):
+            raise XlsxPatchError(f"Unsupported worksheet markup in {sheet_name}")
+        return replaced_formula
+
+    @staticmethod
+    def _grow_dimension(match, max_row: int, max_column: int) -> bytes:
+        ref = match.group(1).decode("ascii")
+        start, _, end = ref.partition(":")
+        end_match = _RANGE_END.match(end or start)
+        if end_match is None:
+            return match.group(0)
+        end_column = max(column_index(end_match.group(1)), max_column)
+        end_row = max(int(end_match.group(2)), max_row)
+        return b'<dimension ref="%s:%s%d"' % (start.encode("ascii"), column_letters(end_column).encode("ascii"), end_row)
+
+    def _patch_row(self, row: bytes, row_num: int, cell_edits: dict, previous_row: Optional[bytes]) -> tuple[bytes, bool]:
+        """Apply cell edits to one <row> element. Returns (row xml, overwrote a formula)."""
+        open_end = row.index(b">") + 1
+        if open_end == len(row) and row.endswith(b"/>"):
+            open_tag, body = row[:-2].rstrip() + b">", b""
+        else:
+            open_tag, body = row[:open_end], row[open_end:-len(b"</row>")]
+
+        cells = {}
+        for match in _CELL.finditer(body):
+            cells[_cell_position(match.group(0))[0]] = match.group(0)
+        if _CELL.sub(b"", body).strip():
+            raise XlsxPatchError(f"Unsupported content in row {row_num}")
+
+        above = None
+        replaced_formula = False
+        for column, value in cell_edits.items():
+            existing = cells.get(column)
+            if existing is not None:
+                style = _cell_style(existing)
+                replaced_formula = replaced_formula or b"<f" in existing
+            else:
+                if above is None:
+                    above = {}
+                    for cell in _CELL.findall(previous_row or b""):
+                        above[_cell_position(cell)[0]] = _cell_style(cell)
+                style = above.get(column)
+            cell = _cell_xml(f"{column_letters(column)}{row_num}", value, style)
+            if cell:
+                cells[column] = cell
+            else:
+                cells.pop(column, None)
+
+        # spans is an optional hint that edits may invalidate
+        open_tag = _ROW_SPANS.sub(b"", open_tag)
+        return open_tag + b"".join(cells[column] for column in sorted(cells)) + b"</row>", replaced_formula
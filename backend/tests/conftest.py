@@ -0,0 +1,81 @@
+"""Shared test setup.
+
+config reads its paths from the environment at import time, so the whole
+session gets a throwaway database and backup directory before any
+application module is imported. SharePoint and Graph settings are blanked
+so nothing reaches a real tenant; Graph tests run against
+devtools.fake_graph. Run from backend/:
+
+    pip install -r requirements-dev.txt
+    python -m pytest -q
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_TMP_DIR = Path(tempfile.mkdtemp(prefix="loadboard-tests-"))
+os.environ.update(
+    DATABASE_PATH=str(_TMP_DIR / "loadboard.db"),
+    BACKUP_DIR=str(_TMP_DIR / "backups"),
+    AUTO_SYNC_INTERVAL_MINUTES="0",
+    SHAREPOINT_EXCEL_URL="",
+    GRAPH_TENANT_ID="",
+    GRAPH_CLIENT_ID="",
+    GRAPH_CLIENT_SECRET="",
+    # Keep retry backoff short against the fake Graph server
+    GRAPH_HTTP_BACKOFF="0.01",
+)
+
+# Tables emptied before every test; the summary and search triggers follow
+RESET_TABLES = (
+    "inbound_shipments", "outbound_shipments", "sync_log", "sync_state",
+    "sync_jobs", "sync_leases", "row_fingerprints",
+)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    from database import close_all_connections
+
+    close_all_connections()
+    shutil.rmtree(_TMP_DIR, ignore_errors=True)
+
+
+def _empty_database():
+    from cache import dashboard_cache
+    from database import get_db, init_database
+
+    init_database()
+    with get_db() as conn:
+        for table in RESET_TABLES:
+            conn.execute(f"DELETE FROM {table}")
+        # Ids start from 1 again, as in a new database
+        conn.execute("DELETE FROM sqlite_sequence")
+    dashboard_cache.invalidate()
+
+
+@pytest.fixture(autouse=True)
+def fresh_database():
+    """An initialized database with no shipments or sync history.
+
+    Returns the reset itself, for tests that need a second clean start.
+    """
+    _empty_database()
+    return _empty_database
+
+
+@pytest.fixture
+def client():
+    """A TestClient running the app's startup and shutdown hooks."""
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        yield client
@@ -0,0 +1,92 @@
+from datetime import date
+
+from database import get_db
+
+
+def _ship(client, customer, pallets, shipped=True, month=1, year=None, actual_date=None):
+    response = client.post("/api/outbound/", json={
+        "source": "OTHER",
+        "customer": customer,
+        "ship_date": date(year or date.today().year, month, 15).isoformat(),
+        "shipped": shipped,
+        "pallets": pallets,
+        "actual_date": actual_date and actual_date.isoformat(),
+    })
+    assert response.status_code in (200, 201), response.text
+    return response.json()["id"]
+
+
+def _pallets_by_month(client, customer, **params):
+    rollup = client.get("/api/dashboard/customer-pallets", params={"customer": customer, **params}).json()
+    return {month["month"]: month["pallets"] for month in rollup["months"] if month["pallets"]}
+
+
+def test_customer_pallets_match_anywhere_in_the_name(client):
+    _ship(client, "AutoZone", 1)
+    _ship(client, "Auto Zone #12", 2)
+    _ship(client, "Store 12 - AutoZone", 4)
+    _ship(client, "AUTO-ZONE", 8, month=2)
+    _ship(client, "AutoZone", 16, shipped=False)
+    _ship(client, "Advance Auto Parts", 32)
+
+    rollup = client.get("/api/dashboard/customer-pallets", params={"customer": "Auto Zone"}).json()
+
+    assert rollup["months"][0]["pallets"] == 7
+    assert rollup["months"][1]["pallets"] == 8
+    assert rollup["total_pallets"] == 15
+
+
+def test_autozone_pallets_include_stores_named_after_the_customer(client):
+    _ship(client, "Store 12 - AutoZone", 3)
+    _ship(client, "Auto Zone", 4)
+
+    rollup = client.get("/api/dashboard/autozone-pallets").json()
+
+    january = rollup["current_month_pallets"] if date.today().month == 1 else rollup["previous_months"][0]["pallets"]
+    assert january == 7
+
+
+def test_customer_pallets_cover_every_month_of_the_requested_year(client):
+    year = date.today().year - 1
+    _ship(client, "AutoZone", 5, month=3, year=year)
+    _ship(client, "AutoZone", 7, month=3)
+
+    rollup = client.get("/api/dashboard/customer-pallets", params={"customer": "autozone", "year": year}).json()
+
+    assert rollup["year"] == year
+    assert [month["month"] for month in rollup["months"]] == list(range(1, 13))
+    assert rollup["months"][0]["month_name"] == "January"
+    assert rollup["months"][2]["pallets"] == 5
+    assert rollup["total_pallets"] == 5
+
+
+def test_customer_pallets_count_the_actual_ship_date(client):
+    year = date.today().year
+    _ship(client, "AutoZone", 2, month=1, actual_date=date(year, 2, 3))
+    _ship(client, "AutoZone", 4, month=1)
+
+    assert _pallets_by_month(client, "AutoZone") == {1: 4, 2: 2}
+
+
+def test_customer_pallets_follow_a_renamed_customer(client):
+    shipment_id = _ship(client, "Advance Auto Parts", 6)
+    assert _pallets_by_month(client, "AutoZone") == {}
+
+    response = client.put(f"/api/outbound/{shipment_id}", json={"customer": "AutoZone #88"})
+    assert response.status_code == 200, response.text
+
+    assert _pallets_by_month(client, "AutoZone") == {1: 6}
+
+
+def test_customer_pallet_query_seeks_the_year(client):
+    _ship(client, "AutoZone", 1)
+    with get_db() as conn:
+        plan = " ".join(row[3] for row in conn.execute("""
+            EXPLAIN QUERY PLAN
+            SELECT COALESCE(SUM(pallets), 0) FROM outbound_shipments
+            WHERE instr(customer_key, 'autozone') > 0
+              AND shipped = 1
+              AND COALESCE(actual_date, ship_date) BETWEEN '2026-01-01' AND '2026-12-31'
+        """))
+
+    assert "USING INDEX idx_outbound_shipped_effective_date (shipped=? AND <expr>>? AND <expr><?)" in plan
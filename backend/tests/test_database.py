@@ -0,0 +1,98 @@
+import threading
+
+import pytest
+
+import database
+from database import close_thread_connection, get_connection, get_db
+
+
+def _put(conn, key):
+    conn.execute("INSERT INTO sync_state (key, value) VALUES (?, 'x')", (key,))
+
+
+def _committed_keys():
+    """What another connection sees."""
+    conn = get_connection()
+    try:
+        return {row[0] for row in conn.execute("SELECT key FROM sync_state")}
+    finally:
+        conn.close()
+
+
+def test_nested_commit_does_not_commit_the_outer_transaction():
+    with get_db() as conn:
+        _put(conn, "outer")
+        with get_db() as inner:
+            _put(inner, "inner")
+            inner.commit()
+        assert _committed_keys() == set()
+    assert _committed_keys() == {"outer", "inner"}
+
+
+def test_failed_nested_block_undoes_only_its_own_writes():
+    with get_db() as conn:
+        _put(conn, "outer")
+        with pytest.raises(RuntimeError):
+            with get_db() as inner:
+                _put(inner, "inner")
+                raise RuntimeError("nested failure")
+        _put(conn, "after")
+    assert _committed_keys() == {"outer", "after"}
+
+
+def test_failed_outer_block_undoes_nested_writes():
+    # The outer block hasn't written yet when the nested one starts
+    with pytest.raises(RuntimeError):
+        with get_db() as conn:
+            conn.execute("SELECT 1")
+            with get_db() as inner:
+                _put(inner, "inner")
+                inner.commit()
+            raise RuntimeError("outer failure")
+    assert _committed_keys() == set()
+
+
+def test_nested_rollback_undoes_only_the_nested_block():
+    with get_db() as conn:
+        _put(conn, "outer")
+        with get_db() as inner:
+            _put(inner, "inner")
+            inner.rollback()
+    assert _committed_keys() == {"outer"}
+
+
+def _use_db_in_thread(then=None):
+    def work():
+        with get_db() as conn:
+            conn.execute("SELECT 1")
+        if then is not None:
+            then()
+    thread = threading.Thread(target=work)
+    thread.start()
+    thread.join()
+
+
+def test_connections_of_finished_threads_are_closed():
+    with get_db():
+        pass
+    pooled = set(database._pooled_connections)
+
+    for _ in range(5):
+        _use_db_in_thread()
+
+    assert database._pooled_connections == pooled
+
+
+def test_close_thread_connection_closes_it_at_once():
+    closed = []
+
+    def close_and_check():
+        conn = database.get_pooled_connection()
+        close_thread_connection()
+        closed.append(conn not in database._pooled_connections)
+        # The next use opens a fresh connection
+        with get_db() as conn:
+            conn.execute("SELECT 1")
+
+    _use_db_in_thread(then=close_and_check)
+    assert closed == [True]
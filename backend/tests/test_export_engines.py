@@ -0,0 +1,84 @@
+"""The XML patch export writes what the openpyxl export writes."""
+
+import shutil
+
+import pytest
+from openpyxl import load_workbook
+
+from benchmarks.export_engine import edit_shipments
+from benchmarks.synthetic_workbook import write_workbook
+from services import excel_sync
+from services.excel_sync import ExcelSyncService
+
+
+def _export(engine, source, tmp_path, monkeypatch):
+    workbook = tmp_path / engine / source.name
+    workbook.parent.mkdir()
+    shutil.copy2(source, workbook)
+    monkeypatch.setattr(excel_sync, "EXPORT_ENGINE", engine)
+
+    service = ExcelSyncService()
+    service.sharepoint_url = ""
+    service.excel_path = workbook
+    assert service.import_from_excel().success
+    edit_shipments(changes=40, new=12)
+    result = service.export_to_excel()
+    assert result.success, result.message
+    assert result.records_processed > 0
+    return workbook
+
+
+def _cells(path):
+    """Every non-empty cell's value and the formatting Excel shows for it."""
+    wb = load_workbook(path)
+    try:
+        cells = {}
+        for sheet in wb.worksheets:
+            for row in sheet.iter_rows():
+                for cell in row:
+                    # Empty strings and missing cells read back the same in Excel
+                    if cell.value is None or cell.value == "":
+                        continue
+                    cells[sheet.title, cell.row, cell.column_letter] = (
+                        cell.value,
+                        cell.number_format,
+                        cell.font.b, cell.font.i, cell.font.color.value if cell.font.color else None,
+                        cell.fill.fgColor.value,
+                        cell.alignment.horizontal, cell.alignment.wrap_text,
+                    )
+        return cells
+    finally:
+        wb.close()
+
+
+@pytest.fixture
+def source(tmp_path):
+    return write_workbook(tmp_path / "Load Board.xlsx", 300)
+
+
+def test_xml_and_openpyxl_exports_match(source, tmp_path, monkeypatch, fresh_database):
+    openpyxl_path = _export("openpyxl", source, tmp_path, monkeypatch)
+    fresh_database()
+    xml_path = _export("xml", source, tmp_path, monkeypatch)
+
+    source_cells = _cells(source)
+    source_rows = {(sheet, row) for sheet, row, _ in source_cells}
+    openpyxl_cells, xml_cells = _cells(openpyxl_path), _cells(xml_path)
+    keys = sorted(openpyxl_cells.keys() | xml_cells.keys())
+    new_row_keys = [key for key in keys if key[:2] not in source_rows]
+
+    mismatches = []
+    for key in keys:
+        expected, actual = openpyxl_cells.get(key), xml_cells.get(key)
+        if key in new_row_keys:
+            # New rows take the style of the row above in the XML export
+            # instead of the openpyxl export's fixed alignment; only values
+            # have to agree there
+            expected, actual = expected and expected[0], actual and actual[0]
+        if expected != actual:
+            mismatches.append(f"{key}: openpyxl={expected} xml={actual}")
+    assert not mismatches, "\n".join(mismatches[:20])
+
+    # The edits and new shipments really reached the sheet
+    assert new_row_keys
+    assert any(source_cells.get(key, xml_cells[key])[0] != xml_cells[key][0] for key in xml_cells)
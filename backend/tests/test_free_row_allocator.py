@@ -0,0 +1,60 @@
+from openpyxl import Workbook
+
+from services.excel_sync import FreeRowAllocator
+from services.xlsx_patch import XlsxPatcher
+
+
+def _allocate(allocator, count):
+    return [allocator.allocate() for _ in range(count)]
+
+
+def test_interior_blank_rows_are_reused_top_to_bottom():
+    allocator = FreeRowAllocator(blank_rows=[4, 7, 9], max_row=10)
+
+    assert _allocate(allocator, 3) == [4, 7, 9]
+
+
+def test_tail_rows_follow_once_the_gaps_run_out():
+    allocator = FreeRowAllocator(blank_rows=[5], max_row=10)
+
+    assert _allocate(allocator, 4) == [5, 11, 12, 13]
+
+
+def test_rows_claimed_by_the_database_are_never_handed_out():
+    # Row 6 is blank in column A but a record already points at it; rows 11
+    # and 13 sit past the end of the sheet but are claimed too
+    allocator = FreeRowAllocator(blank_rows=[3, 6], max_row=10, claimed_rows=[6, 11, 13])
+
+    assert _allocate(allocator, 4) == [3, 12, 14, 15]
+
+
+def test_empty_sheet_starts_after_the_header():
+    allocator = FreeRowAllocator(blank_rows=[], max_row=1)
+
+    assert _allocate(allocator, 2) == [2, 3]
+
+
+def _sheet_with_gaps(tmp_path):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.title = "Outbound"
+    sheet.append(["Reference", "Customer"])
+    for row_num in range(2, 9):
+        # Rows 4 and 6 were deleted from column A; row 6 still has a note
+        if row_num != 4:
+            sheet.cell(row=row_num, column=1, value=None if row_num == 6 else f"REF{row_num}")
+            sheet.cell(row=row_num, column=2, value="AutoZone")
+    path = tmp_path / "gaps.xlsx"
+    workbook.save(path)
+    return sheet, path
+
+
+def test_openpyxl_and_xml_scans_allocate_the_same_rows(tmp_path):
+    sheet, path = _sheet_with_gaps(tmp_path)
+    from_sheet = FreeRowAllocator.from_sheet(sheet, claimed_rows=[9])
+    with XlsxPatcher(path) as patcher:
+        scan = patcher.scan("Outbound")
+    from_scan = FreeRowAllocator(scan.blank_rows, scan.max_row, claimed_rows=[9])
+
+    assert _allocate(from_sheet, 4) == [4, 6, 10, 11]
+    assert _allocate(from_scan, 4) == [4, 6, 10, 11]
@@ -0,0 +1,92 @@
+"""Shared Graph session retries and the token cache, against devtools.fake_graph."""
+
+import pytest
+
+from devtools.fake_graph import FakeGraph, Fault
+from services import graph_client
+from services.graph_client import GraphTokenCache, graph_metrics, timed_request
+
+ITEM = "Load Board.xlsx"
+CONTENT = b"workbook bytes"
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    graph_metrics.reset()
+
+
+def _content_url(graph):
+    return f"{graph.api_base}/users/someone/drive/root:/{ITEM}:/content"
+
+
+def test_throttled_requests_are_retried():
+    with FakeGraph(throttle_every=2, throttle_retry_after=0) as graph:
+        graph.put_file(ITEM, CONTENT)
+        responses = [timed_request("download", "GET", _content_url(graph), timeout=10) for _ in range(3)]
+
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert all(r.content == CONTENT for r in responses)
+    # Requests 2 and 4 were throttled; each cost the call one retry
+    assert graph.throttled == 2
+    assert graph_metrics.stats()["requests"]["download"]["retries"] == 2
+
+
+def test_server_errors_are_retried():
+    with FakeGraph() as graph:
+        upload_url = graph_client.create_upload_session(f"{graph.api_base}/users/someone/drive/root:/{ITEM}", "token")
+        graph.faults += [Fault("status", status=503, retry_after=0), Fault("status", status=502)]
+        response = timed_request(
+            "upload_chunk", "PUT", upload_url, data=CONTENT,
+            headers={"Content-Range": f"bytes 0-{len(CONTENT) - 1}/{len(CONTENT)}"}, timeout=10,
+        )
+
+        assert response.status_code == 201
+        assert graph.files[ITEM] == CONTENT
+    assert graph_metrics.stats()["requests"]["upload_chunk"]["retries"] == 2
+
+
+def test_retries_give_up_with_the_last_response():
+    with FakeGraph(throttle_every=1, throttle_retry_after=0) as graph:
+        graph.put_file(ITEM, CONTENT)
+        response = timed_request("download", "GET", _content_url(graph), timeout=10)
+
+    assert response.status_code == 429
+    assert graph.throttled == graph_client.GRAPH_HTTP_RETRIES + 1
+
+
+@pytest.fixture
+def token_graph(monkeypatch):
+    """A TLS fake Graph msal can fetch client-credential tokens from."""
+    if not graph_client.MSAL_AVAILABLE:
+        pytest.skip("msal is not installed")
+    with FakeGraph(tls=True, require_auth=True, credentials=("client", "secret")) as graph:
+        monkeypatch.setattr(graph_client, "GRAPH_AUTHORITY_HOST", graph.base_url)
+        monkeypatch.setenv("REQUESTS_CA_BUNDLE", graph.cert_path)
+        yield graph
+
+
+def test_tokens_are_cached_until_invalidated(token_graph):
+    cache = GraphTokenCache()
+
+    first = cache.get_token("tenant", "client", "secret")
+    assert first is not None
+    assert cache.get_token("tenant", "client", "secret") == first
+    assert token_graph.token_requests == 1
+
+    # A revoked token is rejected; after invalidate() a new one is fetched
+    token_graph.revoke_tokens()
+    cache.invalidate("tenant", "client", "secret")
+    second = cache.get_token("tenant", "client", "secret")
+    assert second not in (None, first)
+    assert token_graph.token_requests == 2
+
+    response = timed_request(
+        "download", "GET", f"{token_graph.api_base}/users/someone/drive/root:/{ITEM}:/content",
+        headers={"Authorization": f"Bearer {second}"}, timeout=10,
+    )
+    assert response.status_code == 404  # authorized; the item just doesn't exist
+    assert graph_metrics.stats()["token"] == {"hits": 1, "misses": 2, "hit_rate": 0.333}
+
+
+def test_wrong_credentials_get_no_token(token_graph):
+    assert GraphTokenCache().get_token("tenant", "client", "wrong") is None
@@ -0,0 +1,141 @@
+"""Exporting changed cells through Graph workbook sessions, against devtools.fake_graph."""
+
+import io
+import shutil
+
+import pytest
+from openpyxl import Workbook, load_workbook
+
+from benchmarks.synthetic_workbook import write_workbook
+from database import get_connection, get_db
+from devtools.fake_graph import FakeGraph
+from services.excel_sync import ExcelSyncService, _graph_cell_value
+from services.graph_client import RANGE_MAX_ROWS, WorkbookSession, cell_ranges
+
+ITEM = "Load Board.xlsx"
+USER = "someone"
+
+
+@pytest.fixture
+def graph():
+    with FakeGraph() as graph:
+        yield graph
+
+
+def _stored_sheet(graph, sheet_name: str):
+    graph.flush(ITEM)
+    return load_workbook(io.BytesIO(graph.files[ITEM]))[sheet_name]
+
+
+def test_cell_ranges_cover_only_the_given_cells():
+    cells = {
+        # A new row written in full, then another: one block
+        (5, 1): "a", (5, 2): "b", (5, 3): "c",
+        (6, 1): "d", (6, 2): "e", (6, 3): "f",
+        # Changed cells with a gap between them stay separate
+        (2, 4): 1, (2, 6): 2,
+    }
+
+    assert cell_ranges(cells) == [
+        ("D2:D2", [[1]]),
+        ("F2:F2", [[2]]),
+        ("A5:C6", [["a", "b", "c"], ["d", "e", "f"]]),
+    ]
+
+
+def test_cell_ranges_split_tall_blocks():
+    cells = {(row, 1): row for row in range(1, RANGE_MAX_ROWS + 2)}
+
+    ranges = cell_ranges(cells)
+
+    assert [address for address, _ in ranges] == [f"A1:A{RANGE_MAX_ROWS}", f"A{RANGE_MAX_ROWS + 1}:A{RANGE_MAX_ROWS + 1}"]
+
+
+@pytest.mark.parametrize("value, sent", [
+    (None, ""),
+    ("", ""),
+    ("00123", "'00123"),
+    ("1/2", "'1/2"),
+    ("=SUM(A1)", "'=SUM(A1)"),
+    ("TRUE", "'TRUE"),
+    ("AutoZone", "AutoZone"),
+    (12, 12),
+])
+def test_graph_cell_value_keeps_text_as_text(value, sent):
+    assert _graph_cell_value(value) == sent
+
+
+def test_workbook_session_writes_ranges_in_one_session(graph):
+    wb = Workbook()
+    wb.active.title = "Sheet1"
+    content = io.BytesIO()
+    wb.save(content)
+    graph.put_file(ITEM, content.getvalue())
+    cells = {(1, 1): _graph_cell_value("00123"), (1, 2): 7, (2, 1): _graph_cell_value(None)}
+
+    with WorkbookSession(graph.api_base, f"/users/{USER}/drive/root:/{ITEM}", "token") as session:
+        session.patch_ranges("Sheet1", cell_ranges(cells))
+
+    sheet = _stored_sheet(graph, "Sheet1")
+    assert sheet["A1"].value == "00123"
+    assert sheet["B1"].value == 7
+    assert sheet["A2"].value is None
+    assert session.ranges_sent == 2
+    assert graph.batches == 1
+    assert graph.workbook_sessions == {}
+
+
+def test_graph_export_commits_rows_before_writing_through_graph(graph, tmp_path, monkeypatch):
+    workbook = write_workbook(tmp_path / ITEM, 40)
+    graph.put_file(ITEM, workbook.read_bytes())
+    service = ExcelSyncService()
+    service.excel_path = workbook
+    assert service.import_from_excel(force=True).success
+
+    with get_db() as conn:
+        edited = conn.execute("SELECT id FROM outbound_shipments WHERE source = 'OTHER' ORDER BY id LIMIT 1").fetchone()[0]
+        conn.execute("UPDATE outbound_shipments SET notes = '00123', updated_at = '9999-01-01' WHERE id = ?", (edited,))
+        added = conn.execute("""
+            INSERT INTO outbound_shipments (source, customer, ship_date, shipped, pallets)
+            VALUES ('OTHER', 'Graph Customer', '2026-03-04', 0, 3)
+        """).lastrowid
+        conn.commit()
+
+    service.graph_api_base = graph.api_base
+    service.sharepoint_user = USER
+    service.sharepoint_file_path = ITEM
+    monkeypatch.setattr(service, "_get_graph_access_token", lambda: "token")
+    writes_during_graph = []
+    patch_ranges = WorkbookSession.patch_ranges
+
+    def patch_while_another_worker_writes(session, sheet_name, ranges):
+        # Fails with "database is locked" if the export still held the write lock
+        conn = get_connection()
+        try:
+            conn.execute("PRAGMA busy_timeout = 0")
+            conn.execute("INSERT INTO sync_state (key, value) VALUES ('test.write', '1')")
+            conn.commit()
+            writes_during_graph.append(sheet_name)
+        finally:
+            conn.close()
+        patch_ranges(session, sheet_name, ranges)
+
+    monkeypatch.setattr(WorkbookSession, "patch_ranges", patch_while_another_worker_writes)
+
+    temp_path = tmp_path / "export.xlsx"
+    shutil.copy2(workbook, temp_path)
+    exported = {"inbound_shipments": [], "outbound_shipments": []}
+    assert service._export_with_xml_patch(temp_path, exported, through_graph=True) == 2
+
+    assert writes_during_graph == ["OTHEROUTBOUND"]
+    assert exported["outbound_shipments"] == [edited, added]
+    conn = get_connection()
+    try:
+        rows = dict(conn.execute("SELECT id, excel_row FROM outbound_shipments WHERE id IN (?, ?)", (edited, added)).fetchall())
+    finally:
+        conn.close()
+    sheet = _stored_sheet(graph, "OTHEROUTBOUND")
+    assert "00123" in [cell.value for cell in sheet[rows[edited]]]
+    assert "Graph Customer" in [cell.value for cell in sheet[rows[added]]]
+    # The patched file matches what went through Graph
+    assert load_workbook(temp_path)["OTHEROUTBOUND"].cell(rows[added], 3).value == "Graph Customer"
@@ -0,0 +1,105 @@
+"""Resumable chunked uploads, against devtools.fake_graph's upload sessions."""
+
+import os
+
+import pytest
+import requests
+
+from devtools.fake_graph import FakeGraph, Fault
+from services import graph_client
+from services.graph_client import (
+    UPLOAD_CHUNK_MULTIPLE, GraphUploadError, UploadSessionLost, create_upload_session, upload_in_chunks,
+)
+
+ITEM = "Load Board.xlsx"
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Three chunks' worth of bytes, the last one short."""
+    path = tmp_path / ITEM
+    path.write_bytes(os.urandom(2 * UPLOAD_CHUNK_MULTIPLE + 12345))
+    return path
+
+
+@pytest.fixture
+def graph():
+    with FakeGraph() as graph:
+        yield graph
+
+
+def _upload(graph, workbook, **kwargs):
+    upload_url = create_upload_session(f"{graph.api_base}/users/someone/drive/root:/{ITEM}", "token")
+    return upload_in_chunks(upload_url, workbook, chunk_size=UPLOAD_CHUNK_MULTIPLE, **kwargs)
+
+
+def test_upload_streams_every_chunk(graph, workbook):
+    response = _upload(graph, workbook)
+
+    assert response.status_code == 201
+    assert graph.files[ITEM] == workbook.read_bytes()
+    assert graph.requests.get("PUT") == 3
+
+
+def test_dropped_chunk_resumes_from_the_reported_range(graph, workbook):
+    # The second chunk's connection drops after 100 KB reached the server
+    graph.faults += [None, Fault("disconnect", after_bytes=100_000)]
+
+    response = _upload(graph, workbook)
+
+    assert response.status_code == 201
+    assert graph.files[ITEM] == workbook.read_bytes()
+    # Those 100 KB weren't sent again
+    assert graph.bytes_received == workbook.stat().st_size
+
+
+def test_chunk_failing_past_the_session_retries_is_resumed(graph, workbook):
+    # One more 503 than the shared session retries on its own
+    graph.faults += [None] + [Fault("status", status=503, retry_after=0)] * (graph_client.GRAPH_HTTP_RETRIES + 1)
+
+    response = _upload(graph, workbook)
+
+    assert response.status_code == 201
+    assert graph.files[ITEM] == workbook.read_bytes()
+
+
+def test_failed_status_check_counts_as_a_retry(graph, workbook, monkeypatch):
+    graph.faults += [Fault("disconnect", after_bytes=1000)]
+    resume_offset = graph_client._resume_offset
+    calls = []
+
+    def flaky_resume_offset(upload_url):
+        calls.append(upload_url)
+        if len(calls) == 1:
+            raise requests.ConnectionError("status check dropped")
+        return resume_offset(upload_url)
+
+    monkeypatch.setattr(graph_client, "_resume_offset", flaky_resume_offset)
+
+    assert _upload(graph, workbook).status_code == 201
+    assert graph.files[ITEM] == workbook.read_bytes()
+    assert len(calls) == 2
+
+    # With no failures to spare, the same blip ends the upload
+    calls.clear()
+    graph.faults += [Fault("disconnect", after_bytes=1000)]
+    with pytest.raises(GraphUploadError, match="failed 2 times"):
+        _upload(graph, workbook, max_failures=1)
+
+
+def test_expired_session_raises_upload_session_lost(graph, workbook):
+    graph.faults += [None, Fault("expire")]
+
+    with pytest.raises(UploadSessionLost):
+        _upload(graph, workbook)
+    assert ITEM not in graph.files
+
+
+def test_upload_gives_up_after_max_failures(graph, workbook):
+    # The shared session retries each dropped PUT itself before
+    # upload_in_chunks sees a failure, so queue more than it can use
+    graph.faults += [Fault("disconnect")] * 100
+
+    with pytest.raises(GraphUploadError, match="failed 3 times"):
+        _upload(graph, workbook, max_failures=2)
+    assert ITEM not in graph.files
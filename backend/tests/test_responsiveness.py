@@ -0,0 +1,88 @@
+"""Requests keep being served while an import or a slow query runs."""
+
+import threading
+import time
+
+import database
+from database import get_db
+from models import SyncResult
+from services.excel_sync import ExcelSyncService
+
+# Generous for CI; a blocked event loop would hold every request for the
+# whole import instead
+RESPONSE_LIMIT_SECONDS = 1.0
+IMPORT_HOLD_SECONDS = 10
+
+
+def test_health_and_lists_respond_during_a_slow_import(client, monkeypatch):
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow_import(self, force=False):
+        # Like a real import: one long transaction holding the write lock
+        with get_db() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("INSERT INTO inbound_shipments (source, po) VALUES ('OTHER', 'import')")
+            started.set()
+            release.wait(IMPORT_HOLD_SECONDS)
+        return SyncResult(success=True, message="Imported 1 record", records_processed=1)
+
+    monkeypatch.setattr(ExcelSyncService, "import_from_excel", slow_import)
+
+    job = client.post("/api/sync/import").json()
+    assert started.wait(5), "import job never started"
+
+    try:
+        for path in ("/api/health", "/api/inbound/", "/api/outbound/", "/api/dashboard/stats", "/api/sync/jobs"):
+            began = time.perf_counter()
+            response = client.get(path)
+            elapsed = time.perf_counter() - began
+            assert response.status_code == 200, path
+            assert elapsed < RESPONSE_LIMIT_SECONDS, f"{path} took {elapsed:.2f}s during the import"
+        # Readers see the last committed state, not the import in progress
+        assert client.get("/api/inbound/").json()["total"] == 0
+    finally:
+        release.set()
+
+    deadline = time.monotonic() + 10
+    while client.get(f"/api/sync/jobs/{job['id']}").json()["status"] not in ("succeeded", "failed"):
+        assert time.monotonic() < deadline, "import job never finished"
+        time.sleep(0.05)
+    assert client.get(f"/api/sync/jobs/{job['id']}").json()["status"] == "succeeded"
+
+
+def test_blocked_database_call_does_not_hold_other_requests(client, monkeypatch):
+    entered = threading.Event()
+    release = threading.Event()
+    armed = threading.Event()
+    get_pooled_connection = database.get_pooled_connection
+
+    def blocking_once(*args, **kwargs):
+        # Stands in for a query that takes as long as the test lets it
+        if armed.is_set():
+            armed.clear()
+            entered.set()
+            release.wait(IMPORT_HOLD_SECONDS)
+        return get_pooled_connection(*args, **kwargs)
+
+    monkeypatch.setattr(database, "get_pooled_connection", blocking_once)
+    armed.set()
+    blocked = {}
+    slow = threading.Thread(target=lambda: blocked.update(response=client.get("/api/inbound/")))
+    slow.start()
+
+    try:
+        assert entered.wait(5), "the list request never reached the database"
+        for path in ("/api/health", "/api/outbound/"):
+            began = time.perf_counter()
+            response = client.get(path)
+            elapsed = time.perf_counter() - began
+            assert response.status_code == 200, path
+            # Run on the event loop, the blocked call would hold this until released
+            assert elapsed < RESPONSE_LIMIT_SECONDS, f"{path} took {elapsed:.2f}s behind a blocked query"
+        assert "response" not in blocked
+    finally:
+        release.set()
+        slow.join(10)
+
+    assert blocked["response"].status_code == 200
@@ -0,0 +1,72 @@
+"""Conditional SharePoint downloads and the local copy they revalidate."""
+
+import pytest
+
+from devtools.fake_graph import FakeGraph
+from services.excel_sync import ExcelSyncService
+from services.graph_client import graph_metrics
+
+ITEM = "Load Board.xlsx"
+
+
+@pytest.fixture
+def graph():
+    with FakeGraph() as graph:
+        graph.put_file(ITEM, b"version 1")
+        yield graph
+
+
+@pytest.fixture
+def service(graph, tmp_path):
+    graph_metrics.reset()
+    service = ExcelSyncService()
+    service.sharepoint_url = graph.share(ITEM)
+    service.backup_dir = tmp_path
+    return service
+
+
+def _download(service, max_age=0):
+    path = service._download_from_sharepoint(max_age)
+    assert path is not None
+    try:
+        return path.read_bytes()
+    finally:
+        path.unlink()
+
+
+def test_unchanged_workbook_is_served_from_the_cache_after_a_304(graph, service):
+    assert _download(service) == b"version 1"
+    assert _download(service) == b"version 1"
+
+    assert graph.requests["GET"] == 2
+    assert graph.not_modified == 1
+    assert graph_metrics.stats()["counters"] == {"download_full": 1, "download_not_modified": 1}
+
+
+def test_changed_workbook_is_downloaded_again(graph, service):
+    _download(service)
+    graph.put_file(ITEM, b"version 2")
+
+    assert _download(service) == b"version 2"
+    assert graph.not_modified == 0
+    # ...and the new copy is what gets revalidated next
+    assert _download(service) == b"version 2"
+    assert graph.not_modified == 1
+
+
+def test_recently_validated_copy_is_used_without_a_request(graph, service):
+    _download(service)
+    graph.put_file(ITEM, b"version 2")
+
+    assert _download(service, max_age=60) == b"version 1"
+    assert graph.requests["GET"] == 1
+    assert graph_metrics.stats()["counters"]["download_fresh_cache"] == 1
+
+
+def test_cache_is_not_used_for_a_different_workbook(graph, service):
+    _download(service)
+    graph.put_file("Other.xlsx", b"other workbook")
+    service.sharepoint_url = graph.share("Other.xlsx")
+
+    assert _download(service, max_age=60) == b"other workbook"
+    assert graph.not_modified == 0
@@ -0,0 +1,130 @@
+"""Sync jobs: progress reporting never commits part of an import."""
+
+from benchmarks.synthetic_workbook import write_workbook
+from database import get_connection
+from services import excel_sync, sync_jobs
+from services.excel_sync import ExcelSyncService
+from services.sync_lease import SyncLease
+
+WORKBOOK_ROWS = 300
+
+
+def _shipment_count() -> int:
+    """Shipment rows visible to another connection, i.e. committed."""
+    conn = get_connection()
+    try:
+        return conn.execute(
+            "SELECT (SELECT COUNT(*) FROM inbound_shipments) + (SELECT COUNT(*) FROM outbound_shipments)"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def _persisted_job(job_id: int) -> dict:
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT phase, progress FROM sync_jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(zip(row.keys(), row))
+    finally:
+        conn.close()
+
+
+def _import_job(tmp_path, monkeypatch) -> dict:
+    workbook = write_workbook(tmp_path / "board.xlsx", WORKBOOK_ROWS)
+    monkeypatch.setattr(excel_sync, "EXCEL_FILE_PATH", workbook)
+    return sync_jobs.enqueue_job("import", force=True)
+
+
+def _run_queued_job() -> dict:
+    """Claim and run the queued job the way the job runner does."""
+    with SyncLease() as lease:
+        return sync_jobs.run_job(sync_jobs._claim_next_job(lease), lease)
+
+
+def test_failed_import_commits_no_rows_after_progress_reports(tmp_path, monkeypatch):
+    job = _import_job(tmp_path, monkeypatch)
+    reported = []
+    original_write = ExcelSyncService._write_records
+
+    def write_then_fail(self, cursor, sheet_name, batch, incremental=True):
+        written = original_write(self, cursor, sheet_name, batch, incremental)
+        # Later sheets start with a progress report after rows were written
+        if sheet_name == "OTHEROUTBOUND":
+            raise RuntimeError("sheet failed")
+        return written
+
+    original_report = ExcelSyncService._report_progress
+
+    def observe_report(self, phase, fraction):
+        original_report(self, phase, fraction)
+        reported.append((phase, sync_jobs.get_job(job["id"])["phase"], _shipment_count()))
+
+    monkeypatch.setattr(ExcelSyncService, "_write_records", write_then_fail)
+    monkeypatch.setattr(ExcelSyncService, "_report_progress", observe_report)
+
+    finished = _run_queued_job()
+
+    importing = [entry for entry in reported if entry[0].startswith("importing")]
+    assert len(importing) >= 2
+    # This process sees live progress while nothing reaches other connections
+    assert all(phase == seen for phase, seen, _ in reported)
+    assert all(count == 0 for _, _, count in reported)
+    assert finished["status"] == "failed"
+    assert "sheet failed" in finished["message"]
+    assert _shipment_count() == 0
+
+
+def test_progress_is_persisted_between_transactions(tmp_path, monkeypatch):
+    job = _import_job(tmp_path, monkeypatch)
+    persisted = []
+    original_report = ExcelSyncService._report_progress
+
+    def observe_report(self, phase, fraction):
+        original_report(self, phase, fraction)
+        persisted.append((phase, _persisted_job(job["id"])["phase"]))
+
+    monkeypatch.setattr(ExcelSyncService, "_report_progress", observe_report)
+
+    finished = _run_queued_job()
+
+    assert ("hashing", "hashing") in persisted
+    assert finished["status"] == "succeeded"
+    assert finished["phase"] == "done"
+    assert _shipment_count() > 0
+    assert sync_jobs._live_progress == {}
+
+
+def test_parallel_import_failure_falls_back_to_serial(tmp_path, monkeypatch, fresh_database):
+    _import_job(tmp_path, monkeypatch)
+    expected = _run_queued_job()
+    assert expected["status"] == "succeeded"
+    expected_rows = _shipment_count()
+    fresh_database()
+
+    monkeypatch.setattr(excel_sync, "IMPORT_PARALLEL_WORKERS", 2)
+    monkeypatch.setattr(excel_sync.os, "cpu_count", lambda: 2)
+    failed = []
+    original_write = ExcelSyncService._write_records
+    original_report = ExcelSyncService._report_progress
+
+    def fail_once_after_a_sheet(self, cursor, sheet_name, batch, incremental=True):
+        if self.sheets_imported and not failed:
+            failed.append(sheet_name)
+            raise RuntimeError("parallel write failed")
+        return original_write(self, cursor, sheet_name, batch, incremental)
+
+    def count_imported(self, phase, fraction):
+        self.sheets_imported += phase.startswith("imported")
+        original_report(self, phase, fraction)
+
+    monkeypatch.setattr(ExcelSyncService, "sheets_imported", 0, raising=False)
+    monkeypatch.setattr(ExcelSyncService, "_write_records", fail_once_after_a_sheet)
+    monkeypatch.setattr(ExcelSyncService, "_report_progress", count_imported)
+
+    sync_jobs.enqueue_job("import", force=True)
+    finished = _run_queued_job()
+
+    assert failed
+    assert finished["status"] == "succeeded"
+    assert finished["result"]["records_processed"] == expected["result"]["records_processed"]
+    assert _shipment_count() == expected_rows
@@ -0,0 +1,61 @@
+"""The sync lease: heartbeat cleanup and losing the lease mid-import."""
+
+import time
+
+import database
+from benchmarks.synthetic_workbook import write_workbook
+from database import get_connection
+from services import excel_sync
+from services.excel_sync import ExcelSyncService
+from services.sync_lease import SyncLease
+
+# Short enough that the heartbeat renews a few times per test
+HEARTBEAT_TTL_SECONDS = 0.3
+
+
+def _committed_shipments() -> int:
+    conn = get_connection()
+    try:
+        return conn.execute(
+            "SELECT (SELECT COUNT(*) FROM inbound_shipments) + (SELECT COUNT(*) FROM outbound_shipments)"
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_heartbeat_threads_leave_no_pooled_connections():
+    before = len(database._pooled_connections)
+    for _ in range(3):
+        with SyncLease(ttl_seconds=HEARTBEAT_TTL_SECONDS) as lease:
+            time.sleep(HEARTBEAT_TTL_SECONDS)
+            assert lease.renew()
+    assert len(database._pooled_connections) == before
+
+
+def test_import_that_loses_the_lease_persists_nothing(tmp_path, monkeypatch):
+    workbook = write_workbook(tmp_path / "board.xlsx", 300)
+    monkeypatch.setattr(excel_sync, "EXCEL_FILE_PATH", workbook)
+    original_report = ExcelSyncService._report_progress
+    taken_over = []
+
+    def take_over_on_first_sheet(self, phase, fraction):
+        original_report(self, phase, fraction)
+        if phase.startswith("importing") and not taken_over:
+            # Another worker takes the lease, as after a missed heartbeat
+            conn = get_connection()
+            try:
+                conn.execute("UPDATE sync_leases SET owner = 'other-worker'")
+                conn.commit()
+            finally:
+                conn.close()
+            taken_over.append(phase)
+
+    monkeypatch.setattr(ExcelSyncService, "_report_progress", take_over_on_first_sheet)
+
+    with SyncLease() as lease:
+        result = ExcelSyncService(lease=lease).import_from_excel(force=True)
+
+    assert taken_over
+    assert not result.success
+    assert "taken over by another worker" in result.message
+    assert _committed_shipments() == 0
@@ -1,5 +1,5 @@
 import { Routes, Route, NavLink } from 'react-router-dom';
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import {
   LayoutDashboard,
   ArrowDownToLine,
@@ -13,26 +13,41 @@ import Home from './pages/Home';
 import Inbound from './pages/Inbound';
 import Outbound from './pages/Outbound';
 import SettingsPage from './pages/Settings';
-import { dashboard, sync } from './services/api';
+import { dashboard, sync, useServerEvents, waitForSyncJob } from './services/api';
 
 function App() {
   const [alerts, setAlerts] = useState({ inbound: 0, outbound: 0 });
   const [syncing, setSyncing] = useState(false);
   const [syncMessage, setSyncMessage] = useState('');
+  const statsRef = useRef(null);
 
   useEffect(() => {
     loadAlerts();
-    const interval = setInterval(loadAlerts, 60000); // Refresh every minute
-    return () => clearInterval(interval);
   }, []);
 
+  // Stats deltas carry only the fields that changed
+  useServerEvents({
+    stats: (delta) => {
+      if (statsRef.current) {
+        applyStats({ ...statsRef.current, ...delta });
+      } else {
+        loadAlerts();
+      }
+    },
+    resync: () => loadAlerts(),
+  });
+
+  const applyStats = (stats) => {
+    statsRef.current = stats;
+    setAlerts({
+      inbound: stats.pending_inbound + stats.overdue_inbound,
+      outbound: stats.pending_outbound + stats.overdue_outbound,
+    });
+  };
+
   const loadAlerts = async () => {
     try {
-      const stats = await dashboard.getStats();
-      setAlerts({
-        inbound: stats.pending_inbound + stats.overdue_inbound,
-        outbound: stats.pending_outbound + stats.overdue_outbound,
-      });
+      applyStats(await dashboard.getStats());
     } catch (error) {
       console.error('Failed to load alerts:', error);
     }
@@ -42,10 +57,15 @@ function App() {
     setSyncing(true);
     setSyncMessage('');
     try {
-      const result = type === 'import'
+      const job = type === 'import'
         ? await sync.importFromExcel()
         : await sync.exportToExcel();
-      setSyncMessage(result.message);
+      const finished = await waitForSyncJob(job.id, (update) => {
+        setSyncMessage(update.status === 'queued'
+          ? 'Waiting for the sync worker...'
+          : `${update.phase || 'Working'}... ${Math.round(update.progress * 100)}%`);
+      });
+      setSyncMessage(finished.result?.message || finished.message || `Sync ${finished.status}`);
       loadAlerts();
     } catch (error) {
       setSyncMessage(`Error: ${error.message}`);
@@ -1,25 +1,64 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { AlertTriangle, Clock, CheckCircle, X } from 'lucide-react';
-import { dashboard } from '../services/api';
+import { dashboard, useServerEvents } from '../services/api';
 
 export default function Notifications() {
   const [todayShipments, setTodayShipments] = useState({ inbound: [], outbound: [] });
   const [overdueShipments, setOverdueShipments] = useState({ inbound: [], outbound: [] });
   const [loading, setLoading] = useState(true);
   const [dismissed, setDismissed] = useState(new Set());
+  const todayRef = useRef(null);
 
   useEffect(() => {
     loadNotifications();
-    const interval = setInterval(loadNotifications, 60000); // Refresh every minute
-    return () => clearInterval(interval);
   }, []);
 
+  // Patch the lists in place from live shipment events; reload after an
+  // Excel import or when the stream reports missed events
+  const applyShipmentEvent = ({ direction, id, shipment }) => {
+    const today = todayRef.current;
+    const done = shipment && (direction === 'inbound' ? shipment.received : shipment.shipped);
+
+    setTodayShipments((prev) => {
+      const list = prev[direction].filter((s) => s.id !== id);
+      if (shipment && shipment.ship_date === today) {
+        list.push(shipment);
+      }
+      return { ...prev, [direction]: list };
+    });
+    setOverdueShipments((prev) => {
+      const list = prev[direction].filter((s) => s.id !== id);
+      if (shipment && !done && shipment.ship_date && shipment.ship_date < today) {
+        list.push(shipment);
+        list.sort((a, b) => a.ship_date.localeCompare(b.ship_date));
+      }
+      return { ...prev, [direction]: list };
+    });
+  };
+
+  useServerEvents({
+    'shipment.created': applyShipmentEvent,
+    'shipment.updated': applyShipmentEvent,
+    'shipment.deleted': applyShipmentEvent,
+    'sync.completed': (data) => {
+      if (data.sync_type === 'import') loadNotifications();
+    },
+    resync: () => loadNotifications(),
+    // The server re-checks stats periodically, which also covers midnight
+    stats: () => {
+      if (todayRef.current && todayRef.current !== new Date().toLocaleDateString('en-CA')) {
+        loadNotifications();
+      }
+    },
+  });
+
   const loadNotifications = async () => {
     try {
       const [today, overdue] = await Promise.all([
         dashboard.getTodayShipments(),
         dashboard.getOverdueShipments(),
       ]);
+      todayRef.current = today.date;
       setTodayShipments(today);
       setOverdueShipments(overdue);
     } catch (error) {
@@ -1,10 +1,12 @@
-import { useState, useEffect } from 'react';
-import { RefreshCw, Trash2, Plus, Clock } from 'lucide-react';
-import { sync, reference } from '../services/api';
+import { useState, useEffect, useRef } from 'react';
+import { RefreshCw, Trash2, Plus, Clock, Loader } from 'lucide-react';
+import { sync, reference, isSyncJobActive } from '../services/api';
 
 export default function Settings() {
   const [syncStatus, setSyncStatus] = useState(null);
   const [syncLog, setSyncLog] = useState([]);
+  const [syncJobs, setSyncJobs] = useState([]);
+  const hadActiveJobs = useRef(false);
   const [carriers, setCarriers] = useState([]);
   const [customers, setCustomers] = useState([]);
   const [newCarrier, setNewCarrier] = useState('');
@@ -15,16 +17,45 @@ export default function Settings() {
     loadData();
   }, []);
 
+  // Poll sync jobs: every 2s while one is queued/running, otherwise every 10s
+  // to pick up jobs started from the header or by the scheduler
+  useEffect(() => {
+    const active = syncJobs.some(isSyncJobActive);
+    const timer = setTimeout(loadJobs, active ? 2000 : 10000);
+    return () => clearTimeout(timer);
+  }, [syncJobs]);
+
+  const loadJobs = async () => {
+    try {
+      const jobs = await sync.getJobs(5);
+      const active = jobs.some(isSyncJobActive);
+      if (hadActiveJobs.current && !active) {
+        // A job just finished; refresh the status and log
+        const [status, log] = await Promise.all([sync.getStatus(), sync.getLog(10)]);
+        setSyncStatus(status);
+        setSyncLog(log);
+      }
+      hadActiveJobs.current = active;
+      setSyncJobs(jobs);
+    } catch (error) {
+      console.error('Failed to load sync jobs:', error);
+      setSyncJobs((jobs) => [...jobs]);  // keep polling
+    }
+  };
+
   const loadData = async () => {
     try {
-      const [status, log, carriersData, customersData] = await Promise.all([
+      const [status, log, jobs, carriersData, customersData] = await Promise.all([
         sync.getStatus(),
         sync.getLog(10),
+        sync.getJobs(5),
         reference.getCarriers(),
         reference.getCustomers(),
       ]);
       setSyncStatus(status);
       setSyncLog(log);
+      hadActiveJobs.current = jobs.some(isSyncJobActive);
+      setSyncJobs(jobs);
       setCarriers(carriersData);
       setCustomers(customersData);
     } catch (error) {
@@ -116,6 +147,54 @@ export default function Settings() {
           </div>
         </div>
 
+        <h4 className="font-medium mb-2 flex items-center gap-2">
+          <Loader className="w-4 h-4" />
+          Sync Jobs
+        </h4>
+        <div className="overflow-x-auto mb-6">
+          <table className="table">
+            <thead>
+              <tr>
+                <th>Queued</th>
+                <th>Type</th>
+                <th>Trigger</th>
+                <th>Status</th>
+                <th>Progress</th>
+              </tr>
+            </thead>
+            <tbody className="divide-y divide-gray-200">
+              {syncJobs.length === 0 ? (
+                <tr>
+                  <td colSpan="5" className="text-center py-4 text-gray-500">
+                    No sync jobs
+                  </td>
+                </tr>
+              ) : (
+                syncJobs.map((job) => (
+                  <tr key={job.id}>
+                    <td>{formatDate(job.created_at)}</td>
+                    <td className="capitalize">{job.job_type}</td>
+                    <td className="capitalize">{job.triggered_by}</td>
+                    <td>
+                      <span className={`badge ${
+                        job.status === 'succeeded' ? 'badge-success'
+                          : job.status === 'failed' ? 'badge-danger' : 'badge-warning'
+                      }`}>
+                        {job.status}
+                      </span>
+                    </td>
+                    <td className="text-sm">
+                      {isSyncJobActive(job)
+                        ? `${job.phase || 'waiting'} (${Math.round(job.progress * 100)}%)`
+                        : job.message}
+                    </td>
+                  </tr>
+                ))
+              )}
+            </tbody>
+          </table>
+        </div>
+
         <h4 className="font-medium mb-2 flex items-center gap-2">
           <Clock className="w-4 h-4" />
           Recent Sync Log
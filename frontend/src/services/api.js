@@ -1,3 +1,5 @@
+import { useEffect, useRef } from 'react';
+
 const API_BASE = '/api';
 
 async function fetchAPI(endpoint, options = {}) {
@@ -23,9 +25,17 @@ export const dashboard = {
   getShipmentsByCarrier: () => fetchAPI('/dashboard/shipments-by-carrier'),
   getShipmentsByCustomer: () => fetchAPI('/dashboard/shipments-by-customer'),
   getWeeklyVolume: () => fetchAPI('/dashboard/weekly-volume'),
+  getVolume: (params = {}) => {
+    const query = new URLSearchParams(params).toString();
+    return fetchAPI(`/dashboard/volume${query ? `?${query}` : ''}`);
+  },
   getTodayShipments: () => fetchAPI('/dashboard/today'),
   getOverdueShipments: () => fetchAPI('/dashboard/overdue'),
   getAutozonePallets: () => fetchAPI('/dashboard/autozone-pallets'),
+  getCustomerPallets: (customer, year) => {
+    const query = new URLSearchParams(year ? { customer, year } : { customer }).toString();
+    return fetchAPI(`/dashboard/customer-pallets?${query}`);
+  },
 };
 
 // Inbound Shipments
@@ -94,11 +104,78 @@ export const reference = {
 // Sync
 export const sync = {
   getStatus: () => fetchAPI('/sync/status'),
-  importFromExcel: () => fetchAPI('/sync/import', { method: 'POST' }),
+  importFromExcel: (force = false) => fetchAPI(`/sync/import${force ? '?force=true' : ''}`, { method: 'POST' }),
   exportToExcel: () => fetchAPI('/sync/export', { method: 'POST' }),
   getLog: (limit = 20) => fetchAPI(`/sync/log?limit=${limit}`),
+  getJobs: (limit = 10) => fetchAPI(`/sync/jobs?limit=${limit}`),
+  getJob: (id) => fetchAPI(`/sync/jobs/${id}`),
 };
 
+export const isSyncJobActive = (job) => job.status === 'queued' || job.status === 'running';
+
+// Import/export run as background jobs; poll one until it finishes.
+// onUpdate sees every state along the way (queued, running + phase/progress).
+export async function waitForSyncJob(jobId, onUpdate, intervalMs = 1000) {
+  for (;;) {
+    const job = await sync.getJob(jobId);
+    if (onUpdate) onUpdate(job);
+    if (!isSyncJobActive(job)) return job;
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+}
+
+// Live updates (Server-Sent Events). One EventSource is shared by every
+// subscriber and closed when the last one unsubscribes; the browser
+// reconnects on its own and resumes via Last-Event-ID.
+let eventSource = null;
+const eventListeners = new Map();
+
+function dispatchEvent(event) {
+  const data = event.data ? JSON.parse(event.data) : {};
+  (eventListeners.get(event.type) || []).forEach((listener) => listener(data));
+}
+
+export function subscribeToEvents(handlers) {
+  if (!eventSource) {
+    eventSource = new EventSource(`${API_BASE}/events`);
+  }
+  Object.entries(handlers).forEach(([type, handler]) => {
+    if (!eventListeners.has(type)) {
+      eventListeners.set(type, new Set());
+      eventSource.addEventListener(type, dispatchEvent);
+    }
+    eventListeners.get(type).add(handler);
+  });
+
+  return () => {
+    Object.entries(handlers).forEach(([type, handler]) => {
+      eventListeners.get(type)?.delete(handler);
+    });
+    const remaining = [...eventListeners.values()].some((set) => set.size > 0);
+    if (!remaining && eventSource) {
+      eventSource.close();
+      eventSource = null;
+      eventListeners.clear();
+    }
+  };
+}
+
+// React hook: handlers may change between renders without resubscribing
+export function useServerEvents(handlers) {
+  const handlersRef = useRef(handlers);
+  handlersRef.current = handlers;
+
+  useEffect(() => {
+    const wrapped = Object.fromEntries(
+      Object.keys(handlersRef.current).map((type) => [
+        type,
+        (data) => handlersRef.current[type]?.(data),
+      ])
+    );
+    return subscribeToEvents(wrapped);
+  }, []);
+}
+
 export default {
   dashboard,
   inbound,